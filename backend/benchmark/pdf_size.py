@@ -0,0 +1,68 @@
+"""
+cards.pdf size per image setting, run by `python -m benchmark.run --comparisons pdf_size`.
+
+The images come from the deck's raw.zip, written by the end_to_end or archive stage.
+"""
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+from benchmark.stages import describe, load_songs
+
+variants = {
+    "rgb (previous)": dict(qr_code_mode=None, song_card_mode=None),
+    "1-bit / gray": dict(),
+    "1-bit / gray, flate 9": dict(flate_level=9),
+    "1-bit / jpeg 85": dict(jpeg_quality=85),
+}
+
+
+def find_archive(deck_dir: Path) -> Optional[Path]:
+    for path in (deck_dir / "dataset" / "raw.zip", deck_dir / "raw.zip"):
+        if path.exists():
+            return path
+    return None
+
+
+def archive_entries(archive_path: Path, kind: str) -> list[str]:
+    """PNG entries of one kind (song_cards, qr_codes) in id order."""
+    import zipfile
+    from generation.atlas.atlas import image_id
+
+    with zipfile.ZipFile(archive_path, "r") as archive:
+        names = [name for name in archive.namelist() if name.startswith(f"{kind}/") and name.endswith(".png")]
+    return sorted(names, key=image_id)
+
+
+def compare_pdf_sizes(deck_dir: Path) -> list[dict[str, Any]]:
+    """Write time and size of cards.pdf per variant. Skipped without a raw.zip of PNG cards and codes."""
+    from generation.archive_writer.archive_writer import ArchiveImages
+    from generation.pdf_generator.generate_pdf import PDFCreator
+
+    archive_path = find_archive(deck_dir)
+    if archive_path is None:
+        return [{"name": name, "status": "skipped", "reason": "no raw.zip; run the end_to_end or archive stage"} for name in variants]
+    count = len(load_songs(deck_dir))
+    qr_names = archive_entries(archive_path, "qr_codes")
+    card_names = archive_entries(archive_path, "song_cards")
+    if len(qr_names) != count or len(card_names) != count:
+        return [{"name": name, "status": "skipped", "reason": f"{archive_path} does not hold a PNG card and code per song"} for name in variants]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, options in variants.items():
+            pdf_path = Path(tmp) / "cards.pdf"
+            qr_images = ArchiveImages(archive_path, qr_names)
+            card_images = ArchiveImages(archive_path, card_names)
+            start = time.perf_counter()
+            try:
+                PDFCreator(pdf_path, None, None, 1, count, qr_code_images=qr_images, song_card_images=card_images, **options).create_pdf()
+            except (ImportError, OSError) as e:
+                results.append({"name": name, "status": "skipped", "reason": describe(e)})
+                continue
+            finally:
+                qr_images.close()
+                card_images.close()
+            elapsed = time.perf_counter() - start
+            results.append({"name": name, "status": "ok", "items_per_second": round(count / elapsed, 1), "output_bytes": pdf_path.stat().st_size})
+    return results
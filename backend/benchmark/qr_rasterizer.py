@@ -0,0 +1,74 @@
+"""
+QR code renderer comparison, run by `python -m benchmark.run --comparisons qr_rasterizer`.
+
+Renders the deck's first QR codes with the previous cairosvg renderer, the numpy
+rasterizer and the rasterizer without the encoding step.
+"""
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable
+from benchmark.stages import QR_PREFIX, describe, load_songs
+
+# The cairosvg renderer is slow; a few hundred codes give a stable rate
+MAX_CODES = 300
+
+
+def render_with_cairosvg(data: str, id: int) -> bytes:
+    """The previous renderer: pyqrcode PNG, embedded in an SVG, rasterized again by cairosvg."""
+    import cairosvg
+    import pyqrcode
+    from generation.qr_code_generator.layout import height, width
+
+    png_data = pyqrcode.create(data).png_as_base64_str(scale=6)
+    svg_content = f"""
+    <svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">
+        <rect width="100%" height="100%" fill="white"/>
+        <image x="100" y="100" width="500" height="500" href="data:image/png;base64,{png_data}" />
+        <text x="{width - 20}" y="{height - 20}" font-size="20" font-family="Arial" text-anchor="end" fill="gray">{id}</text>
+    </svg>
+    """
+    return cairosvg.svg2png(bytestring=svg_content.encode('utf-8'), output_width=width, output_height=height)
+
+
+def rasterize_only(matrices: dict[int, list[list[int]]]) -> Callable[[str, int], bytes]:
+    """The rasterizer without the pyqrcode encoding step, which dominates both renderers."""
+    from PIL import Image
+    from generation.qr_code_generator.qr_rasterizer import rasterize_matrix
+
+    def render(data: str, id: int) -> bytes:
+        buffer = BytesIO()
+        Image.fromarray(rasterize_matrix(matrices[id], id)).save(buffer, format="PNG")
+        return buffer.getvalue()
+    return render
+
+
+def codes_per_second(render: Callable[[str, int], bytes], prefix: str, count: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    total_size = 0
+    for i in range(1, count + 1):
+        total_size += len(render(f"{prefix}{i}", i))
+    return count / (time.perf_counter() - start), total_size // count
+
+
+def compare_qr_renderers(deck_dir: Path) -> list[dict[str, Any]]:
+    """Throughput and PNG size per renderer. Renderers whose backend is missing are skipped."""
+    from generation.qr_code_generator.qr_rasterizer import rasterize_qr_code
+    from generation.qr_code_generator.qr_settings import qr_matrix
+
+    count = min(len(load_songs(deck_dir)), MAX_CODES)
+    matrices = {i: qr_matrix(f"{QR_PREFIX}{i}") for i in range(1, count + 1)}
+    renderers = {
+        "svg + cairosvg": render_with_cairosvg,
+        "numpy rasterizer": rasterize_qr_code,
+        "rasterize only": rasterize_only(matrices),
+    }
+    results = []
+    for name, render in renderers.items():
+        try:
+            rate, size = codes_per_second(render, QR_PREFIX, count)
+        except (ImportError, OSError) as e:
+            results.append({"name": name, "status": "skipped", "reason": describe(e)})
+            continue
+        results.append({"name": name, "status": "ok", "items_per_second": round(rate, 1), "output_bytes": size})
+    return results
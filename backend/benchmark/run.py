@@ -0,0 +1,215 @@
+"""
+Benchmark suite for the generation pipeline.
+
+Run from backend/:  python -m benchmark.run --decks 100,1k --variants plain,unicode
+
+Every stage of every deck runs in a fresh process (see benchmark/stages.py). The CLI
+start-up time is measured as well (see benchmark/startup.py). Comparisons of
+alternative implementations run on request with --comparisons. Results go to a JSON
+file and are compared with a stored baseline, if there is one.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+from benchmark.pdf_size import compare_pdf_sizes
+from benchmark.qr_rasterizer import compare_qr_renderers
+from benchmark.stages import STAGES
+from benchmark.startup import check_budget, measure_startup
+from benchmark.synthetic import DECK_SIZES, VARIANTS, synthetic_songs
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_RESULTS = BACKEND_DIR / "benchmark" / "results.json"
+DEFAULT_BASELINE = BACKEND_DIR / "benchmark" / "baseline.json"
+
+# Run in this process after a deck's stages; each returns one result per implementation
+COMPARISONS: dict[str, Callable[[Path], list[dict[str, Any]]]] = {
+    "qr_rasterizer": compare_qr_renderers,
+    "pdf_size": compare_pdf_sizes,
+}
+
+
+def run_stage_process(stage: str, deck_dir: Path, jobs: int) -> dict[str, Any]:
+    command = [sys.executable, "-m", "benchmark.stages", stage, str(deck_dir), "--jobs", str(jobs)]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {"stage": stage, "status": "failed", "reason": f"stage process exited with {completed.returncode}"}
+    return json.loads(lines[-1])
+
+
+def run_suite(decks: list[str], variants: list[str], stages: list[str], jobs: int, work_dir: Path, comparisons: Optional[list[str]] = None) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    results = []
+    comparison_results = []
+    for deck in decks:
+        for variant in variants:
+            deck_dir = work_dir / f"{deck}-{variant}"
+            deck_dir.mkdir(parents=True)
+            songs = synthetic_songs(DECK_SIZES[deck], variant)
+            with open(deck_dir / "songs.json", "w") as f:
+                json.dump([song.dict() for song in songs], f)
+
+            for stage in stages:
+                result = run_stage_process(stage, deck_dir, jobs)
+                result.update(deck=deck, variant=variant, jobs=jobs)
+                seconds = result.get("seconds") or 0
+                result["items_per_second"] = round(result.get("items", 0) / seconds, 2) if seconds else 0.0
+                results.append(result)
+                print_result(result)
+
+            for comparison in comparisons or []:
+                for result in COMPARISONS[comparison](deck_dir):
+                    result.update(deck=deck, variant=variant, comparison=comparison)
+                    comparison_results.append(result)
+                    print_comparison(result)
+    return results, comparison_results
+
+
+def print_result(result: dict[str, Any]):
+    label = f"{result['deck']:>4} {result['variant']:<8} {result['stage']:<11}"
+    if result["status"] != "ok":
+        print(f"{label} {result['status']}: {result.get('reason', '')}")
+        return
+    print(
+        f"{label} {result['items_per_second']:>9.1f} items/s  {result['seconds']:>7.2f}s"
+        f"  peak {result['peak_rss_mb']:>6.1f} MB  output {result['output_bytes'] / (1024 * 1024):>7.2f} MB"
+    )
+
+
+def print_comparison(result: dict[str, Any]):
+    label = f"{result['deck']:>4} {result['variant']:<8} {result['comparison']}/{result['name']:<18}"
+    if result["status"] != "ok":
+        print(f"{label} {result['status']}: {result.get('reason', '')}")
+        return
+    print(f"{label} {result['items_per_second']:>9.1f} items/s  output {result['output_bytes'] / 1024:>8.1f} KiB")
+
+
+def result_key(result: dict[str, Any]) -> tuple:
+    return result["deck"], result["variant"], result["stage"], result.get("jobs", 1)
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]], threshold: float) -> list[str]:
+    """Prints the change against the baseline and returns the regressions beyond `threshold`."""
+    previous = {result_key(r): r for r in baseline if r["status"] == "ok"}
+    regressions = []
+    print("\nCompared with baseline (throughput, peak RSS, output size):")
+    for result in results:
+        old = previous.get(result_key(result))
+        if result["status"] != "ok" or old is None:
+            continue
+        changes = {
+            "throughput": result["items_per_second"] / old["items_per_second"] - 1 if old["items_per_second"] else 0.0,
+            "peak RSS": result["peak_rss_mb"] / old["peak_rss_mb"] - 1 if old["peak_rss_mb"] else 0.0,
+            "output": result["output_bytes"] / old["output_bytes"] - 1 if old["output_bytes"] else 0.0,
+        }
+        name = "/".join(str(part) for part in result_key(result)[:3])
+        print(f"  {name:<28} " + "  ".join(f"{metric} {change:+7.1%}" for metric, change in changes.items()))
+        # Lower throughput, or more memory or output, is worse
+        if changes["throughput"] < -threshold:
+            regressions.append(f"{name}: throughput {changes['throughput']:+.1%}")
+        for metric in ("peak RSS", "output"):
+            if changes[metric] > threshold:
+                regressions.append(f"{name}: {metric} {changes[metric]:+.1%}")
+    return regressions
+
+
+def compare_startup(startup: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    regressions = []
+    for metric in ("import_ms", "help_ms"):
+        old = baseline.get(metric)
+        if not old:
+            continue
+        change = startup[metric] / old - 1
+        print(f"  {'startup/' + metric:<28} {change:+7.1%}")
+        if change > threshold:
+            regressions.append(f"startup {metric}: {change:+.1%}")
+    return regressions
+
+
+def environment() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def parse_list(value: str, allowed) -> list[str]:
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown value(s) {', '.join(unknown)}; choose from {', '.join(allowed)}")
+    return items
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the generation pipeline on synthetic decks.")
+    parser.add_argument("--decks", type=lambda v: parse_list(v, DECK_SIZES), default=["100", "1k"], help=f"Comma-separated deck sizes: {', '.join(DECK_SIZES)}")
+    parser.add_argument("--variants", type=lambda v: parse_list(v, VARIANTS), default=["plain"], help=f"Comma-separated title variants: {', '.join(VARIANTS)}")
+    parser.add_argument("--stages", type=lambda v: parse_list(v, STAGES), default=list(STAGES), help=f"Comma-separated stages: {', '.join(STAGES)}")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes per stage (0 = one per CPU core)")
+    parser.add_argument("-o", "--output", type=Path, default=DEFAULT_RESULTS, help="Results JSON file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if anything regressed")
+    parser.add_argument("--keep", type=Path, help="Keep the generated decks and outputs in this directory")
+    parser.add_argument("--skip-startup", action="store_true", help="Do not measure the CLI start-up time")
+    parser.add_argument("--comparisons", type=lambda v: parse_list(v, COMPARISONS), default=[], help=f"Comma-separated comparisons to run per deck: {', '.join(COMPARISONS)}")
+    args = parser.parse_args(argv)
+
+    if args.keep:
+        args.keep.mkdir(parents=True, exist_ok=True)
+        results, comparisons = run_suite(args.decks, args.variants, args.stages, args.jobs, args.keep, args.comparisons)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results, comparisons = run_suite(args.decks, args.variants, args.stages, args.jobs, Path(tmp), args.comparisons)
+
+    report = {"environment": environment(), "results": results}
+    if comparisons:
+        report["comparisons"] = comparisons
+    regressions = []
+    if not args.skip_startup:
+        report["startup"] = measure_startup()
+        print(f"\nStart-up: import {report['startup']['import_ms']:.1f} ms, --help {report['startup']['help_ms']:.1f} ms")
+        # Being over budget is a regression even without a baseline
+        regressions += check_budget(report["startup"])
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline.exists() and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions += compare(results, baseline["results"], args.threshold)
+        if "startup" in report and "startup" in baseline:
+            regressions += compare_startup(report["startup"], baseline["startup"], args.threshold)
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}; store one with --save-baseline")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline stored at {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
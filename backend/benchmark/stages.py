@@ -0,0 +1,158 @@
+"""
+Benchmark stages. Each stage runs in its own process (`python -m benchmark.stages STAGE DECK_DIR`)
+so its peak RSS is not mixed up with other stages, and prints one JSON result line.
+"""
+import argparse
+import json
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Optional
+from generation.models.song import Song
+
+QR_PREFIX = "bench;id="
+
+
+@dataclass
+class StageResult:
+    stage: str
+    status: str  # "ok", "failed" or "skipped"
+    items: int = 0
+    seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    output_bytes: int = 0
+    peak_rss_mb: float = 0.0
+    worker_peak_rss_mb: float = 0.0
+    reason: str = ""
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+
+def load_songs(deck_dir: Path) -> list[Song]:
+    with open(deck_dir / "songs.json") as f:
+        return [Song(**song) for song in json.load(f)]
+
+
+def tree_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def require(path: Path, stage: str):
+    if not path.exists() or (path.is_dir() and not any(path.iterdir())):
+        raise FileNotFoundError(f"needs the output of the {stage} stage")
+
+
+def song_cards(deck_dir: Path, jobs: int) -> tuple[int, Path]:
+    from generation.card_generator.card_generator import convert_songs_to_image_cards
+    songs = load_songs(deck_dir)
+    report = convert_songs_to_image_cards(songs, deck_dir / "song_cards", jobs=jobs)
+    if not report.ok:
+        raise RuntimeError(f"{len(report.failures)} song cards failed, first: {report.failures[0]}")
+    return len(songs), deck_dir / "song_cards"
+
+
+def qr_codes(deck_dir: Path, jobs: int) -> tuple[int, Path]:
+    from generation.qr_code_generator.code_generation import generate_qr_codes
+    count = len(load_songs(deck_dir))
+    report = generate_qr_codes(QR_PREFIX, range(1, count + 1), deck_dir / "qr_codes", "png", jobs=jobs)
+    if not report.ok:
+        raise RuntimeError(f"{len(report.failures)} QR codes failed, first: {report.failures[0]}")
+    return count, deck_dir / "qr_codes"
+
+
+def pdf(deck_dir: Path, jobs: int) -> tuple[int, Path]:
+    from generation.pdf_generator.generate_pdf import PDFCreator
+    require(deck_dir / "song_cards", "song_cards")
+    require(deck_dir / "qr_codes", "qr_codes")
+    count = len(load_songs(deck_dir))
+    pdf_path = deck_dir / "cards.pdf"
+    PDFCreator(pdf_path, deck_dir / "qr_codes", deck_dir / "song_cards", 1, count).create_pdf(jobs=jobs)
+    return count, pdf_path
+
+
+def archive(deck_dir: Path, jobs: int) -> tuple[int, Path]:
+    from generation.archive_writer.archive_writer import ArchiveWriter
+    files = []
+    for folder in ("qr_codes", "song_cards"):
+        require(deck_dir / folder, folder)
+        files += sorted((deck_dir / folder).iterdir())
+    archive_path = deck_dir / "raw.zip"
+    with ArchiveWriter(archive_path) as writer:
+        writer.write_all((f"{f.parent.name}/{f.name}", f.read_bytes()) for f in files)
+    return len(files), archive_path
+
+
+def end_to_end(deck_dir: Path, jobs: int) -> tuple[int, Path]:
+    import shutil
+    from generate import build_dataset
+    from generation.render_pool.render_pool import RenderPool
+    dataset_output = deck_dir / "dataset"
+    if dataset_output.exists():
+        shutil.rmtree(dataset_output)
+    with RenderPool(jobs) as pool:
+        if not build_dataset(deck_dir / "songs.json", dataset_output, "bench", "Benchmark", pool):
+            raise RuntimeError("build_dataset reported failures")
+    return len(load_songs(deck_dir)), dataset_output
+
+
+# In dependency order: pdf and archive read what song_cards and qr_codes wrote
+STAGES: dict[str, Callable[[Path, int], tuple[int, Path]]] = {
+    "song_cards": song_cards,
+    "qr_codes": qr_codes,
+    "pdf": pdf,
+    "archive": archive,
+    "end_to_end": end_to_end,
+}
+
+
+def run_stage(stage: str, deck_dir: Path, jobs: int) -> StageResult:
+    """Runs one stage in this process. Missing optional dependencies skip the stage."""
+    fn = STAGES[stage]
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        items, output = fn(deck_dir, jobs)
+    except (ImportError, OSError) as e:
+        return StageResult(stage, "skipped", reason=describe(e))
+    except Exception as e:
+        return StageResult(stage, "failed", reason=describe(e))
+    seconds = time.perf_counter() - wall
+    # Worker processes count towards CPU time; their peak memory is reported separately
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = time.process_time() - cpu + children.ru_utime + children.ru_stime
+    return StageResult(stage, "ok", items, seconds, cpu_seconds, tree_size(output), peak_rss_mb(), peak_rss_mb(resource.RUSAGE_CHILDREN))
+
+
+def describe(error: Exception) -> str:
+    # Library loaders like cairocffi list every path they tried; the first line says enough
+    lines = str(error).splitlines()
+    return f"{type(error).__name__}: {lines[0] if lines else ''}"
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Run one benchmark stage and print its result as JSON.")
+    parser.add_argument("stage", choices=STAGES)
+    parser.add_argument("deck_dir", type=Path, help="Directory holding the deck's songs.json and earlier stage outputs")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes (0 = one per CPU core)")
+    args = parser.parse_args(argv)
+
+    # Progress bars and prints of the stage go to stderr; stdout carries only the result
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    result = run_stage(args.stage, args.deck_dir, args.jobs)
+    sys.stdout = stdout
+    print(json.dumps(asdict(result)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Start-up budget of the generate.py CLI.
+
+Run from backend/:  python -m benchmark.startup
+
+Measures `python -X importtime -c "import generate"` and the wall time of
+`generate.py --help` in fresh processes, and exits with status 1 when either is
+over budget or a heavy backend is imported at start-up.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Generous enough for slow machines; a heavy backend sneaking back in costs several times this
+IMPORT_BUDGET_MS = 250.0
+HELP_BUDGET_MS = 600.0
+# Must only be imported once a stage needs them
+HEAVY_MODULES = ("cairosvg", "reportlab", "pypdf", "PIL", "numpy", "tqdm", "asyncio", "concurrent.futures")
+
+
+def import_times(module: str = "generate") -> dict[str, float]:
+    """Cumulative import time in ms of every module loaded by importing `module` in a fresh interpreter."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def help_time() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "generate.py", "--help"], cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def measure_startup(repeat: int = 5) -> dict[str, Any]:
+    """Best of `repeat` runs, so a busy machine does not fail the budget."""
+    runs = [import_times() for _ in range(repeat)]
+    best = min(runs, key=lambda times: times["generate"])
+    heavy = sorted(name for name in best if any(name == m or name.startswith(m + ".") for m in HEAVY_MODULES))
+    slowest = sorted(((ms, name) for name, ms in best.items() if name.startswith("generation") or "." not in name), reverse=True)[:10]
+    return {
+        "import_ms": round(best["generate"], 1),
+        "help_ms": round(min(help_time() for _ in range(repeat)), 1),
+        "heavy_imports": heavy,
+        "slowest_imports": [{"module": name, "ms": round(ms, 1)} for ms, name in slowest],
+    }
+
+
+def check_budget(result: dict[str, Any], import_budget: float = IMPORT_BUDGET_MS, help_budget: float = HELP_BUDGET_MS) -> list[str]:
+    problems = []
+    if result["import_ms"] > import_budget:
+        problems.append(f"importing generate took {result['import_ms']:.1f} ms, budget {import_budget:.0f} ms")
+    if result["help_ms"] > help_budget:
+        problems.append(f"generate.py --help took {result['help_ms']:.1f} ms, budget {help_budget:.0f} ms")
+    if result["heavy_imports"]:
+        problems.append(f"heavy modules imported at start-up: {', '.join(result['heavy_imports'])}")
+    return problems
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Check the start-up time of generate.py against its budget.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per measurement; the best one counts")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS, help="Budget for importing generate, in ms")
+    parser.add_argument("--help-budget", type=float, default=HELP_BUDGET_MS, help="Budget for generate.py --help, in ms")
+    parser.add_argument("--json", action="store_true", help="Print the measurement as JSON")
+    args = parser.parse_args(argv)
+
+    result = measure_startup(args.repeat)
+    problems = check_budget(result, args.import_budget, args.help_budget)
+    if args.json:
+        print(json.dumps({**result, "problems": problems}, indent=2))
+    else:
+        print(f"{'import generate':<20} {result['import_ms']:>7.1f} ms  (budget {args.import_budget:.0f} ms)")
+        print(f"{'generate.py --help':<20} {result['help_ms']:>7.1f} ms  (budget {args.help_budget:.0f} ms)")
+        print("Slowest imports:")
+        for entry in result["slowest_imports"]:
+            print(f"  {entry['module']:<50} {entry['ms']:>7.1f} ms")
+        for problem in problems:
+            print(f"OVER BUDGET {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
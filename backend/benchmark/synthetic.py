@@ -0,0 +1,33 @@
+import random
+from generation.models.song import Song
+
+# Deck sizes the suite knows by name
+DECK_SIZES = {"100": 100, "1k": 1_000, "10k": 10_000}
+# Title/artist flavours: plain words, titles long enough to wrap, and non-Latin scripts
+VARIANTS = ("plain", "long", "unicode")
+
+_WORDS = ["love", "night", "heart", "dance", "fire", "summer", "dream", "city", "light", "rain", "baby", "gold", "river", "world", "forever", "tonight"]
+_UNICODE_WORDS = ["Café", "Mädchen", "Señorita", "Ångström", "Łódź", "Ψυχή", "Любовь", "東京", "사랑", "Ça plane", "Jalapeño", "Été"]
+_NAMES = ["The Midnight", "Nova", "Blue Echo", "Paper Kites", "Silver Lane", "Kid Comet", "Static Bloom", "June Harbor"]
+
+
+def _phrase(rng: random.Random, words: list[str], count: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(count)).title()
+
+
+def synthetic_songs(count: int, variant: str = "plain", seed: int = 0) -> list[Song]:
+    """Deterministic fake deck with ids 1..count."""
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown variant {variant!r}, expected one of {VARIANTS}")
+    rng = random.Random(seed)
+    words = _UNICODE_WORDS + _WORDS if variant == "unicode" else _WORDS
+    songs = []
+    for i in range(1, count + 1):
+        if variant == "long":
+            title = _phrase(rng, words, rng.randint(8, 14)) + " (Extended Remastered Version)"
+            artist = " & ".join(rng.sample(_NAMES, 3))
+        else:
+            title = _phrase(rng, words, rng.randint(1, 4))
+            artist = rng.choice(_NAMES) if variant == "plain" else _phrase(rng, _UNICODE_WORDS, 2)
+        songs.append(Song(id=i, title=title, artist=artist, year=rng.randint(1955, 2024)))
+    return songs
@@ -1,15 +1,30 @@
+import functools
+import hashlib
 import shutil
-from typing import Optional
+import sys
+import time
+from typing import Any, Optional
 import click
 import json
 from pathlib import Path
-from generation.card_generator.generate_song_card import generate_song_card
-from generation.card_generator.card_generator import convert_songs_to_image_cards
-from generation.pdf_generator.generate_pdf import PDFCreator
-from generation.qr_code_generator.code_generation import generate_qr_code, generate_qr_codes
+# Only modules that are cheap to import belong up here. reportlab, pypdf, cairosvg, Pillow,
+# numpy and asyncio are imported where a stage needs them, so --help and light commands
+# start quickly (see benchmark/startup.py for the budget).
+from generation.card_generator.card_generator import render_songs_to_image_cards, write_songs_to_archive
+from generation.qr_code_generator.code_generation import render_qr_codes, write_qr_codes_to_archive
+from generation.qr_code_generator.qr_settings import ERROR_LEVELS, deck_qr_settings, store_settings
+from generation.dataset_info.dataset_info import ALBUM_ART_KEY, COMPRESSION_KEY, read_info, song_card_mode, update_info
 from generation.models.song import Song
+from generation.render_pool.render_pool import RenderPool, TaskReport, resolve_jobs
+from generation.render_cache.render_cache import DEFAULT_MAX_SIZE, RenderCache
+from generation.archive_writer.archive_writer import COMPRESSION_POLICIES, ArchiveImages, ArchiveWriter
+from generation.profiling.profiling import Profiler, profile_stage
+from generation.album_art.art_cache import ArtCache
+from generation.preview.preview import DEFAULT_CELL_SIZE, DEFAULT_COLUMNS, DEFAULT_COUNT, build_preview
 
 dataset_template = Path("dataset_template")
+# Written into each dataset built by build-all to detect unchanged inputs
+BUILD_HASH_FILE = ".build-hash"
 
 def print_separator():
     print("\n" + "="*50 + "\n")
@@ -20,6 +35,34 @@ def print_success(message: str):
 def print_info(message: str):
     print(f"\033[94mℹ {message}\033[0m")
 
+def print_error(message: str):
+    print(f"\033[91m✗ {message}\033[0m")
+
+def print_failures(report: TaskReport, what: str):
+    for failure in report.failures:
+        print_error(f"Failed to generate {what} {failure}")
+
+def profiled(command):
+    """Adds the --profile options to a command and prints or writes the stage metrics after it ran."""
+    @click.option("--profile-output", type=Path, help='Write the stage metrics as a Chrome trace JSON file (implies --profile)', required=False)
+    @click.option("--profile-latency", is_flag=True, help='Also sample per-card latency percentiles (implies --profile)')
+    @click.option("--profile", is_flag=True, help='Record wall time, CPU time, peak memory and item counts per stage')
+    @functools.wraps(command)
+    def wrapper(*args, profile: bool, profile_latency: bool, profile_output: Optional[Path], **kwargs):
+        if not (profile or profile_latency or profile_output):
+            return command(*args, **kwargs)
+        with Profiler(latency=profile_latency) as profiler:
+            with profile_stage("total"):
+                result = command(*args, **kwargs)
+        print_separator()
+        print_info("Profile (cpu s is this process, workers s the worker processes):")
+        print(profiler.format_table())
+        if profile_output is not None:
+            profiler.write_trace(profile_output)
+            print_success(f"Trace written to {profile_output}")
+        return result
+    return wrapper
+
 @click.group()
 def cli():
     pass
@@ -29,20 +72,337 @@ def cli():
 @click.option('--output', type=Path, help='Path to the output directory', required=False)
 @click.option("--name", type=str, help='Identifier for the dataset', required=False)
 @click.option("--display-name", type=str, help='Display name of the dataset', required=True)
-def quick_dataset_generator(dataset: Path, output: Path, name: Optional[str], display_name: str):
+@click.option("--jobs", "-j", type=int, default=1, show_default=True, help='Number of worker processes for rendering (0 = one per CPU core)')
+@click.option("--cache-dir", type=Path, help='Directory of the song card render cache shared across datasets and runs', required=False)
+@click.option("--cache-size", type=int, default=DEFAULT_MAX_SIZE // (1024 * 1024), show_default=True, help='Maximum size of the render cache in MB')
+@click.option("--vector-cards", is_flag=True, help='Draw the song cards as vector text in the PDF instead of rendering PNGs')
+@click.option("--in-memory", is_flag=True, help='Keep rendered images in memory for the PDF instead of reading them back from raw.zip')
+@click.option("--vector-qr-codes", is_flag=True, help='Draw the QR codes as vectors in the PDF and store them as SVG files in the archive')
+@click.option("--archive-compression", type=click.Choice(COMPRESSION_POLICIES), default="auto", show_default=True, help='Compression of raw.zip entries: auto stores PNGs as they are and deflates the rest')
+@click.option("--album-art-dir", type=Path, help='Fetch the album art of the songs into this cache and place it on the song cards', required=False)
+@click.option("--qr-min-error", type=click.Choice(ERROR_LEVELS), default="L", show_default=True, help='Lowest QR error correction level; higher levels are used while the QR version stays the same')
+@click.option("--atlas", is_flag=True, help='Also pack the song card and QR code PNGs into atlas sheets with an id index in atlas/')
+@click.option("--plan", is_flag=True, help='Validate the dataset and estimate pages, time and output sizes without building it')
+@profiled
+def quick_dataset_generator(dataset: Path, output: Path, name: Optional[str], display_name: str, jobs: int, cache_dir: Optional[Path], cache_size: int, vector_cards: bool, in_memory: bool, vector_qr_codes: bool, archive_compression: str, album_art_dir: Optional[Path], qr_min_error: str, atlas: bool, plan: bool):
     if not dataset.exists():
-        print(f"\033[91m✗ Dataset file {dataset} does not exist\033[0m")
+        print_error(f"Dataset file {dataset} does not exist")
         return
     if name is None:
         name = dataset.stem
+    if plan:
+        if album_art_dir is not None:
+            print_info("Fetching album art is not part of the estimate")
+        if not plan_dataset(dataset, name, jobs, vector_cards, vector_qr_codes, archive_compression, qr_min_error):
+            sys.exit(1)
+        return
     if output is None:
         output = Path.cwd().parent / "datasets"
         if not output.exists():
             output.mkdir()
 
-    tokens = {"name": name, "display_name": display_name}
+    cache = RenderCache(cache_dir, cache_size * 1024 * 1024) if cache_dir else None
+    art = ArtCache(album_art_dir) if album_art_dir else None
+    with RenderPool(jobs) as pool:
+        ok = build_dataset(dataset, output / name, name, display_name, pool, cache, vector_cards, in_memory, vector_qr_codes, archive_compression, art, qr_min_error)
+    if ok and atlas:
+        export_atlas(output / name)
+    if cache is not None:
+        evicted = cache.prune()
+        if evicted:
+            print_info(f"Evicted {evicted} old entries from the render cache")
+
+
+@cli.command()
+@click.option('--dataset', type=Path, help='Path to the updated JSON dataset file', required=True)
+@click.option('--output', type=Path, help='Path to the output directory', required=False)
+@click.option("--name", type=str, help='Identifier for the dataset', required=False)
+@click.option("--jobs", "-j", type=int, default=1, show_default=True, help='Number of worker processes for rendering (0 = one per CPU core)')
+@click.option("--cache-dir", type=Path, help='Directory of the song card render cache shared across datasets and runs', required=False)
+@click.option("--cache-size", type=int, default=DEFAULT_MAX_SIZE // (1024 * 1024), show_default=True, help='Maximum size of the render cache in MB')
+@click.option("--album-art-dir", type=Path, help='Fetch the album art of the songs into this cache and place it on the song cards', required=False)
+@click.option("--qr-min-error", type=click.Choice(ERROR_LEVELS), help='Lowest QR error correction level; changing it re-renders every QR code [default: the level the dataset was built with]', required=False)
+@profiled
+def update(dataset: Path, output: Optional[Path], name: Optional[str], jobs: int, cache_dir: Optional[Path], cache_size: int, album_art_dir: Optional[Path], qr_min_error: Optional[str]):
+    """Re-renders only the changed cards and page pairs of an existing dataset."""
+    if not dataset.exists():
+        print_error(f"Dataset file {dataset} does not exist")
+        return
+    if name is None:
+        name = dataset.stem
+    if output is None:
+        output = Path.cwd().parent / "datasets"
 
     dataset_output = output / name
+    if not (dataset_output / "songs.json").exists():
+        print_error(f"No dataset at {dataset_output}, create it with quick-dataset-generator first")
+        return
+
+    cache = RenderCache(cache_dir, cache_size * 1024 * 1024) if cache_dir else None
+    from generation.dataset_updater.dataset_updater import update_dataset
+
+    art = ArtCache(album_art_dir) if album_art_dir else None
+    report = update_dataset(dataset_output, dataset, jobs=jobs, cache=cache, art=art, qr_min_error=qr_min_error)
+    if cache is not None:
+        cache.prune()
+
+    diff = report.diff
+    print_info(f"{diff.old_count} → {diff.new_count} songs, {len(diff.changed_positions)} cards changed or added")
+    if diff.qr_settings_changed:
+        print_info(f"QR codes: {report.qr_settings}, re-rendering all of them")
+    if report.failures:
+        for failure in report.failures:
+            print_error(f"Failed to generate {failure}")
+        print_error("Dataset left unchanged because some cards failed to render")
+        return
+
+    if not report.rebuilt_pairs and diff.old_count == diff.new_count:
+        print_success("Dataset is already up to date")
+        return
+    print_success(f"Rebuilt {len(report.rebuilt_pairs)} page pairs in {dataset_output / 'cards.pdf'}")
+    print_success(f"Updated {dataset_output / 'raw.zip'} and {dataset_output / 'songs.json'}")
+    # The sheets show the old cards and codes, so an existing atlas is packed again
+    if (dataset_output / "atlas").exists():
+        export_atlas(dataset_output)
+
+
+@cli.command()
+@click.option('--dataset', type=Path, help='Path to the JSON dataset file or to a built dataset directory', required=True)
+@click.option('--output', type=Path, help='Directory for the contact sheets [default: preview/ in the dataset directory]', required=False)
+@click.option("--name", type=str, help='Identifier for the dataset, used in the QR codes', required=False)
+@click.option("--count", "-n", type=int, default=DEFAULT_COUNT, show_default=True, help='Number of cards to show')
+@click.option("--columns", type=int, default=DEFAULT_COLUMNS, show_default=True, help='Cards per row')
+@click.option("--size", type=int, default=DEFAULT_CELL_SIZE, show_default=True, help='Size of each card in pixels')
+@click.option("--jobs", "-j", type=int, default=0, show_default=True, help='Number of worker processes for rendering (0 = one per CPU core)')
+@click.option("--album-art-dir", type=Path, help='Place album art already fetched into this cache on the song cards', required=False)
+@profiled
+def preview(dataset: Path, output: Optional[Path], name: Optional[str], count: int, columns: int, size: int, jobs: int, album_art_dir: Optional[Path]):
+    """Renders front and back contact sheets of the first cards of a dataset, without building the PDF."""
+    dataset_dir = dataset if dataset.is_dir() else None
+    if dataset_dir is not None:
+        dataset = dataset_dir / "songs.json"
+    if not dataset.exists():
+        print_error(f"Dataset file {dataset} does not exist")
+        return
+    if name is None:
+        if dataset_dir is not None and (dataset_dir / "info.json").exists():
+            with open(dataset_dir / "info.json", 'r') as f:
+                name = json.load(f)["name"]
+        else:
+            name = dataset.stem
+    if output is None:
+        output = (dataset_dir or Path.cwd().parent / "datasets" / name) / "preview"
+
+    with open(dataset, 'r') as f:
+        songs = [Song(**song) for song in json.load(f)]
+    art = ArtCache(album_art_dir) if album_art_dir else None
+    start = time.perf_counter()
+    # More workers than cards would only add start-up time
+    with RenderPool(max(1, min(resolve_jobs(jobs), count))) as pool:
+        cards_report, qr_report = build_preview(songs, f"{name};id=", output, count, columns, size, pool=pool, art=art)
+    print_failures(cards_report, "song card")
+    print_failures(qr_report, "QR code")
+    print_success(f"Preview of {min(count, len(songs))} cards written to {output} in {time.perf_counter() - start:.2f}s")
+
+
+@cli.command("build-all")
+@click.option('--manifest', type=Path, help='JSON manifest listing the datasets to build', required=True)
+@click.option('--output', type=Path, help='Path to the output directory', required=False)
+@click.option("--jobs", "-j", type=int, default=0, show_default=True, help='Number of worker processes shared by all datasets (0 = one per CPU core)')
+@click.option("--concurrent", type=int, default=2, show_default=True, help='Datasets built at the same time on the shared workers')
+@click.option("--cache-dir", type=Path, help='Directory of the song card render cache shared across datasets and runs', required=False)
+@click.option("--cache-size", type=int, default=DEFAULT_MAX_SIZE // (1024 * 1024), show_default=True, help='Maximum size of the render cache in MB')
+@click.option("--force", is_flag=True, help='Rebuild datasets even if their inputs are unchanged')
+@click.option("--archive-compression", type=click.Choice(COMPRESSION_POLICIES), default="auto", show_default=True, help='Compression of raw.zip entries: auto stores PNGs as they are and deflates the rest')
+@click.option("--album-art-dir", type=Path, help='Fetch the album art of the songs into this cache and place it on the song cards', required=False)
+@profiled
+def build_all(manifest: Path, output: Optional[Path], jobs: int, concurrent: int, cache_dir: Optional[Path], cache_size: int, force: bool, archive_compression: str, album_art_dir: Optional[Path]):
+    """Builds every dataset of a manifest on one shared worker pool, skipping unchanged ones.
+
+    The manifest is a JSON list (or {"datasets": [...]}) of entries with "dataset",
+    "display_name" and optional "name", "vector_cards", "in_memory" and "vector_qr_codes".
+    Dataset paths are relative to the manifest.
+
+    Up to `--concurrent` datasets are built at once, each from its own thread, and their
+    cards, QR codes and PDF shards share the worker pool, so a small deck does not leave
+    most workers idle while it waits for its own stages.
+    """
+    if not manifest.exists():
+        print_error(f"Manifest {manifest} does not exist")
+        return
+    with open(manifest, 'r') as f:
+        entries = json.load(f)
+    if isinstance(entries, dict):
+        entries = entries["datasets"]
+    if output is None:
+        output = Path.cwd().parent / "datasets"
+    output.mkdir(parents=True, exist_ok=True)
+
+    cache = RenderCache(cache_dir, cache_size * 1024 * 1024) if cache_dir else None
+    art = ArtCache(album_art_dir) if album_art_dir else None
+
+    def build_entry(index: int, entry: dict[str, Any], pool: RenderPool) -> tuple[str, str, float]:
+        dataset = manifest.parent / entry["dataset"]
+        name = entry.get("name") or dataset.stem
+        display_name = entry["display_name"]
+        options: dict[str, Any] = {key: bool(entry.get(key, False)) for key in ("vector_cards", "in_memory", "vector_qr_codes")}
+        options["archive_compression"] = archive_compression
+        dataset_output = output / name
+        print_info(f"[{index}/{len(entries)}] {name}")
+
+        if not dataset.exists():
+            print_error(f"Dataset file {dataset} does not exist")
+            return name, "failed", 0.0
+
+        input_hash = dataset_input_hash(dataset, name, display_name, {**options, "album_art": art is not None})
+        hash_path = dataset_output / BUILD_HASH_FILE
+        if not force and hash_path.exists() and hash_path.read_text().strip() == input_hash:
+            print_success(f"{name} is up to date")
+            return name, "unchanged", 0.0
+
+        # Build next to the old output and swap at the end, so a failed build keeps
+        # the previous dataset and a manifest may point at the dataset's own songs.json.
+        staging = output / f".{name}.building"
+        if staging.exists():
+            shutil.rmtree(staging)
+        start = time.perf_counter()
+        try:
+            with profile_stage(name):
+                ok = build_dataset(dataset, staging, name, display_name, pool, cache, art=art, **options)
+        except Exception as e:
+            print_error(f"Failed to build {name}: {e}")
+            ok = False
+        seconds = time.perf_counter() - start
+        if not ok:
+            if staging.exists():
+                shutil.rmtree(staging)
+            return name, "failed", seconds
+
+        (staging / BUILD_HASH_FILE).write_text(input_hash)
+        if dataset_output.exists():
+            shutil.rmtree(dataset_output)
+        staging.rename(dataset_output)
+        return name, "built", seconds
+
+    with RenderPool(jobs) as pool:
+        # Tasks of a single worker run in this process, where side-by-side builds would only interleave
+        concurrent = max(1, concurrent) if pool.jobs > 1 else 1
+        if concurrent == 1:
+            summary = [build_entry(index, entry, pool) for index, entry in enumerate(entries, start=1)]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            pool.start()
+            with ThreadPoolExecutor(max_workers=concurrent) as builders:
+                summary = list(builders.map(lambda item: build_entry(*item, pool), enumerate(entries, start=1)))
+
+    if cache is not None:
+        cache.prune()
+
+    print_separator()
+    for name, status, seconds in summary:
+        line = f"{name}: {status}" + (f" in {seconds:.1f}s" if status != "unchanged" else "")
+        if status == "failed":
+            print_error(line)
+        else:
+            print_success(line)
+    counts = {status: sum(1 for _, s, _ in summary if s == status) for status in ("built", "unchanged", "failed")}
+    print_info(f"{counts['built']} built, {counts['unchanged']} unchanged, {counts['failed']} failed")
+
+
+@cli.command()
+@click.option("--host", type=str, default="127.0.0.1", show_default=True, help='Address to listen on')
+@click.option("--port", type=int, default=8765, show_default=True, help='Port to listen on')
+@click.option("--socket", "socket_path", type=Path, help='Listen on this Unix socket instead of a TCP port', required=False)
+@click.option("--jobs", "-j", type=int, default=0, show_default=True, help='Number of warm worker processes for rendering (0 = one per CPU core)')
+@click.option("--lru-entries", type=int, default=512, show_default=True, help='Number of recent renders kept in memory')
+@click.option("--cache-dir", type=Path, help='Directory of the song card render cache shared across datasets and runs', required=False)
+@click.option("--album-art-dir", type=Path, help='Place album art already fetched into this cache on the song cards', required=False)
+@click.option("--verbose", is_flag=True, help='Log every request')
+def serve(host: str, port: int, socket_path: Optional[Path], jobs: int, lru_entries: int, cache_dir: Optional[Path], album_art_dir: Optional[Path], verbose: bool):
+    """Serves song cards, QR codes and PDF pages over HTTP from warm renderers, for interactive editors."""
+    from generation.render_server.render_server import LRUCache, RenderService, make_server
+
+    cache = RenderCache(cache_dir) if cache_dir else None
+    art = ArtCache(album_art_dir) if album_art_dir else None
+    service = RenderService(jobs, LRUCache(lru_entries), cache, art)
+    server = make_server(service, host, port, socket_path, verbose)
+    try:
+        print_info(f"Warming up {service.pool.jobs} renderer(s)")
+        service.warm_up()
+        print_success(f"Serving on {socket_path or f'http://{host}:{server.server_address[1]}'} (POST /song-card, /qr-code, /pdf-page; GET /health)")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
+
+
+def dataset_input_hash(dataset: Path, name: str, display_name: str, options: dict[str, Any]) -> str:
+    """Fingerprint of everything a dataset build depends on besides the code."""
+    digest = hashlib.sha256(dataset.read_bytes())
+    digest.update(json.dumps({"name": name, "display_name": display_name, **options}, sort_keys=True).encode())
+    for template_file in sorted(dataset_template.iterdir()):
+        digest.update(template_file.read_bytes())
+    return digest.hexdigest()
+
+
+def export_atlas(dataset_output: Path):
+    """Packs the PNGs of a built dataset's raw.zip into atlas sheets in `atlas/`, replacing any earlier atlas."""
+    from generation.atlas.atlas import atlas_from_archive
+
+    atlas_dir = dataset_output / "atlas"
+    album_art = read_info(dataset_output / "info.json").get(ALBUM_ART_KEY, False)
+    # A smaller deck needs fewer sheets; leftovers of an earlier atlas would not be in index.json
+    if atlas_dir.exists():
+        shutil.rmtree(atlas_dir)
+    report = atlas_from_archive(dataset_output / "raw.zip", atlas_dir, song_card_mode=song_card_mode(album_art))
+    if report.skipped:
+        print_info(f"Atlas: skipped {len(report.skipped)} images that are not PNGs")
+    sheets = sum(len(paths) for paths in report.sheets.values())
+    print_success(f"Packed {report.images} images into {sheets} atlas sheets in {atlas_dir}")
+
+
+def plan_dataset(dataset: Path, name: str, jobs: int = 1, vector_cards: bool = False, vector_qr_codes: bool = False, archive_compression: str = "auto", qr_min_error: str = "L", max_warnings: int = 20) -> bool:
+    """Validates a dataset and prints the estimated cost of building it. Returns False if the build would fail or be broken."""
+    from generation.build_planner.build_planner import plan_build, validate_songs, vector_card_issues
+
+    start = time.perf_counter()
+    with open(dataset, 'r') as f:
+        songs, issues = validate_songs(json.load(f))
+    if vector_cards:
+        issues += vector_card_issues(songs)
+    print_info(f"Validated {len(songs)} songs in '{name}' in {(time.perf_counter() - start) * 1000:.0f} ms")
+    warnings = [issue for issue in issues if not issue.error]
+    for issue in warnings[:max_warnings]:
+        print_info(f"Warning: {issue}")
+    if len(warnings) > max_warnings:
+        print_info(f"... and {len(warnings) - max_warnings} more warnings")
+    errors = [issue for issue in issues if issue.error]
+    for issue in errors:
+        print_error(str(issue))
+    if errors:
+        print_error(f"{len(errors)} errors, the dataset cannot be built")
+        return False
+
+    plan = plan_build(songs, issues, f"{name};id=", jobs, vector_cards, vector_qr_codes, archive_compression, qr_min_error)
+    print_separator()
+    print_info(f"{len(songs)} songs on {plan.pages // 2} sheets ({plan.pages} pages)")
+    print_info(f"QR codes: {plan.qr_settings}")
+    for stage in plan.stages:
+        print_info(f"{stage.name:<12} {stage.items} × {stage.seconds_per_item * 1000:.1f} ms → {stage.seconds:.1f}s")
+    print_info(f"{'total':<12} {plan.seconds:.1f}s on {plan.workers} worker processes")
+    print_info(f"raw.zip   ~{plan.archive_bytes / (1024 * 1024):.1f} MB")
+    print_info(f"cards.pdf ~{plan.pdf_bytes / (1024 * 1024):.1f} MB")
+    return True
+
+
+def build_dataset(dataset: Path, dataset_output: Path, name: str, display_name: str, pool: RenderPool, cache: Optional[RenderCache] = None, vector_cards: bool = False, in_memory: bool = False, vector_qr_codes: bool = False, archive_compression: str = "auto", art: Optional[ArtCache] = None, qr_min_error: str = "L") -> bool:
+    """Builds one dataset directory on the given worker pool. Returns False if rendering failed."""
+    tokens = {"name": name, "display_name": display_name}
+
     pdf_output = dataset_output / "cards.pdf"
     songs_json_path = dataset_output / "songs.json"
 
@@ -50,43 +410,105 @@ def quick_dataset_generator(dataset: Path, output: Path, name: Optional[str], di
     print_info("Initializing Dataset Generation")
     print_separator()
 
-    # parse json to dataclass
-    with open(dataset, 'r') as f:
-        json_data = json.load(f)
-        songs = [Song(**song) for song in json_data]
+    with profile_stage("load_dataset") as stage:
+        # parse json to dataclass
+        with open(dataset, 'r') as f:
+            json_data = json.load(f)
+            songs = [Song(**song) for song in json_data]
+        # The PDF pairs cards and QR codes by position, which follows the song ids
+        songs.sort(key=lambda song: song.id)
+        stage.add_items(len(songs))
 
-    print_info(f"Found {len(songs)} songs in '{name}'")
-    print_info(f"Dataset will be created at: {dataset_output.absolute()}")
-    print_separator()
+        print_info(f"Found {len(songs)} songs in '{name}'")
+        print_info(f"Dataset will be created at: {dataset_output.absolute()}")
+        print_separator()
 
-    # copy template files
-    shutil.copytree(dataset_template, dataset_output)
-    replace_tokens(dataset_output / "README.md", tokens)
-    replace_tokens(dataset_output / "info.json", tokens)
-    qr_codes_path = dataset_output / "raw" / "qr_codes"
-    song_cards_path = dataset_output / "raw" / "song_cards"
+        # copy template files
+        shutil.copytree(dataset_template, dataset_output)
+        replace_tokens(dataset_output / "README.md", tokens)
+        replace_tokens(dataset_output / "info.json", tokens)
+        archive_path = dataset_output / "raw.zip"
 
-    shutil.copy(dataset, songs_json_path)
+        shutil.copy(dataset, songs_json_path)
     print_success(f"Dataset copied: {dataset} → {songs_json_path}")
 
-    convert_songs_to_image_cards(songs, song_cards_path)
-    print_success(f"Generated {len(songs)} song cards: {song_cards_path}")
+    if art is not None and not vector_cards:
+        # All art is fetched concurrently up front; the render workers then read it from the cache
+        from generation.album_art.album_art import fetch_album_art
+        with profile_stage("album_art") as stage:
+            art_report = fetch_album_art([song.image for song in songs], art)
+            stage.add_items(art_report.downloaded + art_report.not_modified + len(art_report.failures))
+        for url, error in art_report.failures.items():
+            print_error(f"Failed to fetch album art {url}: {error}")
+        print_success(f"Album art: {art_report.downloaded} downloaded, {art_report.not_modified} unchanged, {len(art_report.failures)} failed")
+
+    qr_id_range = range(1, len(songs)+1)
+    qr_format = "svg" if vector_qr_codes else "png"
+    qr_prefix = f"{name};id="
+    # One version for the whole deck, so every code prints at the same module size
+    qr_settings = deck_qr_settings(qr_prefix, qr_id_range, qr_min_error)
+    print_info(f"QR codes: {qr_settings}")
+    store_settings(dataset_output / "info.json", qr_settings, qr_min_error)
+    album_art = art is not None and not vector_cards
+    update_info(dataset_output / "info.json", **{COMPRESSION_KEY: archive_compression, ALBUM_ART_KEY: album_art})
+    # Assets go into raw.zip as they are rendered; in-memory mode keeps them for the PDF as well
+    with profile_stage("archive"), ArchiveWriter(archive_path, archive_compression) as archive:
+        if vector_cards:
+            cards_report = TaskReport()
+            print_info("Song cards will be drawn as vector text in the PDF")
+            from generation.pdf_generator.models.cards.song_text_card import SongTextCard
+            png_cards = sum(not SongTextCard.can_draw(song) for song in songs)
+            if png_cards:
+                print_info(f"{png_cards} song cards use characters the vector font lacks and are embedded as PNGs")
+        elif in_memory:
+            cards_report = render_songs_to_image_cards(songs, pool=pool, cache=cache, art=art)
+            print_failures(cards_report, "song card")
+            print_success(f"Rendered {len(songs) - len(cards_report.failures)} song cards in memory")
+        else:
+            cards_report = write_songs_to_archive(songs, archive, pool=pool, cache=cache, art=art)
+            print_failures(cards_report, "song card")
+            print_success(f"Generated {len(songs) - len(cards_report.failures)} song cards into {archive_path}")
 
-    generate_qr_codes(prefix=f"{name};id=", id_range=range(1, len(songs)+1), output_dir=qr_codes_path, file_format="png", scale=6)
-    print_success(f"Generated {len(songs)} QR codes: {qr_codes_path}")
+        if in_memory:
+            qr_report = render_qr_codes(prefix=qr_prefix, id_range=qr_id_range, pool=pool, file_format=qr_format, settings=qr_settings)
+            print_failures(qr_report, "QR code")
+            print_success(f"Rendered {len(songs) - len(qr_report.failures)} QR codes in memory")
+        else:
+            qr_report = write_qr_codes_to_archive(prefix=qr_prefix, id_range=qr_id_range, archive=archive, file_format=qr_format, pool=pool, settings=qr_settings)
+            print_failures(qr_report, "QR code")
+            print_success(f"Generated {len(songs) - len(qr_report.failures)} QR codes into {archive_path}")
+
+        if in_memory and cards_report.ok and qr_report.ok:
+            archive.write_all((f"qr_codes/code-{i}.{qr_format}", data) for i, data in zip(qr_id_range, qr_report.results))
+            archive.write_all((f"song_cards/card-{song.id}.png", data) for song, data in zip(songs, cards_report.results))
+
+    if cache is not None:
+        counters = cards_report.counters
+        print_info(f"Render cache: {counters['cache_hits']} hits, {counters['cache_misses']} misses")
+
+    if not (cards_report.ok and qr_report.ok):
+        # A missing card would shift every following card onto the wrong QR code in the PDF
+        print_error("Skipping PDF creation because some cards failed to render")
+        return False
+    print_success(f"Created archive: {archive_path} ({archive_path.stat().st_size / (1024 * 1024):.1f} MB)")
 
     print_separator()
     print_info(f"Generating PDF: {name}.pdf")
-    pdf_creator = PDFCreator(pdf_output, qr_codes_path, song_cards_path, 1, len(songs))
-    pdf_creator.create_pdf()
-    print_success(f"PDF created at: {pdf_output.absolute()}")
+    if in_memory:
+        qr_images, card_images = qr_report.results, cards_report.results
+    else:
+        # The PDF reads the images back from the archive one page at a time
+        qr_images = ArchiveImages(archive_path, qr_report.results)
+        card_images = ArchiveImages(archive_path, cards_report.results)
+    from generation.pdf_generator.generate_pdf import PDFCreator
+    pdf_creator = PDFCreator(pdf_output, None, None, 1, len(songs), qr_code_images=qr_images, song_card_images=card_images, songs=songs, vector_cards=vector_cards, vector_qr_codes=vector_qr_codes, qr_code_prefix=qr_prefix, qr_settings=qr_settings, song_card_mode=song_card_mode(album_art))
+    pdf_creator.create_pdf(pool=pool)
+    for images in (qr_images, card_images):
+        if isinstance(images, ArchiveImages):
+            images.close()
+    print_success(f"PDF created at: {pdf_output.absolute()} ({pdf_output.stat().st_size / (1024 * 1024):.1f} MB)")
     print_separator()
-
-    # Zip raw directory
-    raw_path = dataset_output / "raw"
-    shutil.make_archive(str(raw_path), 'zip', raw_path)
-    shutil.rmtree(raw_path)
-    print_success(f"Created archive: {raw_path}.zip")
+    return True
 
 
 def replace_tokens(file_path: Path, tokens: dict[str, str]):
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import http.client
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import urljoin, urlsplit
+from PIL import Image
+from generation.album_art.art_cache import ArtCache
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 15.0
+MAX_REDIRECTS = 5
+# Longest Retry-After honoured, so one server cannot stall the build
+MAX_RETRY_AFTER = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+USER_AGENT = "TrackStar-dataset-generator"
+
+
+@dataclass
+class FetchReport:
+    """Outcome of a batch of fetches. `failures` maps URLs to an error message."""
+    downloaded: int = 0
+    not_modified: int = 0
+    failures: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+class _Response:
+    def __init__(self, status: int, headers: http.client.HTTPMessage, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class ConnectionPool:
+    """Idle keep-alive connections per (scheme, host, port), shared by the fetcher threads."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme: str, host: str, port: Optional[int]) -> tuple[tuple[str, str, int], http.client.HTTPConnection]:
+        key = (scheme, host, port or (443 if scheme == "https" else 80))
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return key, idle.pop()
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return key, connection_class(host, key[2], timeout=self.timeout)
+
+    def release(self, key: tuple[str, str, int], connection: http.client.HTTPConnection):
+        with self._lock:
+            self._idle.setdefault(key, []).append(connection)
+
+    def close(self):
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+
+class AlbumArtFetcher:
+    """
+    Downloads album art into an `ArtCache` with at most `concurrency` requests in flight.
+
+    Requests run on worker threads over pooled keep-alive connections. Connection
+    errors, timeouts and 429/5xx responses are retried with exponential backoff and
+    jitter (honouring Retry-After); redirects are followed. URLs already in the cache
+    are revalidated with If-None-Match / If-Modified-Since.
+    """
+
+    def __init__(self, cache: ArtCache, concurrency: int = DEFAULT_CONCURRENCY, retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF, timeout: float = DEFAULT_TIMEOUT, revalidate: bool = True):
+        self.cache = cache
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.revalidate = revalidate
+        self.pool = ConnectionPool(timeout)
+
+    def _request(self, url: str, headers: dict[str, str]) -> _Response:
+        """Blocking GET on a pooled connection; runs in a worker thread."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"unsupported URL {url!r}")
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        key, connection = self.pool.acquire(parts.scheme, parts.hostname, parts.port)
+        try:
+            connection.request("GET", path, headers={"User-Agent": USER_AGENT, **headers})
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self.pool.release(key, connection)
+        return _Response(response.status, response.headers, body)
+
+    async def fetch(self, url: str, semaphore: asyncio.Semaphore, report: FetchReport):
+        entry = self.cache.entry(url)
+        if entry is not None and not self.revalidate:
+            return
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        target = url
+        attempt = 0
+        redirects = 0
+        while True:
+            try:
+                async with semaphore:
+                    response = await asyncio.to_thread(self._request, target, headers)
+            except (OSError, http.client.HTTPException) as e:
+                if attempt >= self.retries:
+                    report.failures[url] = f"{type(e).__name__}: {e}"
+                    return
+                await asyncio.sleep(self._delay(attempt))
+                attempt += 1
+                continue
+            except ValueError as e:
+                report.failures[url] = str(e)
+                return
+
+            if response.status in REDIRECT_STATUSES and response.headers.get("Location"):
+                redirects += 1
+                if redirects > MAX_REDIRECTS:
+                    report.failures[url] = "too many redirects"
+                    return
+                target = urljoin(target, response.headers["Location"])
+                continue
+            if response.status == 304 and entry is not None:
+                report.not_modified += 1
+                return
+            if response.status in RETRY_STATUSES and attempt < self.retries:
+                await asyncio.sleep(self._delay(attempt, response.headers.get("Retry-After")))
+                attempt += 1
+                continue
+            if response.status != 200:
+                report.failures[url] = f"HTTP {response.status}"
+                return
+
+            self.cache.store(url, response.body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            report.downloaded += 1
+            return
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(max(0.0, float(retry_after)), MAX_RETRY_AFTER)
+            except ValueError:
+                try:
+                    return min(max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()), MAX_RETRY_AFTER)
+                except (TypeError, ValueError):
+                    pass
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def fetch_all(self, urls: Iterable[str]) -> FetchReport:
+        report = FetchReport()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            await asyncio.gather(*(self.fetch(url, semaphore, report) for url in dict.fromkeys(urls)))
+        finally:
+            self.pool.close()
+        return report
+
+
+def fetch_album_art(urls: Iterable[Optional[str]], cache: ArtCache, concurrency: int = DEFAULT_CONCURRENCY, revalidate: bool = True) -> FetchReport:
+    """
+    Fetches the distinct, non-empty `urls` into `cache` and decodes their thumbnails.
+
+    Afterwards `cache.thumbnail(url)` serves the art from disk, e.g. in render workers.
+    """
+    urls = list(dict.fromkeys(url for url in urls if url))
+    fetcher = AlbumArtFetcher(cache, concurrency, revalidate=revalidate)
+    report = asyncio.run(fetcher.fetch_all(urls))
+    for url in urls:
+        if url in report.failures:
+            continue
+        try:
+            cache.thumbnail(url)
+        except (OSError, Image.DecompressionBombError) as e:
+            report.failures[url] = f"cannot decode: {e}"
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the album art of a song database into a cache.")
+    parser.add_argument("music_db_path", help="Path to the music database file", type=Path)
+    parser.add_argument("--cache-dir", help="Directory of the album art cache", type=Path, default=Path("out/album_art"))
+    parser.add_argument("-c", "--concurrency", help="Maximum number of requests in flight", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--no-revalidate", help="Use cached art without asking the server whether it changed", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.music_db_path, "r") as file:
+        urls = [song.get("image") for song in json.load(file)]
+
+    start_time = time.time()
+    report = fetch_album_art(urls, ArtCache(args.cache_dir), args.concurrency, not args.no_revalidate)
+    for url, error in report.failures.items():
+        print(f"Failed to fetch {url}: {error}")
+    print(f"Downloaded {report.downloaded}, {report.not_modified} unchanged, {len(report.failures)} failed")
+    print(f"Time taken: {time.time() - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+# Largest side of the decoded art; a song card is 700px wide
+ART_SIZE = 400
+
+
+class ArtCache:
+    """
+    Content-addressed on-disk cache for downloaded album art.
+
+    Downloads are stored once per content hash under `blobs/`. Each URL has a small
+    JSON entry under `urls/` pointing at its blob together with the ETag and
+    Last-Modified validators, so later runs only send conditional requests. Decoded
+    thumbnails live under `thumbs/` and are what the card renderers read.
+    """
+
+    def __init__(self, cache_dir: Path, size: int = ART_SIZE):
+        self.cache_dir = cache_dir
+        self.size = size
+        for folder in ("blobs", "urls", "thumbs"):
+            (cache_dir / folder).mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _entry_path(self, url: str) -> Path:
+        return self.cache_dir / "urls" / f"{self._hash(url.encode('utf-8'))}.json"
+
+    def blob_path(self, digest: str) -> Path:
+        return self.cache_dir / "blobs" / digest[:2] / digest
+
+    def thumbnail_path(self, digest: str) -> Path:
+        return self.cache_dir / "thumbs" / f"{digest}-{self.size}.png"
+
+    def entry(self, url: str) -> Optional[dict]:
+        """Cached validators and blob hash of `url`, if its blob is still there."""
+        try:
+            entry = json.loads(self._entry_path(url).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        return entry if self.blob_path(entry["sha256"]).exists() else None
+
+    def store(self, url: str, data: bytes, etag: Optional[str], last_modified: Optional[str]) -> str:
+        digest = self._hash(data)
+        path = self.blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            _write_atomic(path, data)
+        _write_atomic(self._entry_path(url), json.dumps({"url": url, "sha256": digest, "etag": etag, "last_modified": last_modified}).encode())
+        return digest
+
+    def thumbnail(self, url: Optional[str]) -> Optional[bytes]:
+        """Decoded art of `url` as PNG, or None if it was never fetched. Never touches the network."""
+        if not url:
+            return None
+        entry = self.entry(url)
+        if entry is None:
+            return None
+        path = self.thumbnail_path(entry["sha256"])
+        if not path.exists():
+            from PIL import Image
+
+            try:
+                _write_atomic(path, decode_art(self.blob_path(entry["sha256"]).read_bytes(), self.size))
+            except (OSError, Image.DecompressionBombError):
+                # Art that cannot be decoded leaves the card without it instead of failing the render
+                return None
+        return path.read_bytes()
+
+
+def _write_atomic(path: Path, data: bytes):
+    # Write to a private file first so concurrent processes never see half a file
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def decode_art(data: bytes, size: int = ART_SIZE) -> bytes:
+    """
+    Decodes album art into a square PNG of at most `size` pixels.
+
+    `draft` lets the JPEG decoder scale down by a power of two while decoding, so a
+    large cover never has to be held in memory at full resolution.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (size, size))
+        image = image.convert("RGB")
+        side = min(image.size)
+        left, top = (image.width - side) // 2, (image.height - side) // 2
+        image = image.crop((left, top, left + side, top + side))
+        image.thumbnail((size, size))
+        output = io.BytesIO()
+        image.save(output, format="PNG", optimize=True)
+        return output.getvalue()
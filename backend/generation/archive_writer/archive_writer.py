@@ -0,0 +1,113 @@
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Iterable, Optional, Sequence, overload
+from generation.render_pool.render_pool import RenderPool, TaskFailure, TaskReport
+
+COMPRESSION_POLICIES = ("auto", "stored", "deflated")
+# Formats that are compressed already; deflating them again costs time and saves nothing
+PRECOMPRESSED_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".zip", ".pdf"}
+
+
+def entry_compression(entry_name: str, policy: str = "auto") -> int:
+    """Zip compression method for one entry under the given policy."""
+    if policy == "stored":
+        return zipfile.ZIP_STORED
+    if policy == "deflated":
+        return zipfile.ZIP_DEFLATED
+    if policy != "auto":
+        raise ValueError(f"Unknown compression policy {policy!r}, expected one of {COMPRESSION_POLICIES}")
+    if PurePosixPath(entry_name).suffix.lower() in PRECOMPRESSED_SUFFIXES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+class ArchiveWriter:
+    """
+    Zip archive that renderers write into as each asset is produced.
+
+    Every entry is compressed according to `compression` (see `entry_compression`),
+    so PNGs are stored as they are while text like SVG is deflated.
+    """
+
+    def __init__(self, archive_path: Path, compression: str = "auto"):
+        entry_compression("", compression)
+        self.archive_path = archive_path
+        self.compression = compression
+        self._zip = zipfile.ZipFile(archive_path, "w")
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    def write(self, entry_name: str, data: bytes):
+        self._zip.writestr(entry_name, data, compress_type=entry_compression(entry_name, self.compression))
+
+    def write_all(self, entries: Iterable[tuple[str, bytes]]):
+        for entry_name, data in entries:
+            self.write(entry_name, data)
+
+    def write_tasks(self, pool: RenderPool, fn: Callable[[Any], bytes], items: Sequence[Any], entry_name: Callable[[Any], str], desc: str, unit: str = "item", key: Callable[[Any], Any] = lambda item: item) -> TaskReport:
+        """
+        Runs `fn` over all items and writes each result as soon as it arrives, in input order.
+
+        The report holds the entry names instead of the data; failed items keep their slot as None.
+        """
+        report = TaskReport()
+        for item, result in pool.imap(fn, items, desc, unit, key, report):
+            if isinstance(result, TaskFailure):
+                report.failures.append(result)
+                report.results.append(None)
+            else:
+                name = entry_name(item)
+                self.write(name, result)
+                report.results.append(name)
+        return report
+
+
+class ArchiveImages(Sequence[bytes]):
+    """
+    Read-only list of archive entries, loaded one at a time when accessed.
+
+    Lets the PDF writer take its images from the finished archive instead of a
+    directory or a fully loaded list. Slices return plain lists of bytes; `view`
+    returns a lazy sub-list that pickles as the entry names only, so a PDF shard
+    reads the images of its own pages in the worker.
+    """
+
+    def __init__(self, archive_path: Path, entry_names: Sequence[str]):
+        self.archive_path = archive_path
+        self.entry_names = list(entry_names)
+        self._zip: Optional[zipfile.ZipFile] = None
+
+    def __len__(self) -> int:
+        return len(self.entry_names)
+
+    @overload
+    def __getitem__(self, index: int) -> bytes: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[bytes]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.archive_path, "r")
+        return self._zip.read(self.entry_names[index])
+
+    def view(self, start: int, stop: int) -> "ArchiveImages":
+        return ArchiveImages(self.archive_path, self.entry_names[start:stop])
+
+    def __getstate__(self) -> dict[str, Any]:
+        # An open zip file cannot be sent to a worker process
+        return {**self.__dict__, "_zip": None}
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
@@ -0,0 +1,180 @@
+import argparse
+import json
+import time
+import zipfile
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Optional, Sequence
+from PIL import Image
+from generation.profiling.profiling import profile_stage
+from generation.dataset_info.dataset_info import song_card_mode
+
+DEFAULT_SHEET_SIZE = 8192
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+# Same modes as in the PDF: QR codes are pure black and white, song cards grayscale
+KIND_MODES = {"song_cards": "L", "qr_codes": "1"}
+
+
+@dataclass
+class Placement:
+    sheet: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+@dataclass
+class AtlasReport:
+    """Sheets written per kind and the entries that could not be packed, as (kind, name, reason)."""
+    sheets: dict[str, list[Path]] = field(default_factory=dict)
+    images: int = 0
+    skipped: list[tuple[str, str, str]] = field(default_factory=list)
+
+
+def image_id(name: str) -> int:
+    """Id of a card file like `card-12.png` or `qr_codes/code-3.png`."""
+    return int(PurePosixPath(name).stem.split("-")[-1])
+
+
+def pack_shelves(sizes: Sequence[tuple[int, int]], sheet_size: int, padding: int = 0) -> list[Placement]:
+    """
+    Places rectangles on square sheets in input order, left to right in rows (shelves).
+
+    Cards of a deck all have the same size, so this fills every sheet as a tight grid
+    and keeps neighbouring ids next to each other.
+    """
+    placements = []
+    sheet = x = y = shelf_height = 0
+    for width, height in sizes:
+        if width > sheet_size or height > sheet_size:
+            raise ValueError(f"a {width}×{height} image does not fit on a {sheet_size}×{sheet_size} sheet")
+        if x + width > sheet_size:
+            x, y, shelf_height = 0, y + shelf_height + padding, 0
+        if y + height > sheet_size:
+            sheet, x, y, shelf_height = sheet + 1, 0, 0, 0
+        placements.append(Placement(sheet, x, y, width, height))
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+    return placements
+
+
+def write_sheets(kind: str, images: Sequence[tuple[int, bytes]], output_dir: Path, sheet_size: int = DEFAULT_SHEET_SIZE, padding: int = 0, mode: Optional[str] = None) -> tuple[list[Path], dict[int, Placement]]:
+    """
+    Packs the PNG `images` of one kind, given as (id, data) in id order, into `<kind>-<n>.png` sheets.
+
+    Each sheet is only as large as the cards on it. Returns the sheet files and the placement of every id.
+    """
+    mode = mode or KIND_MODES.get(kind)
+    sizes = []
+    for _, data in images:
+        # Opening only reads the header, the pixels are decoded when the card is pasted
+        with Image.open(BytesIO(data)) as image:
+            sizes.append(image.size)
+    placements = pack_shelves(sizes, sheet_size, padding)
+
+    sheet_paths = []
+    for sheet in range(placements[-1].sheet + 1 if placements else 0):
+        on_sheet = [(data, placement) for (_, data), placement in zip(images, placements) if placement.sheet == sheet]
+        width = max(placement.x + placement.width for _, placement in on_sheet)
+        height = max(placement.y + placement.height for _, placement in on_sheet)
+        canvas = Image.new(mode or "RGB", (width, height), "white")
+        for data, placement in on_sheet:
+            with Image.open(BytesIO(data)) as image:
+                canvas.paste(image.convert(canvas.mode), (placement.x, placement.y))
+        path = output_dir / f"{kind}-{sheet}.png"
+        canvas.save(path, optimize=True)
+        sheet_paths.append(path)
+    return sheet_paths, {i: placement for (i, _), placement in zip(images, placements)}
+
+
+def build_atlas(kinds: dict[str, Sequence[tuple[int, bytes]]], output_dir: Path, sheet_size: int = DEFAULT_SHEET_SIZE, padding: int = 0, report: Optional[AtlasReport] = None, song_card_mode: Optional[str] = None) -> AtlasReport:
+    """
+    Writes one set of sheets per kind (song_cards, qr_codes) and an `index.json` mapping ids to sheet rectangles.
+
+    `song_card_mode` overrides the grayscale song card sheets, "RGB" for cards with album art.
+
+    Index layout: {"version", "sheets": {kind: [file, ...]}, kind: {id: [sheet, x, y, width, height]}}.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    report = report or AtlasReport()
+    index: dict = {"version": INDEX_VERSION, "sheets": {}}
+    with profile_stage("atlas") as stage:
+        for kind, images in kinds.items():
+            if not images:
+                continue
+            sheet_paths, placements = write_sheets(kind, images, output_dir, sheet_size, padding, song_card_mode if kind == "song_cards" else None)
+            report.sheets[kind] = sheet_paths
+            report.images += len(placements)
+            index["sheets"][kind] = [path.name for path in sheet_paths]
+            index[kind] = {str(i): [p.sheet, p.x, p.y, p.width, p.height] for i, p in placements.items()}
+        stage.add_items(report.images)
+    (output_dir / INDEX_NAME).write_text(json.dumps(index, separators=(",", ":")))
+    return report
+
+
+def _collect(entries: Iterable[tuple[str, str]], read, report: AtlasReport) -> dict[str, list[tuple[int, bytes]]]:
+    kinds: dict[str, list[tuple[int, bytes]]] = {kind: [] for kind in KIND_MODES}
+    for kind, name in entries:
+        if PurePosixPath(name).suffix.lower() != ".png":
+            # Vector QR codes have no pixels to pack
+            report.skipped.append((kind, name, "not a PNG"))
+            continue
+        try:
+            i = image_id(name)
+        except ValueError:
+            report.skipped.append((kind, name, "no id in the file name"))
+            continue
+        kinds[kind].append((i, read(name)))
+    for images in kinds.values():
+        images.sort(key=lambda item: item[0])
+    return kinds
+
+
+def atlas_from_archive(archive_path: Path, output_dir: Path, sheet_size: int = DEFAULT_SHEET_SIZE, padding: int = 0, song_card_mode: Optional[str] = None) -> AtlasReport:
+    """Builds the atlas of a dataset from the song_cards/ and qr_codes/ entries of its raw.zip."""
+    report = AtlasReport()
+    with zipfile.ZipFile(archive_path, "r") as archive:
+        entries = [(name.split("/")[0], name) for name in archive.namelist() if name.split("/")[0] in KIND_MODES and not name.endswith("/")]
+        kinds = _collect(entries, archive.read, report)
+    return build_atlas(kinds, output_dir, sheet_size, padding, report, song_card_mode)
+
+
+def atlas_from_directories(directories: dict[str, Optional[Path]], output_dir: Path, sheet_size: int = DEFAULT_SHEET_SIZE, padding: int = 0, song_card_mode: Optional[str] = None) -> AtlasReport:
+    """Builds the atlas from the image directories written by `convert_songs_to_image_cards` and `generate_qr_codes`."""
+    report = AtlasReport()
+    entries = [(kind, str(path)) for kind, directory in directories.items() if directory is not None for path in directory.iterdir() if path.is_file()]
+    kinds = _collect(entries, lambda name: Path(name).read_bytes(), report)
+    return build_atlas(kinds, output_dir, sheet_size, padding, report, song_card_mode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack song card and QR code images into a few atlas sheets with an id index.")
+    parser.add_argument("--song-cards", type=Path, help="Directory of song card PNGs (card-<id>.png)")
+    parser.add_argument("--qr-codes", type=Path, help="Directory of QR code PNGs (code-<id>.png)")
+    parser.add_argument("--archive", type=Path, help="raw.zip of a built dataset, instead of the directories")
+    parser.add_argument("-o", "--output", type=Path, default=Path("out/atlas"), help="Output directory for the sheets and index.json")
+    parser.add_argument("--sheet-size", type=int, default=DEFAULT_SHEET_SIZE, help="Maximum width and height of a sheet in pixels")
+    parser.add_argument("--padding", type=int, default=0, help="Gap between cards in pixels")
+    parser.add_argument("--color-cards", action="store_true", help="Keep the song cards in colour, for cards with album art")
+    args = parser.parse_args()
+
+    if args.archive is None and args.song_cards is None and args.qr_codes is None:
+        parser.error("give --archive or at least one of --song-cards and --qr-codes")
+
+    start_time = time.time()
+    card_mode = song_card_mode(args.color_cards)
+    if args.archive is not None:
+        report = atlas_from_archive(args.archive, args.output, args.sheet_size, args.padding, card_mode)
+    else:
+        report = atlas_from_directories({"song_cards": args.song_cards, "qr_codes": args.qr_codes}, args.output, args.sheet_size, args.padding, card_mode)
+    for kind, name, reason in report.skipped:
+        print(f"Skipped {name}: {reason}")
+    print(f"Packed {report.images} images into {sum(len(paths) for paths in report.sheets.values())} sheets in {args.output}")
+    print(f"Time taken: {time.time() - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import os
+import time
+import zipfile
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Optional, Sequence
+from generation.models.song import Song
+from generation.card_generator.generate_song_card import height as card_height, layout_song_card, width as card_width
+from generation.qr_code_generator.code_generation import QRCode, render_qr_code, render_qr_code_svg
+from generation.qr_code_generator.qr_settings import QRSettings, deck_qr_settings
+from generation.render_pool.render_pool import resolve_jobs
+from generation.archive_writer.archive_writer import entry_compression
+
+# Cards rendered to calibrate the cost model, one full sheet
+PLAN_SAMPLES = 8
+# Helvetica has the metrics of Arial, the font of the song cards
+FONT = "Helvetica"
+ASCENT, DESCENT = 0.72, 0.21
+# Size of the end of central directory record that closes every zip file
+EMPTY_ZIP_SIZE = 22
+
+
+@dataclass
+class PlanIssue:
+    """A problem found in songs.json. Errors make the build fail or produce a broken deck; warnings do not."""
+    message: str
+    song_id: Optional[int] = None
+    error: bool = True
+
+    def __str__(self) -> str:
+        return f"song {self.song_id}: {self.message}" if self.song_id is not None else self.message
+
+
+@dataclass
+class StageEstimate:
+    name: str
+    items: int
+    seconds_per_item: float
+    seconds: float
+
+
+@dataclass
+class BuildPlan:
+    """Validation result and cost estimate of a build, without rendering the deck."""
+    songs: list[Song]
+    issues: list[PlanIssue]
+    qr_settings: Optional[QRSettings] = None
+    workers: int = 1
+    pages: int = 0
+    stages: list[StageEstimate] = field(default_factory=list)
+    archive_bytes: int = 0
+    pdf_bytes: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not any(issue.error for issue in self.issues)
+
+    @property
+    def seconds(self) -> float:
+        return sum(stage.seconds for stage in self.stages)
+
+
+def _text_box(line) -> tuple[float, float, float, float]:
+    """Approximate (left, top, right, bottom) of a card text line in card pixels."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    text_width = stringWidth(line.text, FONT, line.font_size)
+    if line.anchor == "end":
+        left = line.x - text_width
+    elif line.anchor == "start":
+        left = line.x
+    else:
+        left = line.x - text_width / 2
+    return left, line.y - ASCENT * line.font_size, left + text_width, line.y + DESCENT * line.font_size
+
+
+def card_text_problems(song: Song) -> list[str]:
+    """Lines of a song card that leave the card or run into each other, e.g. a long title into the year."""
+    boxes = [(line.text, _text_box(line)) for line in layout_song_card(song)]
+    problems = []
+    for index, (text, (left, top, right, bottom)) in enumerate(boxes):
+        if left < 0 or top < 0 or right > card_width or bottom > card_height:
+            problems.append(f"{text!r} does not fit on the card")
+        for other, (other_left, other_top, other_right, other_bottom) in boxes[index + 1:]:
+            if left < other_right and other_left < right and top < other_bottom and other_top < bottom:
+                problems.append(f"{text!r} runs into {other!r}")
+    return problems
+
+
+def validate_songs(entries: Any) -> tuple[list[Song], list[PlanIssue]]:
+    """
+    Checks the raw entries of songs.json in one pass. Returns the parsed songs, sorted by id, and the issues.
+
+    QR codes are numbered by position while the app looks songs up by id, so the ids have to run from 1 without gaps.
+    """
+    if not isinstance(entries, list):
+        return [], [PlanIssue("songs.json must contain a list of songs")]
+    songs: list[Song] = []
+    issues: list[PlanIssue] = []
+    ids: set[int] = set()
+    for index, entry in enumerate(entries):
+        try:
+            song = Song(**entry)
+        except TypeError as e:
+            issues.append(PlanIssue(f"entry {index} is not a song: {e}"))
+            continue
+        if not isinstance(song.id, int) or isinstance(song.id, bool):
+            issues.append(PlanIssue(f"entry {index} has the id {song.id!r}, expected an integer"))
+            continue
+        if song.id in ids:
+            issues.append(PlanIssue("duplicate id", song.id))
+            continue
+        ids.add(song.id)
+        if song.year in (None, "", 0):
+            issues.append(PlanIssue("missing year", song.id))
+        issues.extend(PlanIssue(problem, song.id, error=False) for problem in card_text_problems(song))
+        songs.append(song)
+
+    if not entries:
+        issues.append(PlanIssue("songs.json contains no songs"))
+    expected = set(range(1, len(songs) + 1))
+    if ids != expected:
+        missing = sorted(expected - ids)
+        extra = sorted(ids - expected)
+        first = min(missing) if missing else len(songs) + 1
+        issues.append(PlanIssue(
+            f"ids must run from 1 to {len(songs)} without gaps (missing {_id_list(missing)}, out of range {_id_list(extra)}); "
+            f"from card {first} on the QR codes would open the wrong songs"
+        ))
+    songs.sort(key=lambda song: song.id)
+    return songs, issues
+
+
+def vector_card_issues(songs: Sequence[Song]) -> list[PlanIssue]:
+    """Songs with characters the vector card font lacks. Their cards go into the PDF as PNGs instead."""
+    from generation.pdf_generator.models.cards.song_text_card import SongTextCard
+    from generation.pdf_generator.models.cards.text_card import card_font
+
+    font = card_font()
+    return [PlanIssue(f"text not covered by the vector card font {font}, drawn as a PNG card instead", song.id, error=False) for song in songs if not SongTextCard.can_draw(song)]
+
+
+def _id_list(ids: Sequence[int], limit: int = 5) -> str:
+    if not ids:
+        return "none"
+    shown = ", ".join(str(i) for i in ids[:limit])
+    return f"{shown} and {len(ids) - limit} more" if len(ids) > limit else shown
+
+
+def _timed(fn, items: Sequence[Any]) -> tuple[list[Any], float]:
+    """Results of `fn` over `items` and the mean seconds per item. A first untimed call loads fonts and libraries."""
+    fn(items[0])
+    start = time.perf_counter()
+    results = [fn(item) for item in items]
+    return results, (time.perf_counter() - start) / len(items)
+
+
+def plan_build(songs: list[Song], issues: list[PlanIssue], qr_prefix: str, jobs: int = 1, vector_cards: bool = False, vector_qr_codes: bool = False, archive_compression: str = "auto", qr_min_error: str = "L", samples: int = PLAN_SAMPLES) -> BuildPlan:
+    """
+    Estimates pages, wall time per stage and output sizes of a build of `songs`.
+
+    The first `samples` cards are rendered and written to an in-memory archive and PDF;
+    the measured time and bytes per card are scaled to the whole deck and spread over
+    the worker processes. Nothing is estimated if validation found errors.
+    """
+    from generation.card_generator.generate_song_card import render_song_card
+    from generation.pdf_generator.generate_pdf import PDFCreator
+
+    plan = BuildPlan(songs, issues)
+    if not plan.ok:
+        return plan
+
+    count = len(songs)
+    plan.qr_settings = deck_qr_settings(qr_prefix, range(1, count + 1), qr_min_error)
+    # Workers beyond the CPU cores do not render any faster
+    plan.workers = workers = min(resolve_jobs(jobs), os.cpu_count() or 1)
+    sample_songs = songs[:samples]
+    sample_codes = [QRCode(f"{qr_prefix}{i}", i, plan.qr_settings) for i in range(1, len(sample_songs) + 1)]
+    entries: list[tuple[str, bytes]] = []
+
+    if vector_cards:
+        card_sources: list[Any] = sample_songs
+    else:
+        card_sources, per_card = _timed(render_song_card, sample_songs)
+        plan.stages.append(StageEstimate("song_cards", count, per_card, per_card * count / workers))
+        entries += [(f"song_cards/card-{song.id}.png", data) for song, data in zip(sample_songs, card_sources)]
+
+    if vector_qr_codes:
+        svgs, per_code = _timed(lambda code: render_qr_code_svg(code.data, code.id, code.settings).encode("utf-8"), sample_codes)
+        qr_sources: list[Any] = sample_codes
+        entries += [(f"qr_codes/code-{code.id}.svg", data) for code, data in zip(sample_codes, svgs)]
+    else:
+        qr_sources, per_code = _timed(lambda code: render_qr_code(code.data, code.id, code.settings), sample_codes)
+        entries += [(f"qr_codes/code-{code.id}.png", data) for code, data in zip(sample_codes, qr_sources)]
+    plan.stages.append(StageEstimate("qr_codes", count, per_code, per_code * count / workers))
+
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        for name, data in entries:
+            zip_file.writestr(name, data, compress_type=entry_compression(name, archive_compression))
+    plan.archive_bytes = round(EMPTY_ZIP_SIZE + (len(archive.getvalue()) - EMPTY_ZIP_SIZE) * count / len(sample_songs))
+
+    def write_pdf(cards: int) -> tuple[PDFCreator, int, float]:
+        buffer = BytesIO()
+        creator = PDFCreator(buffer, None, None, 1, max(cards, 1), songs=sample_songs, vector_cards=vector_cards, vector_qr_codes=vector_qr_codes, qr_code_prefix=qr_prefix, qr_settings=plan.qr_settings)
+        start = time.perf_counter()
+        creator.write_pages(qr_sources[:cards], card_sources[:cards])
+        return creator, len(buffer.getvalue()), time.perf_counter() - start
+
+    # The samples are distinct images that the PDF cannot share, so its size scales per card
+    creator, empty_pdf, _ = write_pdf(0)
+    _, sample_pdf, pdf_seconds = write_pdf(len(sample_songs))
+    per_card = pdf_seconds / len(sample_songs)
+    plan.pdf_bytes = round(empty_pdf + (sample_pdf - empty_pdf) * count / len(sample_songs))
+    plan.pages = 2 * creator.page_pair_count(count)
+    plan.stages.append(StageEstimate("pdf", count, per_card, per_card * count / workers))
+    return plan
@@ -3,17 +3,50 @@ import json
 from pathlib import Path
 from generation.models.song import Song
 import time
-from tqdm import tqdm
-from generation.card_generator.generate_song_card import generate_song_card
+from functools import partial
+from typing import Optional
+from generation.card_generator.generate_song_card import generate_song_card, render_song_card
+from generation.render_pool.render_pool import RenderPool, TaskReport, use_pool
+from generation.render_cache.render_cache import RenderCache
+from generation.album_art.art_cache import ArtCache
+from generation.archive_writer.archive_writer import ArchiveWriter
+from generation.profiling.profiling import profile_stage
 
-def convert_songs_to_image_cards(songs: list[Song], output_path: Path):
-    for song in tqdm(songs, desc="Generating song cards", unit="card"):
-        generate_song_card(song, output_path=output_path)
+def convert_songs_to_image_cards(songs: list[Song], output_path: Path, jobs: int = 1, pool: Optional[RenderPool] = None, cache: Optional[RenderCache] = None, art: Optional[ArtCache] = None) -> TaskReport:
+    """Renders one card per song into `output_path`. Failures are reported per song id."""
+    output_path.mkdir(parents=True, exist_ok=True)
+    render = partial(generate_song_card, output_path=output_path, cache=cache, art=art)
+
+    with profile_stage("song_cards") as stage, use_pool(pool, jobs) as p:
+        report = p.run(render, songs, desc="Generating song cards", unit="card", key=lambda song: song.id)
+        stage.add_report(report)
+        return report
+
+def render_songs_to_image_cards(songs: list[Song], jobs: int = 1, pool: Optional[RenderPool] = None, cache: Optional[RenderCache] = None, art: Optional[ArtCache] = None) -> TaskReport:
+    """Renders one card per song in memory. The report holds the PNG data in song order."""
+    render = partial(render_song_card, cache=cache, art=art)
+
+    with profile_stage("song_cards") as stage, use_pool(pool, jobs) as p:
+        report = p.run(render, songs, desc="Generating song cards", unit="card", key=lambda song: song.id)
+        stage.add_report(report)
+        return report
+
+def write_songs_to_archive(songs: list[Song], archive: ArchiveWriter, jobs: int = 1, pool: Optional[RenderPool] = None, cache: Optional[RenderCache] = None, art: Optional[ArtCache] = None) -> TaskReport:
+    """Renders one card per song straight into `archive`. The report holds the entry names in song order."""
+    render = partial(render_song_card, cache=cache, art=art)
+
+    with profile_stage("song_cards") as stage, use_pool(pool, jobs) as p:
+        report = archive.write_tasks(p, render, songs, lambda song: f"song_cards/card-{song.id}.png", desc="Generating song cards", unit="card", key=lambda song: song.id)
+        stage.add_report(report)
+        return report
 
 def main():
     parser = argparse.ArgumentParser(description="Process a file.")
     parser.add_argument("music_db_path", help="Path to the music database file", type=Path)
     parser.add_argument("-o", "--output", help="Output directory", type=Path, default=Path("out/song_cards"))
+    parser.add_argument("-j", "--jobs", help="Number of worker processes (0 = one per CPU core)", type=int, default=1)
+    parser.add_argument("--cache-dir", help="Directory of the render cache. Disabled if not given", type=Path, default=None)
+    parser.add_argument("--album-art-dir", help="Fetch album art into this cache and place it on the cards. Disabled if not given", type=Path, default=None)
 
     args = parser.parse_args()
 
@@ -37,8 +70,19 @@ def main():
 
             songs = [Song(**item) for item in data]
             start_time = time.time()
-            convert_songs_to_image_cards(songs, output_path)
+            cache = RenderCache(args.cache_dir) if args.cache_dir else None
+            art = ArtCache(args.album_art_dir) if args.album_art_dir else None
+            if art is not None:
+                from generation.album_art.album_art import fetch_album_art
+                art_report = fetch_album_art([song.image for song in songs], art)
+                print(f"Album art: {art_report.downloaded} downloaded, {art_report.not_modified} unchanged, {len(art_report.failures)} failed")
+            report = convert_songs_to_image_cards(songs, output_path, jobs=args.jobs, cache=cache, art=art)
             end_time = time.time()
+            for failure in report.failures:
+                print(f"Failed to generate card {failure}")
+            if cache is not None:
+                print(f"Render cache: {report.counters['cache_hits']} hits, {report.counters['cache_misses']} misses")
+                cache.prune()
             print(f"Generated {len(songs)} cards")
             print(f"Time taken: {end_time - start_time:.2f} seconds")
             print(f"Time taken per card: {(end_time - start_time) / len(songs):.4f} seconds")
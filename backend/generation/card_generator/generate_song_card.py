@@ -1,60 +1,87 @@
-import cairosvg
+import base64
 import textwrap
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
-from xml.sax.saxutils import escape
+from html import escape
 from generation.models.song import Song
+from generation.album_art.art_cache import ArtCache
+from generation.render_cache.render_cache import RenderCache, svg_to_png_bytes
 
 width, height = 700, 700
 max_chars_per_line = 30
 line_spacing = 60
 
 top_padding, bottom_padding = 40, 40
+# Album art is drawn faintly behind the text so the year stays readable
+art_opacity = 0.25
 
-def generate_song_card(song: Song, output_path: Path) -> Path:
-    """
-    Generates an SVG song card and converts it to PNG.
+@dataclass
+class TextLine:
+    """A single line of card text in card pixels, `y` being the baseline measured from the top."""
+    text: str
+    x: float
+    y: float
+    font_size: int
+    anchor: str = "middle"
+    color: str = "black"
 
-    Args:
-        song: The song object.
-        output_path: The desired output path or folder for the PNG file.
-    """
-    output_file = output_path if not output_path.is_dir() else output_path / f"card-{song.id}.png"
+def layout_song_card(song: Song) -> list[TextLine]:
+    """Lays out the text of a song card. Shared by the PNG renderer and the vector PDF cards."""
     wrapped_title = textwrap.wrap(song.title, max_chars_per_line)
     wrapped_author = textwrap.wrap(f"{song.artist}", max_chars_per_line)
     wrapped_year = textwrap.wrap(f"{song.year}", max_chars_per_line)
 
-    def create_multiline_text(lines, start_y, font_size, color):
-        text_elements = []
-        for i, line in enumerate(lines):
-            y_pos = start_y + (i * line_spacing)
-            text_elements.append(f'<text x="50%" y="{y_pos}" font-size="{font_size}" font-family="Arial" text-anchor="middle" fill="{color}">{escape(line)}</text>')
-        return "\n".join(text_elements)
+    def create_multiline_text(lines, start_y, font_size):
+        return [TextLine(line, width / 2, start_y + (i * line_spacing), font_size) for i, line in enumerate(lines)]
 
     title_start_y = (len(wrapped_title) * line_spacing // 2) + top_padding
     year_start_y = (height / 2) + ((len(wrapped_year) * line_spacing) / 2) + (line_spacing / 4)
     author_start_y = height - (len(wrapped_author) * line_spacing // 2) - bottom_padding
 
+    return [
+        *create_multiline_text(wrapped_author, author_start_y, 40),
+        *create_multiline_text(wrapped_year, year_start_y, 200),
+        *create_multiline_text(wrapped_title, title_start_y, 40),
+        # Song ID (Bottom Right)
+        TextLine(str(song.id), width - 20, height - 20, 20, anchor="end", color="gray"),
+    ]
+
+def song_card_svg(song: Song, art: Optional[bytes] = None) -> str:
+    """SVG source of a song card. `art` is PNG album art drawn behind the text."""
+    art_element = ""
+    if art is not None:
+        art_element = f'\n        <image width="{width}" height="{height}" opacity="{art_opacity}" preserveAspectRatio="xMidYMid slice" href="data:image/png;base64,{base64.b64encode(art).decode("ascii")}"/>'
+    text_elements = "\n".join(
+        f'<text x="{line.x}" y="{line.y}" font-size="{line.font_size}" font-family="Arial" text-anchor="{line.anchor}" fill="{line.color}">{escape(line.text, quote=False)}</text>'
+        for line in layout_song_card(song)
+    )
+
     # Construct SVG
-    svg_content = f"""
+    return f"""
     <svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">
         <!-- Background -->
-        <rect width="100%" height="100%" fill="white"/>
-
-        <!-- Wrapped Artist -->
-        {create_multiline_text(wrapped_author, author_start_y, 40, "black")}
+        <rect width="100%" height="100%" fill="white"/>{art_element}
 
-        <!-- Wrapped Year -->
-        {create_multiline_text(wrapped_year, year_start_y, 200, "black")}
+        {text_elements}
+    </svg>
+    """
 
-        <!-- Wrapped Title -->
-        {create_multiline_text(wrapped_title, title_start_y, 40, "black")}
+def render_song_card(song: Song, cache: Optional[RenderCache] = None, art: Optional[ArtCache] = None) -> bytes:
+    """Renders a song card and returns the PNG data. Art already fetched into `art` is placed on the card."""
+    return svg_to_png_bytes(song_card_svg(song, art.thumbnail(song.image) if art else None), width, height, cache)
 
-        <!-- Song ID (Bottom Right) -->
-        <text x="{width - 20}" y="{height - 20}" font-size="20" font-family="Arial" text-anchor="end" fill="gray">{escape(str(song.id))}</text>
-    </svg>
+def generate_song_card(song: Song, output_path: Path, cache: Optional[RenderCache] = None, art: Optional[ArtCache] = None) -> Path:
     """
+    Generates an SVG song card and converts it to PNG.
 
-    cairosvg.svg2png(bytestring=svg_content.encode('utf-8'), write_to=str(output_file.absolute()), output_width=width, output_height=height)
+    Args:
+        song: The song object.
+        output_path: The desired output path or folder for the PNG file.
+        cache: Optional render cache to reuse previously rasterized cards.
+        art: Optional album art cache, filled beforehand with `fetch_album_art`.
+    """
+    output_file = output_path if not output_path.is_dir() else output_path / f"card-{song.id}.png"
+    output_file.write_bytes(render_song_card(song, cache, art))
 
     return output_file
@@ -0,0 +1,27 @@
+import json
+from pathlib import Path
+from typing import Any
+
+# Set when the song cards carry album art, which is in colour
+ALBUM_ART_KEY = "album_art"
+# Compression policy of the raw.zip entries, see archive_writer.entry_compression
+COMPRESSION_KEY = "archive_compression"
+
+
+def read_info(info_path: Path) -> dict[str, Any]:
+    with open(info_path, 'r') as f:
+        return json.load(f)
+
+
+def update_info(info_path: Path, **entries: Any):
+    """Records build options in a dataset's info.json, so updates and exports treat it like the original build."""
+    info = read_info(info_path)
+    info.update(entries)
+    with open(info_path, 'w') as f:
+        json.dump(info, f, indent=2)
+        f.write("\n")
+
+
+def song_card_mode(album_art: bool) -> str:
+    """Image mode of the song cards in the PDF and atlas: grayscale, unless album art makes them colour."""
+    return "RGB" if album_art else "L"
@@ -0,0 +1,224 @@
+import json
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+from pypdf import PdfReader, PdfWriter
+from generation.card_generator.card_generator import render_songs_to_image_cards
+from generation.models.song import Song
+from generation.pdf_generator.generate_pdf import PDFCreator
+from generation.qr_code_generator.code_generation import QRCode, render_qr_codes
+from generation.qr_code_generator.qr_settings import QRSettings, deck_qr_settings, settings_from_info, store_settings
+from generation.render_cache.render_cache import RenderCache
+from generation.album_art.art_cache import ArtCache
+from generation.album_art.album_art import fetch_album_art
+from generation.render_pool.render_pool import RenderPool, TaskFailure, use_pool
+from generation.archive_writer.archive_writer import entry_compression
+from generation.dataset_info.dataset_info import ALBUM_ART_KEY, COMPRESSION_KEY, song_card_mode, update_info
+
+
+@dataclass
+class SongDiff:
+    """Differences between two song lists, both sorted by id. Positions are indices into the sorted lists."""
+    old_count: int
+    new_count: int
+    changed_positions: list[int] = field(default_factory=list)
+    # Set when the deck needs another QR version or error level, which changes every code
+    qr_settings_changed: bool = False
+
+    @property
+    def new_qr_codes(self) -> range:
+        if self.qr_settings_changed:
+            return range(1, self.new_count + 1)
+        # QR codes encode the position, so only positions past the old deck need new codes
+        return range(self.old_count + 1, self.new_count + 1)
+
+    def dirty_pairs(self, chunk_size: int) -> list[int]:
+        """Page pairs that show a changed card or lost one, limited to the pairs of the new deck."""
+        pair_count = -(-self.new_count // chunk_size)
+        if self.qr_settings_changed:
+            return list(range(pair_count))
+        positions = set(self.changed_positions).union(range(self.new_count, self.old_count))
+        return sorted({position // chunk_size for position in positions if position // chunk_size < pair_count})
+
+
+@dataclass
+class UpdateReport:
+    diff: SongDiff
+    qr_settings: Optional[QRSettings] = None
+    rebuilt_pairs: list[int] = field(default_factory=list)
+    failures: list[TaskFailure] = field(default_factory=list)
+
+
+def diff_songs(old_songs: list[Song], new_songs: list[Song]) -> SongDiff:
+    diff = SongDiff(len(old_songs), len(new_songs))
+    for position, (old, new) in enumerate(zip(old_songs, new_songs)):
+        if old != new:
+            diff.changed_positions.append(position)
+    # Positions past the old deck are new cards
+    diff.changed_positions.extend(range(len(old_songs), len(new_songs)))
+    return diff
+
+
+def load_songs(file_path: Path) -> list[Song]:
+    with open(file_path, 'r') as f:
+        return sorted((Song(**song) for song in json.load(f)), key=lambda song: song.id)
+
+
+def update_dataset(dataset_output: Path, dataset: Path, jobs: int = 1, pool: Optional[RenderPool] = None, cache: Optional[RenderCache] = None, art: Optional[ArtCache] = None, qr_min_error: Optional[str] = None) -> UpdateReport:
+    """
+    Brings an existing dataset directory in line with a new songs file.
+
+    Only cards whose song changed are rendered again and only the page pairs that
+    contain them are rebuilt; every other page is copied over from the old cards.pdf.
+    With `art`, the album art of the changed songs is fetched and placed on their cards.
+
+    The QR settings stored in info.json are kept while they fit the deck. If the deck
+    outgrows them or `qr_min_error` differs from the stored level, every QR code and
+    page pair is rebuilt, so all codes of the deck keep the same size.
+    """
+    songs_json_path = dataset_output / "songs.json"
+    pdf_path = dataset_output / "cards.pdf"
+    archive_path = dataset_output / "raw.zip"
+    info_path = dataset_output / "info.json"
+    with open(info_path, 'r') as f:
+        info = json.load(f)
+    prefix = f"{info['name']};id="
+
+    old_songs = load_songs(songs_json_path)
+    new_songs = load_songs(dataset)
+    diff = diff_songs(old_songs, new_songs)
+    report = UpdateReport(diff)
+    if diff.new_count == 0:
+        raise ValueError(f"{dataset} contains no songs")
+
+    old_settings, old_min_error = settings_from_info(info)
+    min_error = qr_min_error or old_min_error
+    payloads = [f"{prefix}{i}" for i in range(1, diff.new_count + 1)]
+    if old_settings is not None and min_error == old_min_error and old_settings.fits(payloads):
+        qr_settings = old_settings
+    else:
+        qr_settings = deck_qr_settings(prefix, range(1, diff.new_count + 1), min_error)
+    diff.qr_settings_changed = qr_settings != old_settings
+    report.qr_settings = qr_settings
+    if not diff.changed_positions and diff.old_count == diff.new_count and not diff.qr_settings_changed:
+        return report
+
+    with zipfile.ZipFile(archive_path, 'r') as archive:
+        names = set(archive.namelist())
+    # Keep building the dataset the way it was built originally
+    vector_cards = not any(name.startswith("song_cards/") and not name.endswith("/") for name in names)
+    vector_qr_codes = any(name.startswith("qr_codes/") and name.endswith(".svg") for name in names)
+    qr_format = "svg" if vector_qr_codes else "png"
+    # Once a card has album art the deck keeps colour cards, even if later updates place none
+    album_art = info.get(ALBUM_ART_KEY, False) or (art is not None and not vector_cards)
+
+    changed_songs = [new_songs[position] for position in diff.changed_positions]
+    with use_pool(pool, jobs) as p:
+        if vector_cards:
+            card_images = {}
+        else:
+            if art is not None:
+                # Art that cannot be fetched just leaves the card without it
+                fetch_album_art([song.image for song in changed_songs], art)
+            cards_report = render_songs_to_image_cards(changed_songs, pool=p, cache=cache, art=art)
+            report.failures += cards_report.failures
+            card_images = {song.id: data for song, data in zip(changed_songs, cards_report.results)}
+
+        qr_report = render_qr_codes(prefix, diff.new_qr_codes, pool=p, file_format=qr_format, settings=qr_settings)
+        report.failures += qr_report.failures
+        qr_images = dict(zip(diff.new_qr_codes, qr_report.results))
+
+    if report.failures:
+        return report
+
+    report.rebuilt_pairs = update_pdf(pdf_path, archive_path, diff, new_songs, card_images, qr_images, prefix, vector_cards, vector_qr_codes, qr_settings, song_card_mode(album_art))
+    # Datasets built before the policy was stored used the default one
+    update_archive(archive_path, new_songs, card_images, qr_images, qr_format, info.get(COMPRESSION_KEY, "auto"))
+    songs_json_path.write_bytes(dataset.read_bytes())
+    store_settings(info_path, qr_settings, min_error)
+    if album_art:
+        update_info(info_path, **{ALBUM_ART_KEY: True})
+
+    return report
+
+
+def update_pdf(pdf_path: Path, archive_path: Path, diff: SongDiff, songs: list[Song], card_images: dict[int, bytes], qr_images: dict[int, bytes], prefix: str, vector_cards: bool, vector_qr_codes: bool, qr_settings: Optional[QRSettings] = None, card_mode: str = "L") -> list[int]:
+    """Renders the dirty page pairs into a patch PDF and splices them between the untouched pages."""
+    with tempfile.TemporaryDirectory(dir=pdf_path.parent) as tmp:
+        patch_path = Path(tmp) / "patch.pdf"
+        patch_creator = PDFCreator(patch_path, None, None, 1, len(songs), song_card_mode=card_mode)
+        chunk_size = patch_creator.chunk_size
+        dirty_pairs = diff.dirty_pairs(chunk_size)
+
+        # Sources are only needed for the cards on dirty pages. Unchanged ones come out of the old archive
+        qr_codes: list = [None] * len(songs)
+        song_cards: list = [None] * len(songs)
+        with zipfile.ZipFile(archive_path, 'r') as archive:
+            for position in (p for pair in dirty_pairs for p in range(pair * chunk_size, min((pair + 1) * chunk_size, len(songs)))):
+                song = songs[position]
+                code_id = position + 1
+                if vector_qr_codes:
+                    qr_codes[position] = QRCode(f"{prefix}{code_id}", code_id, qr_settings)
+                else:
+                    qr_codes[position] = qr_images.get(code_id) or archive.read(f"qr_codes/code-{code_id}.png")
+                if vector_cards:
+                    song_cards[position] = song
+                else:
+                    song_cards[position] = card_images.get(song.id) or archive.read(f"song_cards/card-{song.id}.png")
+
+        patch_creator.write_pages(qr_codes, song_cards, dirty_pairs)
+
+        old_pages = PdfReader(pdf_path).pages
+        patch_pages = PdfReader(patch_path).pages
+        patch_index = {pair: index for index, pair in enumerate(dirty_pairs)}
+
+        writer = PdfWriter()
+        for pair in range(patch_creator.page_pair_count(len(songs))):
+            if pair in patch_index:
+                pages = patch_pages[2 * patch_index[pair]:2 * patch_index[pair] + 2]
+            else:
+                pages = old_pages[2 * pair:2 * pair + 2]
+            for page in pages:
+                writer.add_page(page)
+
+        updated_path = Path(tmp) / "cards.pdf"
+        with open(updated_path, "wb") as f:
+            writer.write(f)
+        os.replace(updated_path, pdf_path)
+
+    return dirty_pairs
+
+
+def update_archive(archive_path: Path, songs: list[Song], card_images: dict[int, bytes], qr_images: dict[int, bytes], qr_format: str, compression: str = "auto"):
+    """
+    Adds the new and changed images to raw.zip, compressed like the original build.
+
+    If entries only have to be added, they are appended in place. Replacing or
+    dropping entries needs a rewrite, which copies the untouched entries over.
+    """
+    new_entries = {f"song_cards/card-{song_id}.png": data for song_id, data in card_images.items()}
+    new_entries.update({f"qr_codes/code-{code_id}.{qr_format}": data for code_id, data in qr_images.items()})
+
+    with zipfile.ZipFile(archive_path, 'r') as archive:
+        old_names = [name for name in archive.namelist() if not name.endswith("/")]
+
+    kept_names = {f"song_cards/card-{song.id}.png" for song in songs}
+    kept_names.update(f"qr_codes/code-{code_id}.{qr_format}" for code_id in range(1, len(songs) + 1))
+
+    if all(name in kept_names and name not in new_entries for name in old_names):
+        with zipfile.ZipFile(archive_path, 'a') as archive:
+            for name, data in new_entries.items():
+                archive.writestr(name, data, compress_type=entry_compression(name, compression))
+        return
+
+    updated_path = archive_path.with_suffix(".zip.tmp")
+    with zipfile.ZipFile(archive_path, 'r') as archive, zipfile.ZipFile(updated_path, 'w') as updated:
+        for name in old_names:
+            if name in kept_names and name not in new_entries:
+                updated.writestr(archive.getinfo(name), archive.read(name))
+        for name, data in new_entries.items():
+            updated.writestr(name, data, compress_type=entry_compression(name, compression))
+    os.replace(updated_path, archive_path)
@@ -0,0 +1,83 @@
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from models.normalize import artist_names, title_key
+from models.song import Song
+
+DEDUP_MODES = ("off", "report", "merge")
+
+
+@dataclass
+class DuplicateGroup:
+    title_key: str
+    # Positions in the merged song list, in input order; the first one is kept.
+    indices: list[int]
+    songs: list[Song]
+
+
+def find_duplicates(songs: list[Song]) -> list[DuplicateGroup]:
+    """Group songs that are the same recording under different spellings.
+
+    Songs are blocked by normalized title (remix/remaster/featuring suffixes
+    removed), so only songs within a block are compared; inside a block two
+    songs match when their credited artists overlap. This is linear in the
+    number of songs apart from the rare large blocks.
+    """
+    blocks: dict[str, list[int]] = defaultdict(list)
+    for i, song in enumerate(songs):
+        key = title_key(song.title)
+        if key:
+            blocks[key].append(i)
+
+    # Union-find over song positions; only positions inside shared blocks are touched.
+    parent = list(range(len(songs)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    groups = []
+    for key, block in blocks.items():
+        if len(block) < 2:
+            continue
+
+        owner: dict[str, int] = {}
+        for i in block:
+            for name in artist_names(songs[i].artist):
+                j = owner.setdefault(name, i)
+                if j != i:
+                    a, b = root(i), root(j)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+
+        members: dict[int, list[int]] = defaultdict(list)
+        for i in block:
+            members[root(i)].append(i)
+        for indices in members.values():
+            if len(indices) > 1:
+                groups.append(DuplicateGroup(key, indices, [songs[i] for i in indices]))
+
+    groups.sort(key=lambda group: group.indices[0])
+    return groups
+
+
+def merge_group(songs: list[Song]) -> Song:
+    """Keep the first song, fill its missing album/image from the others and take the earliest year."""
+    first = songs[0]
+    return replace(
+        first,
+        year=min(song.year for song in songs),
+        album=first.album or next((s.album for s in songs if s.album), first.album),
+        image=first.image or next((s.image for s in songs if s.image), first.image),
+    )
+
+
+def merge_duplicates(songs: list[Song], groups: list[DuplicateGroup]) -> list[Song]:
+    """Replace every group by its merged song at the position of its first member."""
+    merged = list(songs)
+    dropped = set()
+    for group in groups:
+        merged[group.indices[0]] = merge_group(group.songs)
+        dropped.update(group.indices[1:])
+    return [song for i, song in enumerate(merged) if i not in dropped]
@@ -0,0 +1,118 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
+from pathlib import Path
+from dedup import DuplicateGroup, find_duplicates, merge_duplicates
+from models.song import Song
+from parsers.registry import detect_parser, get_parser, load_parsers
+from selection import SelectionRules
+
+INPUT_SUFFIXES = (".csv", ".json")
+
+
+@dataclass
+class FileStats:
+    file: str
+    parser: str
+    rows: int
+    songs: int
+    skipped: int
+    seconds: float
+
+
+@dataclass
+class ParsedFile:
+    stats: FileStats
+    songs: list[Song]
+
+
+def expand_inputs(paths: list[Path]) -> list[Path]:
+    """Replace directories with the CSV and JSON files they contain, in name order."""
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files += sorted(p for p in path.iterdir() if p.suffix.lower() in INPUT_SUFFIXES)
+        else:
+            files.append(path)
+    return files
+
+
+def parse_file(
+    file_path: Path,
+    parser_name: str | None = None,
+    plugins: tuple[str, ...] = (),
+    rules_path: Path | None = None,
+) -> ParsedFile:
+    """Parse one input file. Runs in a worker process, so the registry is loaded here.
+
+    `rules_path` replaces the parser's default selection rules.
+    """
+    load_parsers(plugins)
+    parser_cls = get_parser(parser_name) if parser_name else detect_parser(file_path)
+    rules = SelectionRules.load(rules_path) if rules_path else None
+
+    start = time.perf_counter()
+    parser = parser_cls(file_path=file_path, rules=rules)
+    songs = list(parser.parse())
+    seconds = time.perf_counter() - start
+
+    stats = FileStats(
+        file=str(file_path),
+        parser=parser_cls.name,
+        rows=parser.rows,
+        songs=len(songs),
+        skipped=parser.skipped,
+        seconds=round(seconds, 4),
+    )
+    return ParsedFile(stats=stats, songs=songs)
+
+
+def merge_songs(
+    parsed_files: list[ParsedFile],
+    keep_ids: bool = False,
+    dedup: str = "off",
+) -> tuple[list[Song], list[DuplicateGroup]]:
+    """Concatenate the files in input order and number the songs 1..n.
+
+    Within a file songs keep their source order by id, so the result only
+    depends on the input order, never on which worker finished first. With
+    `keep_ids` the source ids are kept and must be unique across files.
+    Duplicates are found before ids are assigned; `dedup="merge"` collapses
+    each group into its first song, `"report"` only returns the groups.
+    """
+    files = [parsed.stats.file for parsed in parsed_files for _ in parsed.songs]
+    songs = [song for parsed in parsed_files for song in sorted(parsed.songs, key=lambda s: s.id)]
+
+    groups = find_duplicates(songs) if dedup != "off" else []
+    if dedup == "merge":
+        dropped = {i for group in groups for i in group.indices[1:]}
+        files = [file for i, file in enumerate(files) if i not in dropped]
+        songs = merge_duplicates(songs, groups)
+
+    if not keep_ids:
+        return [replace(song, id=i) for i, song in enumerate(songs, start=1)], groups
+
+    seen: dict[int, str] = {}
+    for file, song in zip(files, songs):
+        if song.id in seen:
+            raise ValueError(f"Song id {song.id} in {file} already used by {seen[song.id]}.")
+        seen[song.id] = file
+    return songs, groups
+
+
+def ingest_files(
+    paths: list[Path],
+    parser_name: str | None = None,
+    jobs: int = 0,
+    plugins: tuple[str, ...] = (),
+    rules_path: Path | None = None,
+) -> list[ParsedFile]:
+    """Parse every file, in a process pool when there is more than one."""
+    jobs = jobs or os.cpu_count() or 1
+    task = partial(parse_file, parser_name=parser_name, plugins=plugins, rules_path=rules_path)
+    if jobs == 1 or len(paths) == 1:
+        return [task(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as executor:
+        return list(executor.map(task, paths))
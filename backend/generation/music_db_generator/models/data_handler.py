@@ -1,14 +1,29 @@
 import json
 from pathlib import Path
+from typing import Iterable, Iterator
 from models.song import Song
+from parsers.json.json_stream import iter_array
 
 class DataHandler:
     def __init__(self) -> None:
         pass
 
     @staticmethod
-    def save_to_json(file_path: Path | str, data: list[Song]):
-        data_dict = [d.dict() for d in data]
-
+    def save_to_json(file_path: Path | str, data: Iterable[Song]) -> int:
+        """Stream songs to a JSON array as they are produced; returns the number written."""
+        count = 0
         with open(file_path, 'w') as file:
-            json.dump(data_dict, file, indent=4)
+            file.write("[")
+            for song in data:
+                entry = json.dumps(song.dict(), indent=4).replace("\n", "\n    ")
+                file.write(("," if count else "") + "\n    " + entry)
+                count += 1
+            file.write("\n]" if count else "]")
+        return count
+
+    @staticmethod
+    def load_from_json(file_path: Path | str) -> Iterator[Song]:
+        """Stream songs back from a file written by save_to_json."""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for entry in iter_array(file):
+                yield Song(**entry)
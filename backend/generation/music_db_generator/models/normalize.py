@@ -0,0 +1,86 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+_APOSTROPHES = re.compile(r"['\u2019]")
+_NON_WORD = re.compile(r"[^\w]+")
+# Same result as the two regexes above for ASCII text, via bytes.translate.
+_ASCII_TABLE = bytes(c if chr(c).isalnum() or chr(c) == "_" else ord(" ") for c in range(128)) + bytes(range(128, 256))
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents: 'Beyoncé' -> 'beyonce'."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_text(text: str | None) -> str:
+    """Key for indexing and matching: folded, punctuation dropped, whitespace collapsed."""
+    if not text:
+        return ""
+    if text.isascii():
+        return b" ".join(text.lower().encode().translate(_ASCII_TABLE, b"'").split()).decode()
+    return " ".join(_NON_WORD.sub(" ", _APOSTROPHES.sub("", fold(text))).split())
+
+
+_FEATURING = r"(?:feat\.?|ft\.?|featuring)"
+_ARTIST_SEPARATORS = re.compile(rf"\s*(?:,|&|\+|/|;|\b{_FEATURING}(?=\s)|\bvs\.?(?=\s))\s*")
+_VERSION_WORDS = (
+    r"remix|mix|remaster(?:ed)?|live|version|edit|mono|stereo|acoustic|demo|"
+    rf"radio|single|extended|instrumental|from the vault|{_FEATURING}"
+)
+_TITLE_SUFFIXES = (
+    # "Song (2011 Remaster)", "Song [Radio Edit]", "Song (feat. X)"
+    re.compile(rf"\s*[(\[][^)\]]*\b(?:{_VERSION_WORDS})\b[^)\]]*[)\]]"),
+    # "Song - Live at Wembley", "Song - 2009 Remastered Version"
+    re.compile(rf"\s+-\s+.*\b(?:{_VERSION_WORDS})\b.*$"),
+    # "Song feat. X"
+    re.compile(rf"\s+{_FEATURING}\s.*$"),
+)
+# Cheap pre-check so plain titles skip the suffix patterns.
+_TITLE_SUFFIX_MARKERS = re.compile(r"[(\[]| - |\bf(?:ea)?t")
+
+
+@lru_cache(maxsize=1 << 18)
+def artist_names(artist: str | None) -> frozenset[str]:
+    """Normalized names credited in an artist string.
+
+    'DaBaby ft. Roddy Ricch' and 'DaBaby & Roddy Ricch' both give
+    {'dababy', 'roddy ricch', ...}; the whole credit with '&' spelled 'and' is
+    included too, so 'Simon & Garfunkel' still meets 'Simon and Garfunkel'.
+    """
+    if not artist:
+        return frozenset()
+    folded = fold(artist)
+    parts = _ARTIST_SEPARATORS.split(folded)
+    credit = re.split(rf"\s+{_FEATURING}\s", folded)[0].replace("&", " and ")
+    names = {_strip_the(normalize_text(part)) for part in (*parts, credit)}
+    names.discard("")
+    return frozenset(names)
+
+
+def _strip_the(name: str) -> str:
+    return name[4:] if name.startswith("the ") else name
+
+
+def title_key(title: str | None) -> str:
+    """Normalized title without remix/remaster/live/featuring suffixes."""
+    if not title:
+        return ""
+    folded = fold(title)
+    if not _TITLE_SUFFIX_MARKERS.search(folded):
+        return normalize_text(folded)
+    for suffix in _TITLE_SUFFIXES:
+        stripped = suffix.sub("", folded)
+        # Never strip a title down to nothing, e.g. "(Remix)".
+        if stripped.strip():
+            folded = stripped
+    return normalize_text(folded)
+
+
+def song_key(artist: str | None, title: str | None) -> tuple[str, str]:
+    """Exact-match key: the first credited artist plus the title key."""
+    first = _ARTIST_SEPARATORS.split(fold(artist or ""))[0]
+    return _strip_the(normalize_text(first)), title_key(title)
@@ -0,0 +1,158 @@
+import sqlite3
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+from models.data_handler import DataHandler
+from models.normalize import normalize_text
+from models.song import Song
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    album TEXT,
+    image TEXT,
+    title_norm TEXT NOT NULL,
+    artist_norm TEXT NOT NULL
+);
+"""
+
+INDEXES = {
+    "idx_songs_year": "year",
+    "idx_songs_artist": "artist_norm",
+    "idx_songs_title": "title_norm",
+}
+
+REPLACE = """
+INSERT OR REPLACE INTO songs (id, title, artist, year, album, image, title_norm, artist_norm)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# A NULL id makes SQLite number the row after the highest id in the store
+APPEND = """
+INSERT INTO songs (id, title, artist, year, album, image, title_norm, artist_norm)
+VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+COLUMNS = "id, title, artist, year, album, image"
+
+
+class SongStore:
+    """SQLite catalogue of songs, indexed for curation queries by year, artist and title."""
+
+    def __init__(self, db_path: Path | str):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA cache_size = -65536")
+        self.connection.executescript(SCHEMA)
+        self._create_indexes()
+
+    def _create_indexes(self) -> None:
+        for name, column in INDEXES.items():
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON songs ({column})")
+
+    def _drop_indexes(self) -> None:
+        for name in INDEXES:
+            self.connection.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def __enter__(self) -> "SongStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def add_songs(self, songs: Iterable[Song], batch_size: int = 10_000, keep_ids: bool = False) -> int:
+        """Insert songs in executemany batches; returns the count.
+
+        Songs get new ids after the highest one in the store, since every songs.json
+        numbers its songs from 1. With `keep_ids` they keep their own ids and replace
+        any song stored under the same id.
+
+        Loading into an empty store builds the indexes once at the end, which
+        is several times faster than maintaining them row by row.
+        """
+        rows = (
+            (s.id, s.title, s.artist, s.year, s.album, s.image, normalize_text(s.title), normalize_text(s.artist))
+            if keep_ids
+            else (s.title, s.artist, s.year, s.album, s.image, normalize_text(s.title), normalize_text(s.artist))
+            for s in songs
+        )
+        insert = REPLACE if keep_ids else APPEND
+        count = 0
+        bulk = self.count() == 0
+        with self.connection:
+            if bulk:
+                self._drop_indexes()
+            while batch := list(islice(rows, batch_size)):
+                self.connection.executemany(insert, batch)
+                count += len(batch)
+            if bulk:
+                self._create_indexes()
+        return count
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+
+    def query(
+        self,
+        year_from: int | None = None,
+        year_to: int | None = None,
+        artist: str | None = None,
+        title: str | None = None,
+        min_artist_songs: int | None = None,
+        limit: int | None = None,
+    ) -> Iterator[Song]:
+        """Yield matching songs in id order.
+
+        Years are inclusive; artist and title match after normalization;
+        `min_artist_songs` keeps artists with at least that many songs in the store.
+        """
+        conditions, params = [], []
+        if year_from is not None:
+            conditions.append("year >= ?")
+            params.append(year_from)
+        if year_to is not None:
+            conditions.append("year <= ?")
+            params.append(year_to)
+        if artist is not None:
+            conditions.append("artist_norm = ?")
+            params.append(normalize_text(artist))
+        if title is not None:
+            conditions.append("title_norm = ?")
+            params.append(normalize_text(title))
+        if min_artist_songs is not None:
+            conditions.append(
+                "artist_norm IN (SELECT artist_norm FROM songs GROUP BY artist_norm HAVING COUNT(*) >= ?)"
+            )
+            params.append(min_artist_songs)
+
+        sql = f"SELECT {COLUMNS} FROM songs"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        for row in self.connection.execute(sql, params):
+            yield Song(*row)
+
+    def export_json(self, file_path: Path | str, renumber: bool = False, **filters) -> int:
+        """Write the songs matching `filters` in the songs.json format; returns the count.
+
+        With `renumber` the exported songs get ids 1..n, as a deck build expects.
+        """
+        songs = self.query(**filters)
+        if renumber:
+            songs = (
+                Song(i, s.title, s.artist, s.year, s.album, s.image)
+                for i, s in enumerate(songs, start=1)
+            )
+        return DataHandler.save_to_json(file_path, songs)
@@ -1,15 +1,163 @@
-from models.data_handler import DataHandler
-from parsers.json.taylor_swift_parser import TaylorSwiftParser
-from parsers.json.general_parser import GeneralJSONParser
-from parsers.csv.hitster_parser import HitsterCSVParser
-import os
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
 from pathlib import Path
+from models.data_handler import DataHandler
+from models.song_store import SongStore
+from dedup import DEDUP_MODES
+from ingest import expand_inputs, ingest_files, merge_songs
+from parsers.registry import get_parser, load_parsers
+
+
+def parse_command(args: argparse.Namespace) -> None:
+    plugins = tuple(args.plugin)
+    load_parsers(plugins)
+    if args.parser:
+        get_parser(args.parser)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        raise ValueError("No input files found.")
+    missing = [f for f in files if not f.exists()]
+    if missing:
+        raise FileNotFoundError(f"File {missing[0]} not found.")
+
+    start = time.perf_counter()
+    if args.rules and not args.rules.exists():
+        raise FileNotFoundError(f"File {args.rules} not found.")
+    parsed_files = ingest_files(
+        files, parser_name=args.parser, jobs=args.jobs, plugins=plugins, rules_path=args.rules
+    )
+    songs, duplicates = merge_songs(parsed_files, keep_ids=args.keep_ids, dedup=args.dedup)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    DataHandler.save_to_json(args.output, songs)
+    if args.db:
+        with SongStore(args.db) as store:
+            store.add_songs(songs, keep_ids=args.keep_ids)
+    seconds = time.perf_counter() - start
+
+    for parsed in parsed_files:
+        s = parsed.stats
+        print(f"{s.file}: {s.parser}, {s.rows} rows, {s.songs} songs, {s.skipped} skipped, {s.seconds:.2f}s")
+    if args.dedup != "off":
+        action = "merged" if args.dedup == "merge" else "found"
+        extra = sum(len(group.songs) - 1 for group in duplicates)
+        print(f"Duplicates {action}: {len(duplicates)} groups, {extra} extra songs")
+        report_path = args.output.with_suffix(".duplicates.json")
+        with open(report_path, "w") as file:
+            json.dump(
+                [{"title_key": g.title_key, "songs": [s.dict() for s in g.songs]} for g in duplicates],
+                file,
+                indent=4,
+            )
+    print(f"Wrote {len(songs)} songs from {len(parsed_files)} files to {args.output} in {seconds:.2f}s")
+
+    stats_path = args.stats or args.output.with_suffix(".stats.json")
+    stats = {
+        "output": str(args.output),
+        "songs": len(songs),
+        "seconds": round(seconds, 4),
+        "files": [asdict(parsed.stats) for parsed in parsed_files],
+    }
+    with open(stats_path, "w") as file:
+        json.dump(stats, file, indent=4)
+
+
+def import_command(args: argparse.Namespace) -> None:
+    with SongStore(args.db) as store:
+        for path in args.inputs:
+            added = store.add_songs(DataHandler.load_from_json(path), keep_ids=args.keep_ids)
+            print(f"{path}: {added} songs")
+        print(f"{args.db} now holds {store.count()} songs")
+
+
+def export_command(args: argparse.Namespace) -> None:
+    if not Path(args.db).exists():
+        raise FileNotFoundError(f"File {args.db} not found.")
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with SongStore(args.db) as store:
+        count = store.export_json(
+            args.output,
+            renumber=args.renumber,
+            year_from=args.year_from,
+            year_to=args.year_to,
+            artist=args.artist,
+            title=args.title,
+            min_artist_songs=args.min_artist_songs,
+            limit=args.limit,
+        )
+    print(f"Exported {count} songs to {args.output} in {time.perf_counter() - start:.3f}s")
+
+
+def parsers_command(args: argparse.Namespace) -> None:
+    for name, cls in sorted(load_parsers(tuple(args.plugin)).items()):
+        print(f"{name}: {cls.__name__}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build song databases from Hitster CSV editions and chart JSON files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parse_parser = subparsers.add_parser("parse", help="Parse and merge input files into one songs JSON file.")
+    parse_parser.add_argument("inputs", nargs="+", type=Path, help="Input files or directories of .csv/.json files")
+    parse_parser.add_argument("-o", "--output", type=Path, default=Path("out/songDB.json"), help="Output songs JSON file")
+    parse_parser.add_argument("-p", "--parser", help="Parser to use for every file instead of auto-detection")
+    parse_parser.add_argument("-j", "--jobs", type=int, default=0, help="Worker processes (0 = one per CPU)")
+    parse_parser.add_argument("--keep-ids", action="store_true", help="Keep source ids instead of renumbering 1..n, also in --db")
+    parse_parser.add_argument("--stats", type=Path, help="Per-file statistics JSON (default: <output>.stats.json)")
+    parse_parser.add_argument("--plugin", action="append", default=[], help="Extra module that registers parsers")
+    parse_parser.add_argument(
+        "--rules",
+        type=Path,
+        help="Selection rules JSON (year ranges -> max rank, artist cap, exclusions) "
+        "replacing each parser's defaults from resources/rules",
+    )
+    parse_parser.add_argument(
+        "--dedup",
+        choices=DEDUP_MODES,
+        default="off",
+        help="Find duplicate songs across inputs and report them (<output>.duplicates.json) or merge them",
+    )
+    parse_parser.add_argument("--db", type=Path, help="Also load the merged songs into this SQLite song store")
+    parse_parser.set_defaults(func=parse_command)
+
+    import_parser = subparsers.add_parser("import", help="Load songs JSON files into a SQLite song store.")
+    import_parser.add_argument("db", type=Path, help="SQLite song store (created if missing)")
+    import_parser.add_argument("inputs", nargs="+", type=Path, help="Songs JSON files")
+    import_parser.add_argument(
+        "--keep-ids",
+        action="store_true",
+        help="Keep the songs' own ids, replacing stored songs with the same id, instead of numbering after the store",
+    )
+    import_parser.set_defaults(func=import_command)
+
+    export_parser = subparsers.add_parser("export", help="Write a query on a SQLite song store as songs JSON.")
+    export_parser.add_argument("db", type=Path, help="SQLite song store")
+    export_parser.add_argument("-o", "--output", type=Path, required=True, help="Output songs JSON file")
+    export_parser.add_argument("--year-from", type=int, help="First year to include")
+    export_parser.add_argument("--year-to", type=int, help="Last year to include")
+    export_parser.add_argument("--artist", help="Only this artist (normalized match)")
+    export_parser.add_argument("--title", help="Only this title (normalized match)")
+    export_parser.add_argument("--min-artist-songs", type=int, help="Only artists with at least this many songs")
+    export_parser.add_argument("--limit", type=int, help="Maximum number of songs")
+    export_parser.add_argument("--renumber", action="store_true", help="Number the exported songs 1..n")
+    export_parser.set_defaults(func=export_command)
 
-os.makedirs("out", exist_ok=True)
+    list_parser = subparsers.add_parser("parsers", help="List the registered parsers.")
+    list_parser.add_argument("--plugin", action="append", default=[], help="Extra module that registers parsers")
+    list_parser.set_defaults(func=parsers_command)
 
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
-ALL_SONGS_DB_URL = "/Users/benno/Downloads/all_songs_data/all_song_data.json"
 
-# DataHandler.save_to_json("out/taylor_swift_songDB.json", TaylorSwiftParser(file_path=Path("resources/album-song-lyrics.json")).parse())
-# DataHandler.save_to_json("out/general_songDB.json", GeneralJSONParser(file_path=Path(ALL_SONGS_DB_URL)).parse())
-DataHandler.save_to_json("out/hitster_songDB.json", HitsterCSVParser(file_path=Path("/Users/benno/coding/TrackStar/backend/generation/music_db_generator/resources/hitster-de.csv")).parse())
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,44 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Iterable, Iterator
 from models.song import Song
 from pathlib import Path
+from selection import SelectionRules
 
 class BaseParser(ABC):
-    def __init__(self, file_path: Path):
-        """Initialize the parser and automatically load the JSON data."""
+    # Set by parsers.registry.register.
+    name: str = ""
+    # Rules file applied when no rules are passed in; None selects every record.
+    default_rules_file: Path | None = None
+
+    def __init__(self, file_path: Path, rules: SelectionRules | None = None):
+        """Initialize the parser; records are read lazily while parsing."""
         self.file_path = file_path
         if not self.file_path.exists():
             raise FileNotFoundError(f"File {self.file_path} not found.")
+        if rules is None and self.default_rules_file is not None:
+            rules = SelectionRules.load(self.default_rules_file)
+        self.rules = rules
+        # Input records read and records dropped, updated while parse() runs.
+        self.rows = 0
+        self.skipped = 0
+
+    @classmethod
+    def can_parse(cls, file_path: Path) -> bool:
+        """Return True if the file looks like this parser's input format."""
+        return False
+
+    def select(self, records: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        """Apply the selection rules, counting dropped records as skipped."""
+        if self.rules is None:
+            yield from records
+            return
+        kept = 0
+        for record in self.rules.select(records):
+            kept += 1
+            yield record
+        self.skipped += self.rows - kept
 
     @abstractmethod
-    def parse(self) -> List[Song]:
-        """Subclasses must implement this method to parse the JSON data."""
+    def parse(self) -> Iterator[Song]:
+        """Subclasses must implement this method to yield the parsed songs."""
         pass
@@ -1,22 +1,38 @@
-from abc import ABC, abstractmethod
+from abc import abstractmethod
 import csv
-from typing import List
+from typing import Iterator
 from pathlib import Path
 from parsers.base_parser import BaseParser
 from models.song import Song
+from selection import SelectionRules
 
 class BaseCSVParser(BaseParser):
-    def __init__(self, file_path: Path):
-        super().__init__(file_path)
-        self.data = self._load_csv()
+    # Header columns required for format auto-detection.
+    required_columns: tuple[str, ...] = ()
 
-    def _load_csv(self):
-        """Helper method to load CSV data from the file."""
+    def __init__(self, file_path: Path, rules: SelectionRules | None = None):
+        super().__init__(file_path, rules)
+
+    @classmethod
+    def can_parse(cls, file_path: Path) -> bool:
+        if not cls.required_columns or file_path.suffix.lower() != ".csv":
+            return False
+        try:
+            with open(file_path, 'r', newline='') as file:
+                header = next(csv.reader(file), [])
+        except (csv.Error, UnicodeDecodeError):
+            return False
+        return all(column in header for column in cls.required_columns)
+
+    @property
+    def data(self) -> Iterator[dict[str, str]]:
+        """Stream the rows of the CSV file one at a time."""
         with open(self.file_path, 'r', newline='') as file:
-            reader = csv.DictReader(file)
-            return list(reader)
+            for row in csv.DictReader(file):
+                self.rows += 1
+                yield row
 
     @abstractmethod
-    def parse(self) -> List[Song]:
+    def parse(self) -> Iterator[Song]:
         """Subclasses must implement this method to parse the CSV data."""
         pass
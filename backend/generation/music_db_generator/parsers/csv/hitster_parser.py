@@ -1,22 +1,25 @@
 from parsers.csv.base_parser import BaseCSVParser
-from typing import List
+from typing import Iterator
 from models.song import Song
+from parsers.registry import register
 
+@register("hitster")
 class HitsterCSVParser(BaseCSVParser):
-    def __init__(self, file_path):
-        super().__init__(file_path)
+    required_columns = ("Card#", "Title", "Artist", "Year")
 
-    def parse(self) -> List[Song]:
-        songs = []
-        for row in self.data:
+    def __init__(self, file_path, rules=None):
+        super().__init__(file_path, rules)
+
+    def parse(self) -> Iterator[Song]:
+        for row in self.select(self.data):
             card_id = row.get("Card#")
             title = row.get("Title")
             artist = row.get("Artist")
             year = row.get("Year")
 
-            if card_id is None or title is None or artist is None or year is None:
+            if not card_id or not title or not artist or not year:
                 print(f"Skipping row: {row}")
+                self.skipped += 1
                 continue
 
-            songs.append(Song(id=int(card_id), title=title, artist=artist, year=int(year)))
-        return songs
+            yield Song(id=int(card_id), title=title, artist=artist, year=int(year))
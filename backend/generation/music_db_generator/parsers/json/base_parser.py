@@ -1,21 +1,43 @@
-from abc import ABC, abstractmethod
-import json
-from typing import List
+from abc import abstractmethod
+from typing import Any, Iterator
 from parsers.base_parser import BaseParser
+from parsers.json.json_stream import Projection, iter_array
+from selection import SelectionRules
 from models.song import Song
 from pathlib import Path
 
 class BaseJSONParser(BaseParser):
-    def __init__(self, file_path: Path):
-        super().__init__(file_path)
-        self.data = self._load_json()
+    # Fields each record is projected onto while streaming; None keeps everything.
+    fields: Projection | None = None
+    # Keys the first record must have for format auto-detection.
+    required_keys: tuple[str, ...] = ()
 
-    def _load_json(self):
-        """Helper method to load JSON data from the file."""
-        with open(self.file_path, 'r') as file:
-            return json.load(file)
+    def __init__(self, file_path: Path, rules: SelectionRules | None = None):
+        super().__init__(file_path, rules)
+
+    @classmethod
+    def can_parse(cls, file_path: Path) -> bool:
+        if not cls.required_keys or file_path.suffix.lower() != ".json":
+            return False
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                first = next(iter_array(file, chunk_size=1 << 16), None)
+        except ValueError:
+            return False
+        return isinstance(first, dict) and all(key in first for key in cls.required_keys)
+
+    @property
+    def data(self) -> Iterator[Any]:
+        """Stream the records of the top-level JSON array, projected onto `fields`."""
+        fields = self.fields
+        if fields is not None and self.rules is not None:
+            fields = {**dict.fromkeys(self.rules.record_fields()), **fields}
+        with open(self.file_path, 'r', encoding='utf-8') as file:
+            for record in iter_array(file, fields):
+                self.rows += 1
+                yield record
 
     @abstractmethod
-    def parse(self) -> List[Song]:
+    def parse(self) -> Iterator[Song]:
         """Subclasses must implement this method to parse the JSON data."""
         pass
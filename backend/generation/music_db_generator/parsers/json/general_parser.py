@@ -1,23 +1,21 @@
 from parsers.json.base_parser import BaseJSONParser
 from resources.chatgpted_data import top_songs_2020_to_2022
 from models.song import Song
-from typing import List
-from pathlib import Path
+from models.normalize import song_key
+from typing import Iterator, List
+from parsers.registry import register
+from selection import RULES_DIR
 
+@register("general")
 class GeneralJSONParser(BaseJSONParser):
-    def __init__(self, file_path: Path):
-        super().__init__(file_path)
-        self.release_year_dict = {(1956, 1971): 2, (1971, 2019): 15, (2019, 2024): 18}
-
-    def parse(self) -> List[Song]:
-        songs = []
+    required_keys = ("Rank", "Year", "Artist", "Song Title")
+    fields = {key: None for key in ("Rank", "Year", "Artist", "Song Title", "Album", "Album URL")}
+    # Max chart rank per release-year range, see resources/rules/general.json.
+    default_rules_file = RULES_DIR / "general.json"
 
+    def parse(self) -> Iterator[Song]:
         i = 1
-        for song in self.data:
-            # Filter out songs with Rank above 15
-            if int(song.get("Rank", 0)) > self.get_max_rank_for_year(int(song.get("Year"))):
-                continue
-
+        for song in self.select(self.data):
             # Create a dictionary with selected fields
             u_song: Song = Song(
                 artist=song.get("Artist"),
@@ -28,25 +26,24 @@ class GeneralJSONParser(BaseJSONParser):
                 id = i
             )
 
-            songs.append(u_song)
+            yield u_song
             i += 1
 
-        songs += self.add_manual_data(start_id=i+1)
-
-        return songs
+        # Songs in both the charts and the curated list are merged by `parse --dedup`
+        yield from self.add_manual_data(start_id=i+1)
 
 
-    def get_max_rank_for_year(self, year: int) -> int:
-        for (start, end), max_rank in self.release_year_dict.items():
-            if start <= year < end:
-                return max_rank
-
-        return 0
-
     def add_manual_data(self, start_id: int) -> List[Song]:
+        """Curated recent hits, skipping songs repeated in the list."""
+        seen = set()
         sngs = []
         i = start_id
         for s in top_songs_2020_to_2022:
+            key = song_key(s.get("artist", ""), s.get("title", ""))
+            if key in seen:
+                self.skipped += 1
+                continue
+            seen.add(key)
             sngs.append(
                 Song(
                     artist= s.get("artist", ""),
@@ -0,0 +1,93 @@
+import json
+from typing import Any, Iterator, TextIO
+
+CHUNK_SIZE = 1 << 20
+WHITESPACE = " \t\n\r"
+
+# A projection maps a key to None (keep the value as is) or to a nested
+# projection that is applied to the value, or to every item when it is a list.
+Projection = dict[str, "Projection | None"]
+
+
+def project(record: Any, fields: Projection | None) -> Any:
+    """Keep only the fields a parser reads from a decoded record."""
+    if fields is None:
+        return record
+    if isinstance(record, list):
+        return [project(item, fields) for item in record]
+    if not isinstance(record, dict):
+        return record
+    return {key: project(record[key], sub) for key, sub in fields.items() if key in record}
+
+
+def iter_array(file: TextIO, fields: Projection | None = None, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time.
+
+    Only the element being decoded and one read chunk are held in memory, so
+    large exports can be parsed without loading the whole document.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill(size: int = chunk_size) -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = file.read(size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace() -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return True
+            if not fill():
+                return False
+
+    if not skip_whitespace() or buffer[pos] != "[":
+        raise ValueError(f"{getattr(file, 'name', 'input')}: expected a top-level JSON array")
+    pos += 1
+
+    expect_value = True
+    while True:
+        if not skip_whitespace():
+            raise ValueError(f"{getattr(file, 'name', 'input')}: unterminated JSON array")
+        char = buffer[pos]
+        if char == "]":
+            return
+        if not expect_value:
+            if char != ",":
+                raise ValueError(f"{getattr(file, 'name', 'input')}: expected ',' at offset {pos}")
+            pos += 1
+            expect_value = True
+            continue
+
+        # Elements larger than a chunk are retried with a doubling read size so
+        # decoding stays linear in the element size.
+        read_size = chunk_size
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element may just be cut off at the end of the buffer.
+                if fill(read_size):
+                    read_size *= 2
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk.
+            if end == len(buffer) and not isinstance(value, (dict, list, str)) and fill(read_size):
+                read_size *= 2
+                continue
+            break
+        pos = end
+        expect_value = False
+        yield project(value, fields)
@@ -1,16 +1,20 @@
 from parsers.json.base_parser import BaseJSONParser
 from models.song import Song
-from typing import List
+from typing import Iterator
+from parsers.registry import register
+from selection import RULES_DIR
 
+@register("taylor-swift")
 class TaylorSwiftParser(BaseJSONParser):
-    def parse(self) -> List[Song]:
-        songs = []
+    required_keys = ("Code", "Title", "Year", "Songs")
+    # Lyrics make up most of the file and are never read.
+    fields = {"Code": None, "Title": None, "Year": None, "Songs": {"Title": None}}
+    # Skips the "OTH" era, see resources/rules/taylor_swift.json.
+    default_rules_file = RULES_DIR / "taylor_swift.json"
 
+    def parse(self) -> Iterator[Song]:
         i = 1
-        for era in self.data:
-            if era.get("Code") in ["OTH"]:
-                continue
-
+        for era in self.select(self.data):
             year = era.get("Year")
             album_title = era.get("Title")
 
@@ -24,7 +28,5 @@ class TaylorSwiftParser(BaseJSONParser):
                     id=i
                     )
 
-                songs.append(u_song)
+                yield u_song
                 i += 1
-
-        return songs
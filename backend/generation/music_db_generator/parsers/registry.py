@@ -0,0 +1,47 @@
+import importlib
+from pathlib import Path
+from parsers.base_parser import BaseParser
+
+PARSERS: dict[str, type[BaseParser]] = {}
+
+BUILTIN_PARSER_MODULES = (
+    "parsers.csv.hitster_parser",
+    "parsers.json.taylor_swift_parser",
+    "parsers.json.general_parser",
+)
+
+
+def register(name: str):
+    """Class decorator adding a parser to the registry under `name`."""
+    def decorator(cls: type[BaseParser]) -> type[BaseParser]:
+        if name in PARSERS and PARSERS[name] is not cls:
+            raise ValueError(f"Parser name {name!r} is already registered by {PARSERS[name].__name__}.")
+        cls.name = name
+        PARSERS[name] = cls
+        return cls
+    return decorator
+
+
+def load_parsers(plugins: list[str] = ()) -> dict[str, type[BaseParser]]:
+    """Import the built-in parser modules and any plugin modules so they register themselves."""
+    for module in (*BUILTIN_PARSER_MODULES, *plugins):
+        importlib.import_module(module)
+    return PARSERS
+
+
+def get_parser(name: str) -> type[BaseParser]:
+    try:
+        return PARSERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown parser {name!r}. Available: {', '.join(sorted(PARSERS))}") from None
+
+
+def detect_parser(file_path: Path) -> type[BaseParser]:
+    """Pick the one registered parser that recognises the file."""
+    matches = [cls for cls in PARSERS.values() if cls.can_parse(file_path)]
+    if not matches:
+        raise ValueError(f"No parser recognises {file_path}; pass --parser explicitly.")
+    if len(matches) > 1:
+        names = ", ".join(cls.name for cls in matches)
+        raise ValueError(f"{file_path} matches several parsers ({names}); pass --parser explicitly.")
+    return matches[0]
@@ -0,0 +1,161 @@
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+import numpy as np
+from models.normalize import normalize_text
+
+RULES_DIR = Path(__file__).parent / "resources" / "rules"
+
+# Logical columns the rules read, mapped to record keys; overridable per rules file.
+DEFAULT_FIELDS = {"year": "Year", "rank": "Rank", "artist": "Artist"}
+MISSING = np.iinfo(np.int64).min
+NO_LIMIT = np.iinfo(np.int64).max
+BATCH_SIZE = 50_000
+
+
+@dataclass
+class YearRankRule:
+    start: int
+    end: int  # exclusive, like the old release_year_dict ranges
+    max_rank: int
+
+
+@dataclass
+class SelectionRules:
+    """Declarative song selection, evaluated column-wise over batches of records.
+
+    A record is kept when its rank is at most the max rank of its year range
+    (`default_max_rank` outside all ranges, no limit if that is None), none of
+    its `exclude` fields has an excluded value, and its artist has not reached
+    `artist_cap` kept songs yet. Ranges are matched first to last.
+    """
+    year_ranks: list[YearRankRule] = field(default_factory=list)
+    default_max_rank: int | None = None
+    artist_cap: int | None = None
+    exclude: dict[str, list[Any]] = field(default_factory=dict)
+    fields: dict[str, str] = field(default_factory=lambda: dict(DEFAULT_FIELDS))
+
+    def __post_init__(self) -> None:
+        self.fields = {**DEFAULT_FIELDS, **self.fields}
+        self._default = NO_LIMIT if self.default_max_rank is None else self.default_max_rank
+        # Year lookup table: max rank for every year from the first range start to the last end.
+        if self.year_ranks:
+            self._first_year = min(rule.start for rule in self.year_ranks)
+            last_year = max(rule.end for rule in self.year_ranks)
+            self._rank_table = np.full(last_year - self._first_year, self._default, dtype=np.int64)
+            for rule in reversed(self.year_ranks):
+                self._rank_table[rule.start - self._first_year:rule.end - self._first_year] = rule.max_rank
+        self._excluded = {key: np.array([str(v) for v in values]) for key, values in self.exclude.items()}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "SelectionRules":
+        return cls(
+            year_ranks=[YearRankRule(r["from"], r["to"], r["max_rank"]) for r in data.get("year_ranks", [])],
+            default_max_rank=data.get("default_max_rank"),
+            artist_cap=data.get("artist_cap"),
+            exclude=data.get("exclude", {}),
+            fields=data.get("fields", {}),
+        )
+
+    @classmethod
+    def load(cls, path: Path | str) -> "SelectionRules":
+        with open(path, "r") as file:
+            return cls.from_dict(json.load(file))
+
+    def record_fields(self) -> set[str]:
+        """Record keys the rules read, so projections can keep them."""
+        keys = set(self.exclude)
+        if self.year_ranks or self.default_max_rank is not None:
+            keys |= {self.fields["year"], self.fields["rank"]}
+        if self.artist_cap is not None:
+            keys.add(self.fields["artist"])
+        return keys
+
+    def max_ranks(self, years: np.ndarray) -> np.ndarray:
+        """Max allowed rank per year via the lookup table."""
+        ranks = np.full(len(years), self._default, dtype=np.int64)
+        if self.year_ranks:
+            offsets = years - self._first_year
+            inside = (years != MISSING) & (offsets >= 0) & (offsets < len(self._rank_table))
+            ranks[inside] = self._rank_table[offsets[inside]]
+        return ranks
+
+    def mask(self, columns: dict[str, np.ndarray], artist_counts: dict[str, int] | None = None) -> np.ndarray:
+        """Boolean keep-mask for a batch given as columns.
+
+        `columns` holds "year" and "rank" int arrays, "artist" (normalized
+        strings) and one string array per `exclude` key, as needed by the rules.
+        `artist_counts` carries kept songs per artist across batches.
+        """
+        n = len(next(iter(columns.values()))) if columns else 0
+        keep = np.ones(n, dtype=bool)
+        if self.year_ranks or self.default_max_rank is not None:
+            keep &= columns["rank"] <= self.max_ranks(columns["year"])
+        for key, excluded in self._excluded.items():
+            keep &= ~np.isin(columns[key], excluded)
+        if self.artist_cap is not None:
+            keep = self._cap_artists(columns["artist"], keep, {} if artist_counts is None else artist_counts)
+        return keep
+
+    def _cap_artists(self, artists: np.ndarray, keep: np.ndarray, counts: dict[str, int]) -> np.ndarray:
+        candidates = np.flatnonzero(keep)
+        if not len(candidates):
+            return keep
+        names, inverse = np.unique(artists[candidates], return_inverse=True)
+        # Occurrence number of each candidate within its artist, in input order.
+        order = np.argsort(inverse, kind="stable")
+        group_sizes = np.bincount(inverse, minlength=len(names))
+        group_starts = np.repeat(np.cumsum(group_sizes) - group_sizes, group_sizes)
+        occurrence = np.empty(len(candidates), dtype=np.int64)
+        occurrence[order] = np.arange(len(candidates)) - group_starts
+
+        carried = np.array([counts.get(name, 0) for name in names], dtype=np.int64)
+        allowed = occurrence + carried[inverse] < self.artist_cap
+        keep = keep.copy()
+        keep[candidates[~allowed]] = False
+
+        kept = np.bincount(inverse[allowed], minlength=len(names))
+        for name, before, added in zip(names, carried, kept):
+            if added:
+                counts[name] = int(before + added)
+        return keep
+
+    def columns(self, records: list[dict[str, Any]]) -> dict[str, np.ndarray]:
+        """Extract the columns the rules need from a batch of records."""
+        n = len(records)
+        columns = {}
+        if self.year_ranks or self.default_max_rank is not None:
+            year, rank = self.fields["year"], self.fields["rank"]
+            columns["year"] = np.fromiter((_to_int(r.get(year), MISSING) for r in records), np.int64, n)
+            columns["rank"] = np.fromiter((_to_int(r.get(rank), 0) for r in records), np.int64, n)
+        for key in self.exclude:
+            columns[key] = np.array([str(r.get(key)) for r in records])
+        if self.artist_cap is not None:
+            raw = np.array([str(r.get(self.fields["artist"]) or "") for r in records], dtype=object)
+            names, inverse = np.unique(raw, return_inverse=True)
+            columns["artist"] = np.array([normalize_text(name) for name in names], dtype=object)[inverse]
+        return columns
+
+    def select(self, records: Iterable[dict[str, Any]], batch_size: int = BATCH_SIZE) -> Iterator[dict[str, Any]]:
+        """Yield the records the rules keep, evaluating them batch by batch."""
+        records = iter(records)
+        artist_counts: dict[str, int] = {}
+        while batch := list(islice(records, batch_size)):
+            columns = self.columns(batch)
+            if not columns:
+                yield from batch
+                continue
+            keep = self.mask(columns, artist_counts)
+            for i in np.flatnonzero(keep):
+                yield batch[i]
+
+
+def _to_int(value: Any, default: int) -> int:
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
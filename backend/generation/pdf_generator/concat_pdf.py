@@ -0,0 +1,92 @@
+import gc
+from pathlib import Path
+from typing import IO, Iterable
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject, PdfObject
+
+CATALOG_ID = 1
+PAGES_ID = 2
+# Marks references that already point into the output file
+_OUTPUT = object()
+
+
+def _ref(idnum: int) -> IndirectObject:
+    return IndirectObject(idnum, 0, _OUTPUT)
+
+
+def _write_object(out: IO[bytes], offsets: dict[int, int], idnum: int, obj: PdfObject):
+    offsets[idnum] = out.tell()
+    out.write(f"{idnum} 0 obj\n".encode())
+    obj.write_to_stream(out)
+    out.write(b"\nendobj\n")
+
+
+def concat_pdfs(paths: Iterable[Path], output_path: Path) -> int:
+    """
+    Writes the pages of `paths`, in order, into one PDF at `output_path` and returns the page count.
+
+    Objects are renumbered and written out as each input is read, so only one input is
+    in memory at a time; pypdf's PdfWriter would keep the whole document until the end.
+    Only the pages and what they reference are copied, not outlines or document info.
+    """
+    offsets: dict[int, int] = {}
+    page_ids: list[int] = []
+    next_id = PAGES_ID + 1
+
+    with open(output_path, "wb") as out:
+        out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for path in paths:
+            reader = PdfReader(path)
+            new_ids: dict[int, int] = {}
+            pending: list[int] = []
+
+            def relink(obj: PdfObject) -> PdfObject:
+                """Points the references of `obj` at output ids, queueing objects not written yet."""
+                nonlocal next_id
+                if isinstance(obj, IndirectObject):
+                    if obj.pdf is _OUTPUT:
+                        return obj
+                    if obj.idnum not in new_ids:
+                        new_ids[obj.idnum] = next_id
+                        next_id += 1
+                        pending.append(obj.idnum)
+                    return _ref(new_ids[obj.idnum])
+                if isinstance(obj, DictionaryObject):
+                    for key, value in obj.items():
+                        obj[key] = relink(value)
+                elif isinstance(obj, ArrayObject):
+                    for index, value in enumerate(obj):
+                        obj[index] = relink(value)
+                return obj
+
+            for page in reader.pages:
+                page_ids.append(relink(page.indirect_reference).idnum)
+            while pending:
+                idnum = pending.pop()
+                obj = reader.get_object(idnum)
+                if isinstance(obj, DictionaryObject) and obj.get("/Type") == "/Page":
+                    # Following the old parent would copy the input's whole page tree
+                    obj[NameObject("/Parent")] = _ref(PAGES_ID)
+                _write_object(out, offsets, new_ids[idnum], relink(obj))
+            # Parsed objects point back at their reader, so only the cycle collector frees an input
+            del reader, relink
+            gc.collect()
+
+        _write_object(out, offsets, PAGES_ID, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(_ref(idnum) for idnum in page_ids),
+            NameObject("/Count"): NumberObject(len(page_ids)),
+        }))
+        _write_object(out, offsets, CATALOG_ID, DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): _ref(PAGES_ID),
+        }))
+
+        xref_offset = out.tell()
+        out.write(f"xref\n0 {next_id}\n0000000000 65535 f \n".encode())
+        for idnum in range(1, next_id):
+            out.write(f"{offsets[idnum]:010d} 00000 n \n".encode())
+        out.write(b"trailer\n")
+        DictionaryObject({NameObject("/Size"): NumberObject(next_id), NameObject("/Root"): _ref(CATALOG_ID)}).write_to_stream(out)
+        out.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+    return len(page_ids)
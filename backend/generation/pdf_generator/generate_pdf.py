@@ -1,18 +1,24 @@
-from enum import CONFORM
-from typing import Any, Optional, Sequence
-from PIL.Image import merge
-from click import Context
+from typing import Any, Iterable, Optional, Sequence
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
-from generation.pdf_generator.models.cards.image_card import ImageCard
-from generation.pdf_generator.models.cards.song_card import SongCard
+from generation.pdf_generator.models.cards.image_card import ImageCard, ImageOptions
+from generation.pdf_generator.models.cards.song_text_card import SongTextCard
+from generation.card_generator.generate_song_card import render_song_card
+from generation.pdf_generator.models.cards.qr_card import QRCard
+from generation.qr_code_generator.code_generation import QRCode
+from generation.qr_code_generator.qr_settings import QRSettings, deck_qr_settings
 from generation.pdf_generator.models.cards.card import Card
-import json
+from generation.models.song import Song
 from pathlib import Path
-import argparse
 import math
+import tempfile
+from functools import partial
+from generation.render_pool.render_pool import RenderPool, use_pool
+from generation.archive_writer.archive_writer import ArchiveImages
+from generation.pdf_generator.concat_pdf import concat_pdfs
+from generation.profiling.profiling import profile_stage
 
 class CardConfig:
     def __init__(self, width, height, card_width, card_height, column_gap, row_gap):
@@ -41,8 +47,23 @@ class CardConfig:
             ]
         ]
 
+def _write_shard(shard: tuple[Path, Sequence[Any], Sequence[Any]], options: dict[str, Any]) -> Path:
+    shard_path, qr_codes, song_cards = shard
+    PDFCreator(shard_path, None, None, 0, 0, **options).write_pages(qr_codes, song_cards)
+    for images in (qr_codes, song_cards):
+        if isinstance(images, ArchiveImages):
+            images.close()
+    return shard_path
+
+
+def _shard_sources(sources: Sequence[Any], start: int, stop: int) -> Sequence[Any]:
+    # Archive images stay unread until the worker writes the shard's pages
+    if isinstance(sources, ArchiveImages):
+        return sources.view(start, stop)
+    return sources[start:stop]
+
 class PDFCreator:
-    def __init__(self, pdf_name: str | Path, qr_code_path: Path, song_card_path: Path, start_index: int, end_index: int, card_width: float = 7, card_height: float = 7, column_gap: float = 1, row_gap: float = 0.5, mirror_qr_codes: bool = True):
+    def __init__(self, pdf_name: str | Path, qr_code_path: Optional[Path], song_card_path: Optional[Path], start_index: int, end_index: int, card_width: float = 7, card_height: float = 7, column_gap: float = 1, row_gap: float = 0.5, mirror_qr_codes: bool = True, songs: Optional[list[Song]] = None, vector_cards: bool = False, qr_code_images: Optional[Sequence[bytes]] = None, song_card_images: Optional[Sequence[bytes]] = None, vector_qr_codes: bool = False, qr_code_prefix: str = "", qr_settings: Optional[QRSettings] = None, qr_code_mode: Optional[str] = "1", song_card_mode: Optional[str] = "L", flate_level: int = 6, jpeg_quality: Optional[int] = None):
         # Dimensions
         self.width, self.height = A4
         self.pdf_name = pdf_name
@@ -63,12 +84,35 @@ class PDFCreator:
         self.start_index = start_index
         self.end_index = end_index
         self.mirror_qr_codes = mirror_qr_codes
+        # Vector cards are drawn from the songs directly instead of from rendered PNGs
+        self.songs = songs
+        self.vector_cards = vector_cards
+
+        # PNG data rendered in memory, in id order, used instead of scanning the image directories
+        self.qr_code_images = qr_code_images
+        self.song_card_images = song_card_images
+
+        # Vector QR codes are drawn from their payloads for the ids start_index..end_index
+        self.vector_qr_codes = vector_qr_codes
+        self.qr_code_prefix = qr_code_prefix
+        self.qr_settings = qr_settings
+
+        # QR codes are pure black and white and song cards grayscale, so neither needs RGB
+        self.qr_code_options = ImageOptions(qr_code_mode, flate_level, jpeg_quality)
+        self.song_card_options = ImageOptions(song_card_mode, flate_level, jpeg_quality)
+
+        if self.vector_cards and self.songs is None:
+            raise ValueError("Vector song cards need the list of songs")
 
         self.card_config_obj = CardConfig(self.width, self.height, self.card_width, self.card_height, self.column_gap, self.row_gap)
         self.card_config = self.card_config_obj.get_config()
 
 
+        # Everything a shard writer needs to lay out its pages exactly like this one
+        self.shard_options = dict(card_width=card_width, card_height=card_height, column_gap=column_gap, row_gap=row_gap, mirror_qr_codes=mirror_qr_codes, qr_code_mode=qr_code_mode, song_card_mode=song_card_mode, flate_level=flate_level, jpeg_quality=jpeg_quality)
+
         self.pdf_canvas = self.setup_canvas()
+        self.define_grid()
 
     def setup_canvas(self):
         if isinstance(self.pdf_name, Path):
@@ -80,12 +124,10 @@ class PDFCreator:
         pdf_canvas.setLineWidth(self.line_width)
         return pdf_canvas
 
-    @staticmethod
-    def get_all_files(base_path: Path) -> list[Path]:
-        files = [f for f in base_path.iterdir() if f.is_file()]
-        return sorted(files, key=lambda x: int(x.name.split('-')[-1].split('.')[0]))
-
-    def add_grid(self):
+    def define_grid(self):
+        """Draws the cut lines once into a form XObject that every page references."""
+        self.pdf_canvas.beginForm("grid")
+        self.pdf_canvas.setStrokeColor(colors.black)
         self.pdf_canvas.setLineWidth(self.line_width)
 
         for card in self.flatten(self.card_config):
@@ -97,6 +139,16 @@ class PDFCreator:
             self.pdf_canvas.line(0, card.y, self.width, card.y)
             self.pdf_canvas.line(0, card.y + self.card_height, self.width, card.y + self.card_height)
 
+        self.pdf_canvas.endForm()
+
+    @staticmethod
+    def get_all_files(base_path: Path) -> list[Path]:
+        files = [f for f in base_path.iterdir() if f.is_file()]
+        return sorted(files, key=lambda x: int(x.name.split('-')[-1].split('.')[0]))
+
+    def add_grid(self):
+        self.pdf_canvas.doForm("grid")
+
     @staticmethod
     def flatten(lst: list[list[Any]]) -> list[Any]:
         return [item for sublist in lst for item in sublist]
@@ -117,37 +169,112 @@ class PDFCreator:
         return [self.chunkinize(l, n // 2) for l in self.chunkinize(lst, n)]
 
 
+    def get_qr_codes(self) -> Sequence[Path | bytes | QRCode]:
+        if self.vector_qr_codes:
+            id_range = range(self.start_index, self.end_index + 1)
+            settings = self.qr_settings or deck_qr_settings(self.qr_code_prefix, id_range)
+            return [QRCode(f"{self.qr_code_prefix}{i}", i, settings) for i in id_range]
+        if self.qr_code_images is not None:
+            return self.qr_code_images
+        return self.get_all_files(self.qr_code_path)
+
+    def get_song_cards(self) -> Sequence[Path | bytes | Song]:
+        if self.vector_cards:
+            return sorted(self.songs, key=lambda song: song.id)
+        if self.song_card_images is not None:
+            return self.song_card_images
+        return self.get_all_files(self.song_card_path)
+
+    def page_pair_count(self, card_count: int) -> int:
+        return math.ceil(card_count / self.chunk_size)
+
+    def page_pair(self, qr_codes: Sequence[Any], song_cards: Sequence[Any], pair_index: int) -> tuple[list[list[Any]], list[list[Any]]]:
+        """Front and back page of one sheet, as columns of cards."""
+        start, end = pair_index * self.chunk_size, (pair_index + 1) * self.chunk_size
+        fronts = list(qr_codes[start:end])
+        backs = list(song_cards[start:end])
+        front_columns = self.colum_chunkinize(fronts + self.fill_left(len(fronts), self.chunk_size), self.chunk_size)[0]
+        back_columns = self.colum_chunkinize(backs + self.fill_left(len(backs), self.chunk_size), self.chunk_size)[0]
+
+        if self.mirror_qr_codes:
+            front_columns = front_columns[::-1]
+
+        return front_columns, back_columns
+
     # PDF generation
-    def create_pdf(self):
-        i = self.get_all_files(self.qr_code_path)
-        qr_codes_paths: Sequence[Optional[Path]] = i + self.fill_left(len(i), self.chunk_size)
-        i = self.get_all_files(self.song_card_path)
-        song_cards_paths: Sequence[Optional[Path]] = i + self.fill_left(len(i), self.chunk_size)
-        song_card_chunks: list[list[list[Path]]] = self.colum_chunkinize(song_cards_paths, self.chunk_size)
-        image_chunks: list[list[list[Path]]] = self.colum_chunkinize(qr_codes_paths, self.chunk_size)
+    def create_pdf(self, jobs: int = 1, pool: Optional[RenderPool] = None, pairs_per_shard: int = 50):
+        """
+        Writes the whole deck.
+
+        With more than one job the page pairs are split into shards of at most
+        `pairs_per_shard` sheets, and at least one shard per worker, that worker processes
+        write as partial PDFs, which are then concatenated in order. Workers hold the images of their own shard and the join reads one shard
+        at a time, so memory follows the shard size rather than the deck.
+        """
+        qr_codes = self.get_qr_codes()
+        song_cards = self.get_song_cards()
+
+        with profile_stage("pdf") as stage, use_pool(pool, jobs) as p:
+            stage.add_items(len(song_cards))
+            if p.jobs == 1:
+                self.write_pages(qr_codes, song_cards)
+            else:
+                # Small decks are split finer so that every worker gets a shard
+                pairs_per_shard = max(1, min(pairs_per_shard, math.ceil(self.page_pair_count(len(song_cards)) / p.jobs)))
+                self.create_sharded_pdf(qr_codes, song_cards, p, pairs_per_shard)
 
-        for i in range(len(song_card_chunks)):
-            if self.mirror_qr_codes:
-                image_chunks[i] = image_chunks[i][::-1]
+    def write_pages(self, qr_codes: Sequence[Any], song_cards: Sequence[Any], pairs: Optional[Iterable[int]] = None):
+        """Writes the given page pairs (all by default) and saves the PDF."""
+        if pairs is None:
+            pairs = range(self.page_pair_count(len(song_cards)))
 
-            self.create_page(image_chunks[i])
-            self.create_page(song_card_chunks[i])
+        for i in pairs:
+            front, back = self.page_pair(qr_codes, song_cards, i)
+            self.create_page(front, self.qr_code_options)
+            self.create_page(back, self.song_card_options)
 
         self.pdf_canvas.save()
 
-    def create_page(self, image_paths: Sequence[list[Path]]): # eg. [[1,2,3,4], [5,6,7,8]]
+    def create_sharded_pdf(self, qr_codes: Sequence[Any], song_cards: Sequence[Any], pool: RenderPool, pairs_per_shard: int):
+        pdf_path = Path(self.pdf_name)
+        shard_cards = pairs_per_shard * self.chunk_size
+
+        with tempfile.TemporaryDirectory(dir=pdf_path.absolute().parent) as tmp:
+            shards = [
+                (Path(tmp) / f"shard-{start // shard_cards}.pdf", _shard_sources(qr_codes, start, start + shard_cards), _shard_sources(song_cards, start, start + shard_cards))
+                for start in range(0, len(song_cards), shard_cards)
+            ]
+            write_shard = partial(_write_shard, options=self.shard_options)
+            report = pool.run(write_shard, shards, desc="Writing PDF shards", unit="shard", key=lambda shard: shard[0].stem)
+            if not report.ok:
+                raise RuntimeError("Failed to write PDF shards: " + ", ".join(str(failure) for failure in report.failures))
+
+            concat_pdfs(report.results, pdf_path)
+
+    def create_page(self, image_paths: Sequence[list[Path | bytes | Song | QRCode]], image_options: Optional[ImageOptions] = None): # eg. [[1,2,3,4], [5,6,7,8]]
         self.add_grid()
 
         for col_index, col in enumerate(self.card_config):
             for row_index, card in enumerate(col):
-                if image_paths[col_index][row_index] is None:
+                source = image_paths[col_index][row_index]
+                if source is None:
                     continue
-                image_card = ImageCard.from_card(card, image_paths[col_index][row_index], self.line_width)
-                image_card.draw(self.pdf_canvas)
+                if isinstance(source, Song) and not SongTextCard.can_draw(source):
+                    page_card = ImageCard.from_card(card, render_song_card(source), self.line_width, self.song_card_options)
+                elif isinstance(source, Song):
+                    page_card = SongTextCard.from_card(card, source, self.line_width)
+                elif isinstance(source, QRCode):
+                    page_card = QRCard.from_card(card, source, self.line_width)
+                else:
+                    page_card = ImageCard.from_card(card, source, self.line_width, image_options)
+                page_card.draw(self.pdf_canvas)
 
         self.pdf_canvas.showPage()
 
 if __name__ == "__main__":
+    import argparse
+    import json
+
     parser = argparse.ArgumentParser(description="Create a PDF of cards.")
     parser.add_argument("-o", "--pdf_name", type=str, help="Name of the output PDF file.", default="out/cards.pdf")
     parser.add_argument("-q", "--qr_code_path", type=Path, help="Base path for QR code images.", default="out/qr_codes")
@@ -159,8 +286,21 @@ if __name__ == "__main__":
     parser.add_argument("-c", "--column_gap", type=float, default=1, help="Gap between columns in cm. Default is 1cm.")
     parser.add_argument("-r", "--row_gap", type=float, default=0.5, help="Gap between rows in cm. Default is 0.5cm.")
     parser.add_argument("-m", "--mirror_qr_codes", type=bool, default=True, help="Whether to mirror the QR codes. Default is True")
+    parser.add_argument("-f", "--flate_level", type=int, default=6, help="zlib compression level (0-9) for embedded images. Default is 6.")
+    parser.add_argument("-j", "--jpeg_quality", type=int, help="Embed grayscale song cards as JPEG with this quality instead of lossless Flate.")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes writing PDF shards (0 = one per CPU core). Default is 1.")
+    parser.add_argument("--pairs_per_shard", type=int, default=50, help="Sheets (front and back page) per PDF shard. Default is 50.")
+    parser.add_argument("-p", "--vector_qr_codes", type=str, metavar="PREFIX", help="Draw the QR codes as vectors with this payload prefix instead of using the QR code images.")
+    parser.add_argument("-v", "--vector_cards", type=Path, metavar="SONGS_JSON", help="Draw the song cards as vector text from this songs.json instead of using the song card images.")
 
     args = parser.parse_args()
+    if args.vector_qr_codes is not None and args.end_index is None:
+        parser.error("--vector_qr_codes needs --end_index")
+
+    songs = None
+    if args.vector_cards:
+        with open(args.vector_cards, 'r') as f:
+            songs = [Song(**song) for song in json.load(f)]
 
-    creator = PDFCreator(args.pdf_name, args.qr_code_path, args.song_card_path, args.start_index, args.end_index, args.card_width, args.card_height, args.column_gap, args.row_gap, args.mirror_qr_codes)
-    creator.create_pdf()
+    creator = PDFCreator(args.pdf_name, args.qr_code_path, args.song_card_path, args.start_index, args.end_index, args.card_width, args.card_height, args.column_gap, args.row_gap, args.mirror_qr_codes, songs=songs, vector_cards=songs is not None, vector_qr_codes=args.vector_qr_codes is not None, qr_code_prefix=args.vector_qr_codes or "", flate_level=args.flate_level, jpeg_quality=args.jpeg_quality)
+    creator.create_pdf(jobs=args.jobs, pairs_per_shard=args.pairs_per_shard)
@@ -1,18 +1,96 @@
+import hashlib
+import zlib
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfdoc import PDFArray, PDFDictionary, PDFName, PDFObject, PDFStream
 from reportlab.pdfgen.canvas import Canvas
 from generation.pdf_generator.models.cards.card import Card
 from PIL import Image
 from pathlib import Path
 
+@dataclass
+class ImageOptions:
+    """How an image is embedded into the PDF."""
+    # PIL mode to convert to before embedding: "1" (bilevel), "L" (grayscale) or None to keep the image as is
+    mode: Optional[str] = None
+    flate_level: int = 6
+    # Embed as JPEG with this quality instead of Flate. Ignored for bilevel images
+    jpeg_quality: Optional[int] = None
+
+class FlateImageXObject(PDFObject):
+    """
+    Image XObject of a mode "1", "L" or "RGB" image, compressed once with Flate at the given level.
+
+    Mode "1" rows are packed MSB first with 1 as white, exactly like 1-bit DeviceGray, so
+    bilevel images are embedded as they are instead of being expanded to 8 bits per pixel.
+    The stream carries its own Filter entry, which reportlab writes through unchanged.
+    """
+    color_spaces = {"1": "DeviceGray", "L": "DeviceGray", "RGB": "DeviceRGB"}
+
+    def __init__(self, image: Image.Image, data: bytes, flate_level: int):
+        self.width, self.height = image.size
+        self.bits_per_component = 1 if image.mode == "1" else 8
+        self.color_space = self.color_spaces[image.mode]
+        self.content = zlib.compress(data, flate_level)
+
+    def format(self, document) -> bytes:
+        dictionary = PDFDictionary({
+            "Type": PDFName("XObject"),
+            "Subtype": PDFName("Image"),
+            "Width": self.width,
+            "Height": self.height,
+            "BitsPerComponent": self.bits_per_component,
+            "ColorSpace": PDFName(self.color_space),
+            "Filter": PDFArray([PDFName("FlateDecode")]),
+        })
+        return PDFStream(dictionary, self.content).format(document)
+
 class ImageCard(Card):
-    def __init__(self, x: float, y: float, width: float, height: float, image_path: str | Path) -> None:
+    def __init__(self, x: float, y: float, width: float, height: float, image_path: str | Path | bytes, options: Optional[ImageOptions] = None) -> None:
         super().__init__(x, y, width, height)
+        # Either a file or the PNG data of an image rendered in memory
         self.image_path = image_path
+        self.options = options
 
     def draw(self, canvas: Canvas):
         super().draw(canvas)
 
-        canvas.drawImage(self.image_path, self.x, self.y, self.width, self.height)
+        if self.options is None:
+            image = ImageReader(BytesIO(self.image_path)) if isinstance(self.image_path, bytes) else self.image_path
+            canvas.drawImage(image, self.x, self.y, self.width, self.height)
+            return
+
+        self.draw_optimized(canvas, self.options)
+
+    def draw_optimized(self, canvas: Canvas, options: ImageOptions):
+        image = Image.open(BytesIO(self.image_path) if isinstance(self.image_path, bytes) else self.image_path)
+        if options.mode is not None and image.mode != options.mode:
+            image = image.convert(options.mode)
+
+        if options.jpeg_quality is not None and image.mode != "1":
+            # reportlab passes JPEG data through untouched
+            buffer = BytesIO()
+            image.convert("L" if image.mode == "L" else "RGB").save(buffer, format="JPEG", quality=options.jpeg_quality)
+            buffer.seek(0)
+            canvas.drawImage(ImageReader(buffer), self.x, self.y, self.width, self.height)
+            return
+
+        if image.mode not in FlateImageXObject.color_spaces:
+            image = image.convert("RGB")
+        data = image.tobytes()
+        name = hashlib.md5(data + f"{image.mode}{image.size}{options.flate_level}".encode()).hexdigest()
+        # Identical images share one XObject, which is only compressed the first time
+        if not canvas._doc.hasForm(name):
+            canvas._doc.addForm(name, FlateImageXObject(image, data, options.flate_level))
+
+        canvas.saveState()
+        canvas.translate(self.x, self.y)
+        canvas.scale(self.width, self.height)
+        canvas.doForm(name)
+        canvas.restoreState()
 
     @classmethod
-    def from_card(cls, card: Card, image_path: str | Path, line_width: float | int):
-        return cls(card.x - line_width, card.y - line_width, card.width + line_width * 2, card.height + line_width * 2, image_path)
+    def from_card(cls, card: Card, image_path: str | Path | bytes, line_width: float | int, options: Optional[ImageOptions] = None):
+        return cls(card.x - line_width, card.y - line_width, card.width + line_width * 2, card.height + line_width * 2, image_path, options)
@@ -0,0 +1,39 @@
+from reportlab.lib import colors
+from reportlab.pdfgen.canvas import Canvas
+from generation.pdf_generator.models.cards.card import Card
+from generation.pdf_generator.models.cards.text_card import TextCard
+from generation.qr_code_generator.code_generation import QRCode, qr_matrix, qr_module_size, qr_rectangles
+from generation.qr_code_generator.layout import code_offset, height as layout_height, label_baseline, label_font_size, label_right, quiet_zone, width as layout_width
+
+class QRCard(Card):
+    """QR code drawn as filled rectangles straight from the module matrix, laid out like the QR code images."""
+
+    def __init__(self, x: float, y: float, width: float, height: float, code: QRCode) -> None:
+        super().__init__(x, y, width, height)
+        self.code = code
+
+    def draw(self, canvas: Canvas):
+        super().draw(canvas)
+
+        # The layout is in card pixels with the origin at the top left
+        scale_x = self.width / layout_width
+        scale_y = self.height / layout_height
+
+        matrix = qr_matrix(self.code.data, self.code.settings)
+        module = qr_module_size(matrix)
+        origin = code_offset + quiet_zone * module
+
+        path = canvas.beginPath()
+        for column, row, w, h in qr_rectangles(matrix):
+            left = self.x + (origin + column * module) * scale_x
+            top = self.y + self.height - (origin + row * module) * scale_y
+            path.rect(left, top - h * module * scale_y, w * module * scale_x, h * module * scale_y)
+
+        canvas.setFillColor(colors.black)
+        canvas.drawPath(path, stroke=0, fill=1)
+
+        TextCard.draw_string(canvas, str(self.code.id), self.x + label_right * scale_x, self.y + self.height - label_baseline * scale_y, label_font_size * scale_y, anchor="end", color="gray")
+
+    @classmethod
+    def from_card(cls, card: Card, code: QRCode, line_width: float | int):
+        return cls(card.x - line_width, card.y - line_width, card.width + line_width * 2, card.height + line_width * 2, code)
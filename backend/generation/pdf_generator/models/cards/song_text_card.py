@@ -0,0 +1,31 @@
+from reportlab.pdfgen.canvas import Canvas
+from generation.card_generator.generate_song_card import height as layout_height, layout_song_card, width as layout_width
+from generation.models.song import Song
+from generation.pdf_generator.models.cards.card import Card
+from generation.pdf_generator.models.cards.text_card import TextCard, font_covers
+
+class SongTextCard(TextCard):
+    """Song card drawn with PDF text operators, using the same layout as the PNG song cards."""
+
+    def __init__(self, x: float, y: float, width: float, height: float, song: Song) -> None:
+        super().__init__(x, y, width, height, song.title)
+        self.song = song
+
+    def draw(self, canvas: Canvas):
+        Card.draw(self, canvas)
+
+        # The layout is in card pixels with the origin at the top left
+        scale_x = self.width / layout_width
+        scale_y = self.height / layout_height
+
+        for line in layout_song_card(self.song):
+            self.draw_string(canvas, line.text, self.x + line.x * scale_x, self.y + self.height - line.y * scale_y, line.font_size * scale_y, line.anchor, line.color)
+
+    @staticmethod
+    def can_draw(song: Song) -> bool:
+        """Whether the card font has every character of the card. Cards it cannot draw are embedded as PNGs."""
+        return all(font_covers(line.text) for line in layout_song_card(song))
+
+    @classmethod
+    def from_card(cls, card: Card, song: Song, line_width: float | int):
+        return cls(card.x - line_width, card.y - line_width, card.width + line_width * 2, card.height + line_width * 2, song)
@@ -1,5 +1,39 @@
+from functools import lru_cache
 from reportlab.pdfgen.canvas import Canvas
-from models.cards.card import Card
+from reportlab.lib import colors
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from generation.pdf_generator.models.cards.card import Card
+
+# Same fonts as the PNG cards where installed; Helvetica, the fallback, only covers WinAnsi (Latin-1)
+CARD_FONT_FILES = ("Arial.ttf", "arial.ttf", "DejaVuSans.ttf")
+
+
+@lru_cache(maxsize=None)
+def card_font() -> str:
+    """Registers the first TrueType card font found (once per process) and returns its name."""
+    for file_name in CARD_FONT_FILES:
+        try:
+            font = TTFont(file_name.removesuffix(".ttf"), file_name)
+        except TTFError:
+            continue
+        pdfmetrics.registerFont(font)
+        return font.fontName
+    return "Helvetica"
+
+
+def font_covers(text: str) -> bool:
+    """Whether every character of `text` has a glyph in the card font."""
+    font = card_font()
+    if font == "Helvetica":
+        try:
+            text.encode("cp1252")
+            return True
+        except UnicodeEncodeError:
+            return False
+    char_to_glyph = pdfmetrics.getFont(font).face.charToGlyph
+    return all(ord(char) in char_to_glyph for char in text)
+
 
 class TextCard(Card):
     def __init__(self, x: float, y: float, width: float, height: float, text: str) -> None:
@@ -8,16 +42,30 @@ class TextCard(Card):
 
     def draw(self, canvas: Canvas):
         super().draw(canvas)
-        canvas.setFont("Helvetica", 12)
+        font = card_font()
+        canvas.setFont(font, 12)
 
-        text_width = canvas.stringWidth(self.text, "Helvetica", 12)
+        text_width = canvas.stringWidth(self.text, font, 12)
         text_height = 12
         font_size = 15
 
         while text_width > self.width or text_height > self.height:
             font_size -= 1.5  # Decrease the font size
-            canvas.setFont("Helvetica", font_size)
-            text_width = canvas.stringWidth(self.text, "Helvetica", font_size)
+            canvas.setFont(font, font_size)
+            text_width = canvas.stringWidth(self.text, font, font_size)
             text_height = font_size
 
         canvas.drawString(self.x + self.width / 2 - text_width/ 2, self.y + self.height / 2, self.text)
+
+    @staticmethod
+    def draw_string(canvas: Canvas, text: str, x: float, y: float, font_size: float, anchor: str = "middle", color: str = "black"):
+        """Draws a single line anchored like SVG's `text-anchor`."""
+        canvas.setFont(card_font(), font_size)
+        canvas.setFillColor(colors.toColor(color))
+
+        if anchor == "end":
+            canvas.drawRightString(x, y, text)
+        elif anchor == "start":
+            canvas.drawString(x, y, text)
+        else:
+            canvas.drawCentredString(x, y, text)
@@ -0,0 +1,75 @@
+from functools import partial
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence
+from generation.models.song import Song
+from generation.card_generator.generate_song_card import song_card_svg
+from generation.qr_code_generator.qr_settings import QRSettings, deck_qr_settings, qr_matrix
+from generation.render_cache.render_cache import RenderCache, svg_to_png_bytes
+from generation.render_pool.render_pool import RenderPool, TaskReport, use_pool
+from generation.profiling.profiling import profile_stage
+from generation.album_art.art_cache import ArtCache
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+DEFAULT_COUNT = 8
+DEFAULT_COLUMNS = 4
+DEFAULT_CELL_SIZE = 200
+GAP = 8
+BACKGROUND = (235, 235, 235)
+
+
+def render_song_card_thumbnail(song: Song, size: int, cache: Optional[RenderCache] = None, art: Optional[ArtCache] = None) -> bytes:
+    """Rasterizes a song card straight at `size` pixels instead of scaling down a full-size render."""
+    return svg_to_png_bytes(song_card_svg(song, art.thumbnail(song.image) if art else None), size, size, cache)
+
+
+def render_qr_code_thumbnail(i: int, prefix: str, size: int, settings: Optional[QRSettings] = None) -> bytes:
+    """QR code card scaled to `size` pixels. The 1-bit card is cheap at full size, so it is area-averaged down."""
+    from PIL import Image
+    from generation.qr_code_generator.qr_rasterizer import rasterize_matrix
+
+    card = Image.fromarray(rasterize_matrix(qr_matrix(f"{prefix}{i}", settings), i)).convert("L")
+    buffer = BytesIO()
+    card.resize((size, size), Image.Resampling.BOX).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def contact_sheet(images: Sequence[bytes], columns: int, cell_size: int, gap: int = GAP) -> "Image.Image":
+    """Lays the card images out in a grid, left to right and top to bottom."""
+    from PIL import Image
+
+    rows = max(1, -(-len(images) // columns))
+    columns = max(1, min(columns, len(images)))
+    sheet = Image.new("RGB", (gap + columns * (cell_size + gap), gap + rows * (cell_size + gap)), BACKGROUND)
+    for index, data in enumerate(images):
+        row, column = divmod(index, columns)
+        with Image.open(BytesIO(data)) as card:
+            if card.size != (cell_size, cell_size):
+                card = card.resize((cell_size, cell_size), Image.Resampling.BOX)
+            sheet.paste(card.convert("RGB"), (gap + column * (cell_size + gap), gap + row * (cell_size + gap)))
+    return sheet
+
+
+def build_preview(songs: Sequence[Song], qr_prefix: str, output_dir: Path, count: int = DEFAULT_COUNT, columns: int = DEFAULT_COLUMNS, cell_size: int = DEFAULT_CELL_SIZE, jobs: int = 1, pool: Optional[RenderPool] = None, cache: Optional[RenderCache] = None, art: Optional[ArtCache] = None) -> tuple[TaskReport, TaskReport]:
+    """
+    Writes `qr_codes.png` (fronts) and `song_cards.png` (backs) contact sheets of the first `count` cards.
+
+    Cards are rendered directly at `cell_size` on the worker pool; no PDF is involved.
+    Returns the reports of the song card and QR code renders.
+    """
+    # The codes look like the ones of a full build, sized for the whole deck
+    qr_settings = deck_qr_settings(qr_prefix, range(1, len(songs) + 1)) if songs else None
+    songs = sorted(songs, key=lambda song: song.id)[:count]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with profile_stage("preview") as stage, use_pool(pool, jobs) as p:
+        cards_report = p.run(partial(render_song_card_thumbnail, size=cell_size, cache=cache, art=art), songs, desc="Rendering song card previews", unit="card", key=lambda song: song.id)
+        # QR codes are numbered by position, like in a full build
+        qr_report = p.run(partial(render_qr_code_thumbnail, prefix=qr_prefix, size=cell_size, settings=qr_settings), range(1, len(songs) + 1), desc="Rendering QR code previews", unit="qr-code")
+        stage.add_report(cards_report)
+        stage.add_report(qr_report)
+
+    contact_sheet(qr_report.results, columns, cell_size).save(output_dir / "qr_codes.png", optimize=True)
+    contact_sheet(cards_report.results, columns, cell_size).save(output_dir / "song_cards.png", optimize=True)
+    return cards_report, qr_report
@@ -0,0 +1,219 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from generation.render_pool.render_pool import TaskReport
+
+SAMPLE_INTERVAL = 0.01
+PERCENTILES = (50, 90, 99)
+
+_active: Optional["Profiler"] = None
+
+
+@dataclass
+class StageProfile:
+    """Metrics of one pipeline stage. `latencies` holds per-item seconds if latency sampling is on."""
+    name: str
+    depth: int = 0
+    # Stages of datasets built side by side run on different threads
+    thread: int = 0
+    start: float = 0.0
+    seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    worker_cpu_seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+    items: int = 0
+    failures: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def add_items(self, count: int):
+        self.items += count
+
+    def add_report(self, report: TaskReport, latency: bool = True):
+        self.items += len(report.results) + len(report.failures)
+        self.failures += len(report.failures)
+        self.worker_cpu_seconds += report.worker_cpu_seconds
+        if latency:
+            self.latencies.extend(report.durations)
+
+    def percentiles(self) -> dict[str, float]:
+        if not self.latencies:
+            return {}
+        ordered = sorted(self.latencies)
+        values = {f"p{p}": ordered[min(len(ordered) - 1, len(ordered) * p // 100)] for p in PERCENTILES}
+        values["max"] = ordered[-1]
+        return values
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "seconds": round(self.seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "worker_cpu_seconds": round(self.worker_cpu_seconds, 4),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "items": self.items,
+            "failures": self.failures,
+            "latency": {name: round(value, 6) for name, value in self.percentiles().items()},
+        }
+
+
+class Profiler:
+    """
+    Collects a `StageProfile` for every `profile_stage` block run while it is active.
+
+    Stages nest; each one measures its own wall and CPU time, the peak RSS of this
+    process while it ran and the items of the task reports handed to it. With
+    `latency` the per-item durations of those reports are kept for percentiles.
+    """
+
+    def __init__(self, latency: bool = False):
+        self.latency = latency
+        self.stages: list[StageProfile] = []
+        self.origin = time.perf_counter()
+        # Nesting is tracked per thread; threads are numbered in order of their first stage
+        self._local = threading.local()
+        self._threads: dict[int, int] = {}
+
+    @property
+    def depth(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    @depth.setter
+    def depth(self, value: int):
+        self._local.depth = value
+
+    def thread_index(self) -> int:
+        return self._threads.setdefault(threading.get_ident(), len(self._threads))
+
+    def __enter__(self) -> "Profiler":
+        global _active
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = self._previous
+
+    def summary(self) -> list[dict[str, Any]]:
+        return [stage.summary() for stage in self.stages]
+
+    def trace_events(self) -> list[dict[str, Any]]:
+        """Stages as complete events of the Chrome trace format, in microseconds."""
+        pid = os.getpid()
+        events = []
+        for stage in self.stages:
+            events.append({
+                "name": stage.name, "cat": "stage", "ph": "X", "pid": pid, "tid": stage.thread,
+                "ts": round((stage.start - self.origin) * 1e6), "dur": round(stage.seconds * 1e6),
+                "args": {key: value for key, value in stage.summary().items() if key not in ("name", "depth")},
+            })
+        return events
+
+    def write_trace(self, path: Path):
+        """Writes a JSON report that chrome://tracing and Perfetto open as a trace."""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms", "stages": self.summary()}, f, indent=2)
+
+    def format_table(self) -> str:
+        lines = [f"{'stage':<24} {'wall s':>8} {'cpu s':>8} {'workers s':>9} {'peak MB':>8} {'items':>7} {'p50 ms':>8} {'p99 ms':>8}"]
+        # Side-by-side builds interleave their stages; grouping by thread keeps each build together
+        for stage in sorted(self.stages, key=lambda stage: stage.thread):
+            latency = stage.percentiles()
+            p50 = f"{latency['p50'] * 1000:.2f}" if latency else "-"
+            p99 = f"{latency['p99'] * 1000:.2f}" if latency else "-"
+            label = "  " * stage.depth + stage.name
+            lines.append(
+                f"{label:<24} {stage.seconds:>8.2f} {stage.cpu_seconds:>8.2f} {stage.worker_cpu_seconds:>9.2f}"
+                f" {stage.peak_rss_mb:>8.1f} {stage.items:>7} {p50:>8} {p99:>8}"
+            )
+        return "\n".join(lines)
+
+
+class _NullStage:
+    """Stand-in yielded by `profile_stage` when no profiler is active."""
+
+    def add_items(self, count: int):
+        pass
+
+    def add_report(self, report: TaskReport, latency: bool = True):
+        pass
+
+
+@contextmanager
+def profile_stage(name: str) -> Iterator[Any]:
+    """
+    Measures the enclosed block as stage `name` of the active profiler, if any.
+
+    Yields the stage so callers can hand it their task reports with `add_report`.
+    Without an active profiler this costs next to nothing.
+    """
+    profiler = _active
+    if profiler is None:
+        yield _NullStage()
+        return
+
+    stage = StageProfile(name, profiler.depth, profiler.thread_index())
+    profiler.stages.append(stage)
+    profiler.depth += 1
+    sampler = _RSSSampler()
+    sampler.start()
+    stage.start, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield _StageHandle(stage, profiler.latency)
+    finally:
+        profiler.depth -= 1
+        stage.seconds = time.perf_counter() - stage.start
+        stage.cpu_seconds = time.process_time() - cpu
+        stage.peak_rss_mb = sampler.stop()
+
+
+@dataclass
+class _StageHandle:
+    stage: StageProfile
+    latency: bool
+
+    def add_items(self, count: int):
+        self.stage.add_items(count)
+
+    def add_report(self, report: TaskReport, latency: bool = True):
+        self.stage.add_report(report, latency and self.latency)
+
+
+class _RSSSampler(threading.Thread):
+    """Polls the resident set size of this process until stopped and keeps the peak."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(SAMPLE_INTERVAL):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self) -> float:
+        self._stopped.set()
+        self.join()
+        return max(self.peak, current_rss()) / (1024 * 1024)
+
+
+def current_rss() -> int:
+    """Resident set size in bytes; falls back to the peak so far where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+        except ImportError:
+            # Windows has neither /proc nor getrusage
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
@@ -1,56 +1,148 @@
 import argparse
 import os
-import pyqrcode
-from tqdm import tqdm
-from PIL import Image
-import cairosvg
-import textwrap
+from functools import partial
 from pathlib import Path
 from typing import Optional
-from xml.sax.saxutils import escape
-import base64
+from html import escape
+from dataclasses import dataclass
+from generation.render_pool.render_pool import RenderPool, TaskReport, use_pool
+from generation.qr_code_generator.layout import code_offset, code_size, height, label_baseline, label_font_size, label_right, quiet_zone, width
+from generation.archive_writer.archive_writer import ArchiveWriter
+from generation.profiling.profiling import profile_stage
+from generation.qr_code_generator.qr_settings import ERROR_LEVELS, QRSettings, deck_qr_settings, qr_matrix
 
-width, height = 700, 700
 
+@dataclass
+class QRCode:
+    """Payload and printed id of a QR code that is drawn as vectors instead of an image."""
+    data: str
+    id: int
+    settings: Optional[QRSettings] = None
 
-def generate_qr_code(data: str, output_file: Path, scale: int, id: int):
-    """Generate a QR code for the given data and save it as an image."""
 
-    url = pyqrcode.create(data)
+def qr_rectangles(matrix: list[list[int]]) -> list[tuple[int, int, int, int]]:
+    """
+    Merges the dark modules into as few rectangles as possible, as `(column, row, width, height)` in modules.
 
-    png_data = url.png_as_base64_str(scale=scale)
+    Horizontal runs are merged first, then a run is stacked onto the rectangle directly
+    above it when both span the same columns.
+    """
+    rectangles: list[list[int]] = []
+    open_rectangles: dict[tuple[int, int], list[int]] = {}
+
+    for row_index, row in enumerate(matrix):
+        runs: dict[tuple[int, int], list[int]] = {}
+        column = 0
+        while column < len(row):
+            if not row[column]:
+                column += 1
+                continue
+            start = column
+            while column < len(row) and row[column]:
+                column += 1
+
+            rectangle = open_rectangles.get((start, column))
+            if rectangle is not None:
+                rectangle[3] += 1
+            else:
+                rectangle = [start, row_index, column - start, 1]
+                rectangles.append(rectangle)
+            runs[(start, column)] = rectangle
+        open_rectangles = runs
+
+    return [tuple(rectangle) for rectangle in rectangles]
+
+
+def qr_module_size(matrix: list[list[int]]) -> float:
+    """Size of one module in card pixels."""
+    return code_size / (len(matrix) + 2 * quiet_zone)
+
+
+def render_qr_code_svg(data: str, id: int, settings: Optional[QRSettings] = None) -> str:
+    """Render a QR code as an SVG with a single path for all modules."""
+    matrix = qr_matrix(data, settings)
+    module = qr_module_size(matrix)
+    origin = code_offset + quiet_zone * module
+
+    path = "".join(
+        f"M{origin + x * module:g} {origin + y * module:g}h{w * module:g}v{h * module:g}h{-w * module:g}z"
+        for x, y, w, h in qr_rectangles(matrix)
+    )
+
+    return f"""<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">
+    <rect width="100%" height="100%" fill="white"/>
+    <path d="{path}" fill="black" shape-rendering="crispEdges"/>
+    <text x="{label_right}" y="{label_baseline}" font-size="{label_font_size}" font-family="Arial" text-anchor="end" fill="gray">{escape(str(id), quote=False)}</text>
+</svg>
+"""
+
+
+def render_qr_code(data: str, id: int, settings: Optional[QRSettings] = None) -> bytes:
+    """Render a QR code for the given data and return the PNG data."""
+    # numpy and Pillow are only needed for PNG output, not for SVG or vector PDF codes
+    from generation.qr_code_generator.qr_rasterizer import rasterize_qr_code
+    return rasterize_qr_code(data, id, settings)
+
+
+def generate_qr_code(data: str, output_file: Path, id: int, settings: Optional[QRSettings] = None):
+    """Generate a QR code for the given data and save it as an image."""
+    if output_file.suffix == ".svg":
+        output_file.write_text(render_qr_code_svg(data, id, settings))
+    else:
+        output_file.write_bytes(render_qr_code(data, id, settings))
 
-    # Create SVG content with base64 PNG
-    svg_content = f"""
-    <svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">
-        <!-- Background -->
-        <rect width="100%" height="100%" fill="white"/>
+    return output_file
 
-        <!-- QR Code Image -->
-        <image x="100" y="100" width="500" height="500" href="data:image/png;base64,{png_data}" />
 
-        <!-- Song ID (Bottom Right) -->
-        <text x="{width - 20}" y="{height - 20}" font-size="20" font-family="Arial" text-anchor="end" fill="gray">{escape(str(id))}</text>
-    </svg>
-    """
+def _generate_qr_code_for_id(i: int, prefix: str, output_dir: Path, file_format: str, settings: QRSettings) -> Path:
+    data = f"{prefix}{i}"
+    filename = Path(os.path.join(output_dir, f"code-{i}.{file_format}"))
 
-    # Convert the SVG to PNG and save it
-    cairosvg.svg2png(bytestring=svg_content.encode('utf-8'), write_to=str(output_file.absolute()), output_width=width, output_height=height)
+    return generate_qr_code(data, filename, i, settings)
 
-    return output_file
 
+def generate_qr_codes(prefix: str, id_range: range, output_dir: Path, file_format, jobs: int = 1, pool: Optional[RenderPool] = None, settings: Optional[QRSettings] = None) -> TaskReport:
+    """
+    Generate QR codes for a range of IDs and save them as images.
 
-def generate_qr_codes(prefix: str, id_range: range, output_dir: Path, file_format, scale):
-    """Generate QR codes for a range of IDs and save them as images."""
+    All codes share `settings`, by default the smallest version that fits the whole range,
+    so they print at the same module size.
+    """
 
     # Create the output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
+    settings = settings or deck_qr_settings(prefix, id_range)
+    render = partial(_generate_qr_code_for_id, prefix=prefix, output_dir=output_dir, file_format=file_format, settings=settings)
+
+    with profile_stage("qr_codes") as stage, use_pool(pool, jobs) as p:
+        report = p.run(render, id_range, desc="Generating QR codes", unit="qr-code")
+        stage.add_report(report)
+        return report
+
+
+def _render_qr_code_for_id(i: int, prefix: str, file_format: str, settings: QRSettings) -> bytes:
+    if file_format == "svg":
+        return render_qr_code_svg(f"{prefix}{i}", i, settings).encode("utf-8")
+    return render_qr_code(f"{prefix}{i}", i, settings)
 
-    for i in tqdm(id_range, unit="qr-code", desc=f"Generating QR codes"):
-        data = f"{prefix}{i}"
-        filename = Path(os.path.join(output_dir, f"code-{i}.{file_format}"))
 
-        generate_qr_code(data, filename, scale, i)
+def render_qr_codes(prefix: str, id_range: range, jobs: int = 1, pool: Optional[RenderPool] = None, file_format: str = "png", settings: Optional[QRSettings] = None) -> TaskReport:
+    """Render QR codes for a range of IDs in memory. The report holds the file data in id order."""
+    render = partial(_render_qr_code_for_id, prefix=prefix, file_format=file_format, settings=settings or deck_qr_settings(prefix, id_range))
+
+    with profile_stage("qr_codes") as stage, use_pool(pool, jobs) as p:
+        report = p.run(render, id_range, desc="Generating QR codes", unit="qr-code")
+        stage.add_report(report)
+        return report
+
+def write_qr_codes_to_archive(prefix: str, id_range: range, archive: ArchiveWriter, file_format: str = "png", jobs: int = 1, pool: Optional[RenderPool] = None, settings: Optional[QRSettings] = None) -> TaskReport:
+    """Render QR codes for a range of IDs straight into `archive`. The report holds the entry names in id order."""
+    render = partial(_render_qr_code_for_id, prefix=prefix, file_format=file_format, settings=settings or deck_qr_settings(prefix, id_range))
+
+    with profile_stage("qr_codes") as stage, use_pool(pool, jobs) as p:
+        report = archive.write_tasks(p, render, id_range, lambda i: f"qr_codes/code-{i}.{file_format}", desc="Generating QR codes", unit="qr-code")
+        stage.add_report(report)
+        return report
 
 def main():
     # Create the argument parser
@@ -60,9 +152,10 @@ def main():
     parser.add_argument('--prefix', type=str, default="id=", help="Prefix for the QR code data.")
     parser.add_argument('--start', type=int, default=1, help="Start of the ID range.")
     parser.add_argument('--end', type=int, default=700, help="End of the ID range.")
-    parser.add_argument('--output', type=str, default="out/qr_codes", help="Directory to save the QR code images.")
+    parser.add_argument('--output', type=Path, default="out/qr_codes", help="Directory to save the QR code images.")
     parser.add_argument('--format', choices=['png', 'svg'], default='png', help="Format of the QR code image (png or svg).")
-    parser.add_argument('--scale', type=int, default=6, help="Scale for the generated QR codes.")
+    parser.add_argument('--jobs', type=int, default=1, help="Number of worker processes (0 = one per CPU core).")
+    parser.add_argument('--min-error', choices=ERROR_LEVELS, default="L", help="Lowest error correction level; higher ones are used when they fit the same version.")
 
     # Parse the arguments
     args = parser.parse_args()
@@ -70,8 +163,13 @@ def main():
     # Generate the range of IDs based on the start and end arguments
     id_range = range(args.start, args.end + 1)
 
+    settings = deck_qr_settings(args.prefix, id_range, args.min_error)
+    print(f"QR codes: {settings}")
+
     # Call the function to generate QR codes
-    generate_qr_codes(args.prefix, id_range, args.output, args.format, args.scale)
+    report = generate_qr_codes(args.prefix, id_range, args.output, args.format, jobs=args.jobs, settings=settings)
+    for failure in report.failures:
+        print(f"Failed to generate QR code {failure}")
 
 
 if __name__ == "__main__":
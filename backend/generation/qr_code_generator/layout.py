@@ -0,0 +1,10 @@
+# Layout of a QR code card in pixels, shared by the rasterizer, the SVG output and the vector PDF cards
+width, height = 700, 700
+
+# The code including its quiet zone fills a code_size square at (code_offset, code_offset)
+code_offset, code_size = 100, 500
+quiet_zone = 4
+
+# The id is right aligned in the bottom right corner
+label_font_size = 20
+label_right, label_baseline = width - 20, height - 20
@@ -0,0 +1,83 @@
+from functools import lru_cache
+from io import BytesIO
+from typing import Optional
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from generation.qr_code_generator.qr_settings import QRSettings, qr_matrix
+from generation.qr_code_generator.layout import code_offset, code_size, height, label_baseline, label_font_size, label_right, quiet_zone, width
+
+digits = "0123456789"
+
+
+class GlyphStrip:
+    """The digits rendered once into a 1-bit strip, so labels are composited by slicing instead of drawing text."""
+
+    def __init__(self, font_size: int = label_font_size):
+        font = load_label_font(font_size)
+        self.ascent, descent = font.getmetrics()
+        self.offsets: dict[str, tuple[int, int]] = {}
+
+        x = 0
+        for digit in digits:
+            advance = round(font.getlength(digit))
+            self.offsets[digit] = (x, advance)
+            x += advance
+
+        image = Image.new("L", (x, self.ascent + descent), 255)
+        draw = ImageDraw.Draw(image)
+        for digit, (start, _) in self.offsets.items():
+            draw.text((start, self.ascent), digit, font=font, fill=0, anchor="ls")
+
+        # True is white, like in mode "1" images
+        self.pixels = np.asarray(image) >= 128
+
+    def label(self, text: str) -> np.ndarray:
+        return np.concatenate([self.pixels[:, start:start + advance] for start, advance in (self.offsets[c] for c in text)], axis=1)
+
+
+def load_label_font(font_size: int) -> ImageFont.FreeTypeFont:
+    for name in ("Arial.ttf", "arial.ttf", "DejaVuSans.ttf"):
+        try:
+            return ImageFont.truetype(name, font_size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=font_size)
+
+
+@lru_cache(maxsize=None)
+def glyph_strip() -> GlyphStrip:
+    # Built once per process
+    return GlyphStrip()
+
+
+@lru_cache(maxsize=None)
+def module_repeats(modules: int) -> np.ndarray:
+    """How many pixels each module (quiet zone included) spans so that all of them add up to exactly code_size."""
+    edges = np.round(np.arange(modules + 1) * code_size / modules).astype(int)
+    return np.diff(edges)
+
+
+def rasterize_matrix(matrix: list[list[int]], id: int) -> np.ndarray:
+    """Upscales a module matrix onto a white card with the id label. True is white."""
+    modules = np.pad(np.asarray(matrix, dtype=bool), quiet_zone)
+    repeats = module_repeats(modules.shape[0])
+    code = np.repeat(np.repeat(modules, repeats, axis=0), repeats, axis=1)
+
+    card = np.ones((height, width), dtype=bool)
+    card[code_offset:code_offset + code_size, code_offset:code_offset + code_size] = ~code
+
+    strip = glyph_strip()
+    label = strip.label(str(id))
+    top = label_baseline - strip.ascent
+    card[top:top + label.shape[0], label_right - label.shape[1]:label_right] &= label
+
+    return card
+
+
+def rasterize_qr_code(data: str, id: int, settings: Optional[QRSettings] = None) -> bytes:
+    """Renders a QR code card as a 1-bit PNG."""
+    card = rasterize_matrix(qr_matrix(data, settings), id)
+
+    buffer = BytesIO()
+    Image.fromarray(card).save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional
+import pyqrcode
+from pyqrcode.tables import data_capacity, modes
+from generation.dataset_info.dataset_info import update_info
+
+# Error correction levels from the least to the most redundant
+ERROR_LEVELS = ("L", "M", "Q", "H")
+MAX_VERSION = 40
+# Modes from the densest to the most general
+MODES = ("numeric", "alphanumeric", "binary")
+# Key of the deck's QR settings in a dataset's info.json
+INFO_KEY = "qr_codes"
+NUMERIC = frozenset("0123456789")
+ALPHANUMERIC = frozenset("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:")
+
+
+@dataclass(frozen=True)
+class QRSettings:
+    """Version, error correction level and encoding mode shared by every QR code of a deck."""
+    version: int
+    error: str
+    mode: str
+
+    @property
+    def modules(self) -> int:
+        """Modules per side, without quiet zone."""
+        return 17 + 4 * self.version
+
+    def fits(self, payloads: Iterable[str]) -> bool:
+        """Whether every payload can be encoded with these settings."""
+        payloads = list(payloads)
+        if MODES.index(payload_mode(payloads)) > MODES.index(self.mode):
+            return False
+        capacity = data_capacity[self.version][self.error][modes[self.mode]]
+        return all(payload_length(payload, self.mode) <= capacity for payload in payloads)
+
+    def create(self, data: str) -> pyqrcode.QRCode:
+        return pyqrcode.create(data, error=self.error, version=self.version, mode=self.mode)
+
+    def __str__(self) -> str:
+        return f"version {self.version} ({self.modules}×{self.modules} modules), error correction {self.error}, {self.mode} mode"
+
+
+def payload_mode(payloads: Iterable[str]) -> str:
+    """The densest mode whose character set covers every payload."""
+    characters = set().union(*(set(payload) for payload in payloads))
+    if characters <= NUMERIC:
+        return "numeric"
+    if characters <= ALPHANUMERIC:
+        return "alphanumeric"
+    return "binary"
+
+
+def payload_length(payload: str, mode: str) -> int:
+    # Capacities count digits or characters, but bytes in binary mode
+    return len(payload.encode("utf-8")) if mode == "binary" else len(payload)
+
+
+def choose_qr_settings(payloads: Iterable[str], min_error: str = "L") -> QRSettings:
+    """
+    Smallest QR code that fits every payload, with as much error correction as that size allows.
+
+    The version is the lowest one that holds the longest payload at `min_error`. The level
+    is then raised as long as the version stays the same, since that costs no modules.
+    """
+    payloads = list(payloads)
+    if not payloads:
+        raise ValueError("no QR code payloads")
+    mode = payload_mode(payloads)
+    longest = max(payload_length(payload, mode) for payload in payloads)
+    mode_number = modes[mode]
+
+    version = next((v for v in range(1, MAX_VERSION + 1) if data_capacity[v][min_error][mode_number] >= longest), None)
+    if version is None:
+        raise ValueError(f"a {longest} character payload does not fit in any QR code version at level {min_error}")
+
+    error = min_error
+    for level in ERROR_LEVELS[ERROR_LEVELS.index(min_error) + 1:]:
+        if data_capacity[version][level][mode_number] < longest:
+            break
+        error = level
+    return QRSettings(version, error, mode)
+
+
+def deck_qr_settings(prefix: str, id_range: range, min_error: str = "L") -> QRSettings:
+    """Settings for the codes `prefix + id` of a whole deck."""
+    return choose_qr_settings((f"{prefix}{i}" for i in id_range), min_error)
+
+
+def qr_matrix(data: str, settings: Optional[QRSettings] = None) -> list[list[int]]:
+    """Module matrix of the QR code for `data`, without quiet zone. 1 is a dark module."""
+    return (settings or choose_qr_settings([data])).create(data).code
+
+
+def store_settings(info_path: Path, settings: QRSettings, min_error: str):
+    """Records the deck's settings in its info.json, so updates keep encoding it like the original build."""
+    update_info(info_path, **{INFO_KEY: {"version": settings.version, "error": settings.error, "mode": settings.mode, "min_error": min_error}})
+
+
+def settings_from_info(info: dict[str, Any]) -> tuple[Optional[QRSettings], str]:
+    """The settings and minimum error level stored in info.json; no settings for datasets built before they were stored."""
+    entry = info.get(INFO_KEY)
+    if entry is None:
+        return None, "L"
+    return QRSettings(entry["version"], entry["error"], entry["mode"]), entry["min_error"]
@@ -0,0 +1,92 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+from generation.render_pool.render_pool import count
+
+# Bump whenever the rendering code changes in a way the SVG source doesn't capture
+RENDERER_VERSION = 1
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+
+class RenderCache:
+    """
+    Content-addressed on-disk cache for rendered PNGs.
+
+    Entries are keyed by a hash of the SVG source and the render parameters, so the
+    same card in different datasets or runs is only rasterized once. Reads refresh an
+    entry's mtime, which `prune` uses to evict the least recently used entries.
+    """
+
+    def __init__(self, cache_dir: Path, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(svg: str, **params) -> str:
+        digest = hashlib.sha256(f"v{RENDERER_VERSION};".encode())
+        for name, value in sorted(params.items()):
+            digest.update(f"{name}={value};".encode())
+        digest.update(svg.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            count("cache_misses")
+            return None
+
+        count("cache_hits")
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self.path_for(key)
+        path.parent.mkdir(exist_ok=True)
+
+        # Write to a private file first so concurrent workers never see half an entry
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def prune(self) -> int:
+        """Evicts least recently used entries until the cache fits `max_size`. Returns the number removed."""
+        entries = []
+        for path in self.cache_dir.glob("*/*.png"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+            removed += 1
+
+        return removed
+
+
+def svg_to_png_bytes(svg_content: str, width: int, height: int, cache: Optional[RenderCache] = None, **params) -> bytes:
+    """Rasterizes an SVG to PNG bytes, reusing a cached PNG when the same input was rendered before."""
+    # cairosvg loads the native cairo library, so it is only imported once something is rasterized
+    import cairosvg
+
+    if cache is None:
+        return cairosvg.svg2png(bytestring=svg_content.encode('utf-8'), output_width=width, output_height=height)
+
+    key = cache.make_key(svg_content, width=width, height=height, renderer=f"cairosvg-{cairosvg.__version__}", **params)
+    data = cache.get(key)
+    if data is None:
+        data = cairosvg.svg2png(bytestring=svg_content.encode('utf-8'), output_width=width, output_height=height)
+        cache.put(key, data)
+
+    return data
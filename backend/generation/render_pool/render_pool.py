@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, Sequence
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Chunks submitted per worker ahead of the results being consumed
+CHUNKS_IN_FLIGHT = 2
+
+
+@dataclass
+class TaskFailure:
+    key: Any
+    error: str
+
+    def __str__(self) -> str:
+        return f"{self.key}: {self.error}"
+
+
+@dataclass
+class TaskReport:
+    results: list[Any] = field(default_factory=list)
+    failures: list[TaskFailure] = field(default_factory=list)
+    counters: Counter = field(default_factory=Counter)
+    # Seconds each task took, in input order, and CPU time spent in worker processes
+    durations: list[float] = field(default_factory=list)
+    worker_cpu_seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+_task_counters: Counter = Counter()
+
+
+def count(name: str, n: int = 1):
+    """Adds to a named counter of the running task. The counts are summed into `TaskReport.counters`."""
+    _task_counters[name] += n
+
+
+def _call(fn: Callable[[Any], Any], item: Any) -> tuple[bool, Any, dict[str, int], float, float]:
+    """Run a task and turn any exception into a picklable error message. Also returns its wall and CPU time."""
+    _task_counters.clear()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        ok, value = True, fn(item)
+    except Exception as e:
+        ok, value = False, f"{type(e).__name__}: {e}"
+    return ok, value, dict(_task_counters), time.perf_counter() - start, time.process_time() - cpu_start
+
+
+def _call_chunk(task: Callable[[Any], Any], chunk: list[Any]) -> list[Any]:
+    return [task(item) for item in chunk]
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Map the `--jobs` value to a worker count, 0 meaning one worker per CPU core."""
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+class RenderPool:
+    """
+    Process pool shared by the rendering stages.
+
+    With a single job everything runs in the calling process, so the serial
+    behaviour (and its tracebacks) stays exactly as before.
+    """
+
+    def __init__(self, jobs: int = 1):
+        self.jobs = resolve_jobs(jobs)
+        self._executor: Optional["ProcessPoolExecutor"] = None
+        # Several datasets may start submitting at the same time, see build-all
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "RenderPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @property
+    def executor(self) -> "ProcessPoolExecutor":
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.jobs)
+            return self._executor
+
+    def start(self):
+        """
+        Starts the worker processes now instead of at the first task.
+
+        Workers are forked from this process, so they have to exist before other threads
+        submit work: a fork while another thread holds a lock leaves the child stuck on it.
+        """
+        if self.jobs > 1:
+            self.executor.submit(int).result()
+
+    def imap(self, fn: Callable[[Any], Any], items: Sequence[Any], desc: str, unit: str = "item", key: Callable[[Any], Any] = lambda item: item, report: Optional[TaskReport] = None) -> Iterator[tuple[Any, Any]]:
+        """
+        Yields `(item, result)` pairs in input order.
+
+        A task that raised yields a `TaskFailure` carrying `key(item)` instead of a result.
+        Counters and timings recorded for the tasks are added to `report` if given.
+        """
+        from tqdm import tqdm
+
+        task = partial(_call, fn)
+        if self.jobs == 1:
+            outcomes = map(task, items)
+        else:
+            outcomes = self._windowed_map(task, items)
+
+        with tqdm(total=len(items), desc=desc, unit=unit) as progress:
+            for item, (ok, value, task_counters, seconds, cpu_seconds) in zip(items, outcomes):
+                progress.update()
+                if report is not None:
+                    report.counters.update(task_counters)
+                    report.durations.append(seconds)
+                    if self.jobs > 1:
+                        report.worker_cpu_seconds += cpu_seconds
+                yield item, value if ok else TaskFailure(key(item), value)
+
+    def _windowed_map(self, task: Callable[[Any], Any], items: Sequence[Any]) -> Iterator[Any]:
+        """
+        Like `executor.map` with chunks, in input order, but submits only a few chunks per worker ahead.
+
+        `executor.map` pickles every item up front, which holds all of them in the call
+        queue at once; here the items are sent as the workers catch up.
+        """
+        chunksize = max(1, len(items) // (self.jobs * 8))
+        remaining = iter(items)
+        in_flight: deque = deque()
+        while chunk := list(islice(remaining, chunksize)):
+            in_flight.append(self.executor.submit(_call_chunk, task, chunk))
+            if len(in_flight) >= self.jobs * CHUNKS_IN_FLIGHT:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+    def run(self, fn: Callable[[Any], Any], items: Sequence[Any], desc: str, unit: str = "item", key: Callable[[Any], Any] = lambda item: item) -> TaskReport:
+        """Runs `fn` over all items. Failed items keep their slot in `results` as None."""
+        report = TaskReport()
+        for _, result in self.imap(fn, items, desc, unit, key, report):
+            if isinstance(result, TaskFailure):
+                report.failures.append(result)
+                report.results.append(None)
+            else:
+                report.results.append(result)
+        return report
+
+
+@contextmanager
+def use_pool(pool: Optional[RenderPool], jobs: int) -> Iterator[RenderPool]:
+    """Yields the given pool, or a temporary one with `jobs` workers."""
+    if pool is not None:
+        yield pool
+        return
+
+    with RenderPool(jobs) as own_pool:
+        yield own_pool
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Optional
+from generation.models.song import Song
+from generation.card_generator.generate_song_card import render_song_card
+from generation.qr_code_generator.code_generation import QRCode, render_qr_code, render_qr_code_svg
+from generation.qr_code_generator.qr_settings import QRSettings, deck_qr_settings
+from generation.render_pool.render_pool import RenderPool
+from generation.render_cache.render_cache import RenderCache
+from generation.album_art.art_cache import ArtCache
+from generation.dataset_info.dataset_info import song_card_mode
+
+DEFAULT_LRU_ENTRIES = 512
+DEFAULT_LRU_BYTES = 256 * 1024 * 1024
+# Largest request body accepted, a page of songs is a few kB
+MAX_BODY = 1024 * 1024
+WARMUP_SONG = Song(0, "Warm up", "TrackStar", 2000)
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU of rendered outputs, bounded by entry count and total size."""
+
+    def __init__(self, max_entries: int = DEFAULT_LRU_ENTRIES, max_bytes: int = DEFAULT_LRU_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+def _render_song_card(song: dict[str, Any], cache: Optional[RenderCache], art: Optional[ArtCache]) -> bytes:
+    return render_song_card(Song(**song), cache, art)
+
+
+def _render_qr_code(data: str, id: int, file_format: str, settings: Optional[QRSettings] = None) -> bytes:
+    if file_format == "svg":
+        return render_qr_code_svg(data, id, settings).encode("utf-8")
+    return render_qr_code(data, id, settings)
+
+
+def _warm_up(art: Optional[ArtCache]) -> int:
+    # Loads cairo, fonts and the QR rasterizer once per worker before the first real request
+    render_song_card(WARMUP_SONG, None, art)
+    render_qr_code("warm-up", 0)
+    return os.getpid()
+
+
+def page_qr_settings(prefix: str, ids: range, deck_size: Optional[int] = None, qr_settings: Optional[dict[str, Any]] = None) -> QRSettings:
+    """QR settings for the codes `ids` of a deck, given explicitly or by the deck's size."""
+    payloads = [f"{prefix}{i}" for i in ids]
+    if qr_settings is not None:
+        settings = QRSettings(int(qr_settings["version"]), str(qr_settings["error"]), str(qr_settings["mode"]))
+        if not settings.fits(payloads):
+            raise ValueError(f"the QR codes of this page do not fit {settings}")
+        return settings
+    if deck_size is not None and deck_size < ids.stop - 1:
+        raise ValueError(f"a deck of {deck_size} songs has no id {ids.stop - 1}")
+    return deck_qr_settings(prefix, range(1, (deck_size or ids.stop - 1) + 1))
+
+
+class RenderService:
+    """
+    Renders song cards, QR codes and PDF page pairs for the server, keeping results in an LRU.
+
+    With more than one job renders run on a warm process pool, so concurrent requests
+    do not queue behind each other; with one job they run in the request thread.
+    """
+
+    def __init__(self, jobs: int = 1, lru: Optional[LRUCache] = None, cache: Optional[RenderCache] = None, art: Optional[ArtCache] = None):
+        self.pool = RenderPool(jobs)
+        self.lru = lru or LRUCache()
+        self.cache = cache
+        self.art = art
+        self.renders = 0
+
+    def warm_up(self):
+        if self.pool.jobs == 1:
+            _warm_up(self.art)
+            return
+        futures = [self.pool.executor.submit(_warm_up, self.art) for _ in range(self.pool.jobs)]
+        for future in futures:
+            future.result()
+
+    def close(self):
+        self.pool.close()
+
+    def _submit(self, fn: Callable[..., bytes], *args) -> Future:
+        if self.pool.jobs > 1:
+            return self.pool.executor.submit(fn, *args)
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    @staticmethod
+    def _key(kind: str, params: Any) -> str:
+        return hashlib.sha256(f"{kind};{json.dumps(params, sort_keys=True)}".encode("utf-8")).hexdigest()
+
+    def _cached(self, kind: str, params: dict[str, Any], fn: Callable[..., bytes], *args) -> Future:
+        key = self._key(kind, params)
+        data = self.lru.get(key)
+        if data is not None:
+            future: Future = Future()
+            future.set_result(data)
+            return future
+        self.renders += 1
+        future = self._submit(fn, *args)
+
+        def remember(done: Future):
+            if done.exception() is None:
+                self.lru.put(key, done.result())
+
+        future.add_done_callback(remember)
+        return future
+
+    def song_card(self, song: dict[str, Any]) -> Future:
+        song = Song(**song).dict()
+        return self._cached("song_card", song, _render_song_card, song, self.cache, self.art)
+
+    def qr_code(self, data: str, id: int, file_format: str = "png", settings: Optional[QRSettings] = None) -> Future:
+        if file_format not in ("png", "svg"):
+            raise ValueError(f"unknown QR code format {file_format!r}")
+        params = {"data": data, "id": id, "format": file_format, "settings": str(settings) if settings else None}
+        return self._cached("qr_code", params, _render_qr_code, data, id, file_format, settings)
+
+    def pdf_page(self, songs: list[dict[str, Any]], prefix: str, start_id: int = 1, vector_cards: bool = False, vector_qr_codes: bool = False, deck_size: Optional[int] = None, qr_settings: Optional[dict[str, Any]] = None) -> bytes:
+        """
+        One printable sheet (QR code front and song card back) for up to eight songs, as a PDF.
+
+        The QR codes are encoded with `qr_settings` (the "qr_codes" entry of the dataset's
+        info.json) or sized for a deck of `deck_size` codes, so the page matches the printed
+        deck. Without either they are sized for a deck ending on this page.
+        """
+        from generation.pdf_generator.generate_pdf import PDFCreator
+
+        songs = sorted((Song(**song) for song in songs), key=lambda song: song.id)
+        if not 1 <= len(songs) <= 8:
+            raise ValueError("a page holds 1 to 8 songs")
+        ids = range(start_id, start_id + len(songs))
+        settings = page_qr_settings(prefix, ids, deck_size, qr_settings)
+        key = self._key("pdf_page", [[song.dict() for song in songs], prefix, start_id, vector_cards, vector_qr_codes, str(settings)])
+        page = self.lru.get(key)
+        if page is not None:
+            return page
+        # Cards come from the LRU where possible, so editing one card re-renders only that card
+        if vector_qr_codes:
+            qr_codes = [QRCode(f"{prefix}{i}", i, settings) for i in ids]
+        else:
+            qr_codes = [future.result() for future in [self.qr_code(f"{prefix}{i}", i, settings=settings) for i in ids]]
+        if vector_cards:
+            song_cards = songs
+        else:
+            song_cards = [future.result() for future in [self.song_card(song.dict()) for song in songs]]
+
+        buffer = BytesIO()
+        creator = PDFCreator(buffer, None, None, ids.start, ids.stop - 1, songs=songs, vector_cards=vector_cards, vector_qr_codes=vector_qr_codes, qr_code_prefix=prefix, qr_settings=settings, song_card_mode=song_card_mode(self.art is not None))
+        creator.write_pages(qr_codes, song_cards)
+        self.lru.put(key, buffer.getvalue())
+        return buffer.getvalue()
+
+    def stats(self) -> dict[str, Any]:
+        return {"jobs": self.pool.jobs, "renders": self.renders, "lru": self.lru.stats()}
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /song-card  {"id", "title", "artist", "year", ...}               -> image/png
+    POST /qr-code    {"data" or "prefix", "id", "format": "png" | "svg"}  -> image/png or image/svg+xml
+    POST /pdf-page   {"songs": [...], "prefix", "start_id", "vector_cards", "vector_qr_codes",
+                      "deck_size" or "qr_settings": {"version", "error", "mode"}}     -> application/pdf
+    GET  /health                                                          -> JSON stats
+    """
+    server_version = "TrackStarRenderServer"
+    protocol_version = "HTTP/1.1"
+    service: RenderService
+    verbose = False
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status: int, content_type: str, body: bytes, headers: Optional[dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status: int, data: Any):
+        self.send_body(status, "application/json", json.dumps(data).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, self.service.stats())
+        else:
+            self.send_json(404, {"error": f"unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.send_json(413, {"error": "request body too large"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self.send_json(400, {"error": f"invalid JSON: {e}"})
+            return
+
+        start = time.perf_counter()
+        try:
+            if self.path == "/song-card":
+                content_type, data = "image/png", self.service.song_card(body).result()
+            elif self.path == "/qr-code":
+                file_format = body.get("format", "png")
+                payload = body["data"] if "data" in body else f"{body.get('prefix', '')}{body['id']}"
+                content_type = "image/svg+xml" if file_format == "svg" else "image/png"
+                data = self.service.qr_code(payload, int(body["id"]), file_format).result()
+            elif self.path == "/pdf-page":
+                options = {key: body[key] for key in ("start_id", "vector_cards", "vector_qr_codes", "deck_size", "qr_settings") if key in body}
+                content_type, data = "application/pdf", self.service.pdf_page(body["songs"], body.get("prefix", ""), **options)
+            else:
+                self.send_json(404, {"error": f"unknown endpoint {self.path}"})
+                return
+        except (KeyError, TypeError, ValueError) as e:
+            self.send_json(400, {"error": f"bad request: {type(e).__name__}: {e}"})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        self.send_body(200, content_type, data, {"X-Render-Time-Ms": f"{(time.perf_counter() - start) * 1000:.1f}"})
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: RenderService, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[Path] = None, verbose: bool = False) -> socketserver.BaseServer:
+    """HTTP server on `host:port`, or on a Unix socket if `socket_path` is given, answering from `service`."""
+    handler = type("Handler", (RenderRequestHandler,), {"service": service, "verbose": verbose})
+    if socket_path is not None:
+        socket_path.unlink(missing_ok=True)
+        return ThreadingUnixHTTPServer(str(socket_path), handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
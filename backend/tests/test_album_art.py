@@ -0,0 +1,96 @@
+"""
+Album art fetcher against a local HTTP stand-in.
+
+Run from backend/:  python -m pytest tests/test_album_art.py
+"""
+import io
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+import pytest
+from PIL import Image
+from generation.album_art.album_art import MAX_RETRY_AFTER, AlbumArtFetcher, fetch_album_art
+from generation.album_art.art_cache import ArtCache
+
+
+def _png(color: str) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(output, format="PNG")
+    return output.getvalue()
+
+
+class ArtHandler(BaseHTTPRequestHandler):
+    """/art.png is always there, /busy.png answers 429 once and /missing.png is a 404."""
+    protocol_version = "HTTP/1.1"
+    images = {"/art.png": _png("red"), "/busy.png": _png("blue")}
+    requests: Counter
+
+    def log_message(self, format: str, *args):
+        pass
+
+    def send(self, status: int, body: bytes = b"", headers: Optional[dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.requests[self.path] += 1
+        if self.path == "/busy.png" and self.requests[self.path] == 1:
+            self.send(429, headers={"Retry-After": "0"})
+        elif self.path not in self.images:
+            self.send(404)
+        elif self.headers.get("If-None-Match") == f'"{self.path}"':
+            self.send(304)
+        else:
+            self.send(200, self.images[self.path], {"Content-Type": "image/png", "ETag": f'"{self.path}"'})
+
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (ArtHandler,), {"requests": Counter()})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", handler.requests
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch_retries_429_and_reports_404(server, tmp_path: Path):
+    base, requests = server
+    cache = ArtCache(tmp_path)
+    urls = [f"{base}/art.png", f"{base}/busy.png", f"{base}/missing.png", None]
+
+    report = fetch_album_art(urls, cache)
+
+    assert report.downloaded == 2
+    assert report.failures == {f"{base}/missing.png": "HTTP 404"}
+    assert requests["/busy.png"] == 2
+    for url in urls[:2]:
+        with Image.open(io.BytesIO(cache.thumbnail(url))) as thumbnail:
+            # Cropped to a square around the centre
+            assert thumbnail.size == (48, 48)
+    assert cache.thumbnail(f"{base}/missing.png") is None
+
+
+def test_fetch_revalidates_cached_art(server, tmp_path: Path):
+    base, requests = server
+    cache = ArtCache(tmp_path)
+    fetch_album_art([f"{base}/art.png"], cache)
+
+    report = fetch_album_art([f"{base}/art.png"], cache)
+
+    assert (report.downloaded, report.not_modified, report.ok) == (0, 1, True)
+    assert requests["/art.png"] == 2
+
+
+def test_retry_after_is_clamped(tmp_path: Path):
+    fetcher = AlbumArtFetcher(ArtCache(tmp_path))
+    assert fetcher._delay(0, "2") == 2
+    assert fetcher._delay(0, "86400") == MAX_RETRY_AFTER
+    assert fetcher._delay(0, "Wed, 21 Oct 2099 07:28:00 GMT") == MAX_RETRY_AFTER
@@ -0,0 +1,33 @@
+"""
+Joining PDF shards without keeping the whole document.
+
+Run from backend/:  python -m pytest tests/test_concat_pdf.py
+"""
+from pathlib import Path
+from pypdf import PdfReader
+from reportlab.pdfgen import canvas
+from generation.pdf_generator.concat_pdf import concat_pdfs
+
+
+def _shard(path: Path, labels: list[str]) -> Path:
+    pdf_canvas = canvas.Canvas(str(path))
+    # A form shared by the pages, like the cut-line grid
+    pdf_canvas.beginForm("grid")
+    pdf_canvas.line(0, 0, 100, 100)
+    pdf_canvas.endForm()
+    for label in labels:
+        pdf_canvas.doForm("grid")
+        pdf_canvas.drawString(50, 50, label)
+        pdf_canvas.showPage()
+    pdf_canvas.save()
+    return path
+
+
+def test_concat_keeps_pages_in_order(tmp_path: Path):
+    shards = [_shard(tmp_path / "a.pdf", ["one", "two"]), _shard(tmp_path / "b.pdf", ["three"])]
+
+    assert concat_pdfs(shards, tmp_path / "out.pdf") == 3
+
+    reader = PdfReader(tmp_path / "out.pdf", strict=True)
+    assert [page.extract_text().strip() for page in reader.pages] == ["one", "two", "three"]
+    assert all("/FormXob.grid" in page["/Resources"]["/XObject"] for page in reader.pages)
@@ -0,0 +1,11 @@
+"""
+Start-up budget of the generate.py CLI, see benchmark/startup.py.
+
+Run from backend/:  python -m pytest tests/test_startup.py
+"""
+from benchmark.startup import check_budget, measure_startup
+
+
+def test_startup_within_budget():
+    result = measure_startup(repeat=3)
+    assert check_budget(result) == [], result